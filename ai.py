@@ -0,0 +1,540 @@
+"""
+Computer opponents
+
+A strategy picks shots for one side of a game. It only sees what a player
+would see: where it has fired, whether each shot was a hit, and the cells of
+a ship once it is sunk. See engine.Game.take_turn for how it is driven.
+"""
+
+import concurrent.futures
+import os
+import random
+import time
+
+import numpy as np
+
+import bitboard
+from bitboard import MISS, HIT
+from engine import ROW_COUNT, COLUMN_COUNT, new_pool, ships_lengths
+from placement import legal_placements
+import solver
+
+
+class Strategy:
+	"""
+	Base class for shot strategies
+	"""
+
+	name = "base"
+
+	def __init__(self, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths, rng=None):
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		self.rng = rng if rng is not None else random.Random()
+
+	def choose(self):
+		"""
+		Return the (row, column) to fire at next
+		"""
+
+		raise NotImplementedError
+
+	def observe(self, row, column, result, sunk=0):
+		"""
+		Result of the last shot: MISS or HIT, and the mask of the ship it sank or 0
+		"""
+
+		pass
+
+
+class RandomStrategy(Strategy):
+	"""
+	Fire at a uniformly random cell that has not been targeted yet
+	"""
+
+	name = "random"
+
+	def __init__(self, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths, rng=None):
+		super().__init__(rows, columns, fleet, rng)
+		self.pool = new_pool(rows * columns)
+
+	def choose(self):
+		return divmod(self.pool.draw(self.rng), self.columns)
+
+	def observe(self, row, column, result, sunk=0):
+		self.pool.remove(row * self.columns + column)
+
+
+class HuntStrategy(RandomStrategy):
+	"""
+	Classic hunt/target: random untargeted cells until a hit, then the
+	neighbours of hits until the ship sinks. Time and memory per shot do not
+	depend on the board area, so this is the one to use on very large boards.
+	"""
+
+	name = "hunt"
+
+	def __init__(self, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths, rng=None):
+		super().__init__(rows, columns, fleet, rng)
+		# Cells to try next, most recent hit's neighbours on top
+		self.targets = []
+		self.open_hits = set()
+
+	def choose(self):
+		while self.targets:
+			cell = self.targets.pop()
+			if cell in self.pool:
+				self.targets.append(cell)
+				return divmod(cell, self.columns)
+		return super().choose()
+
+	def observe(self, row, column, result, sunk=0):
+		super().observe(row, column, result, sunk)
+		if result != HIT:
+			return
+
+		self.open_hits.add((row, column))
+		for r, c in ((row - 1, column), (row + 1, column), (row, column - 1), (row, column + 1)):
+			if 0 <= r < self.rows and 0 <= c < self.columns:
+				self.targets.append(r * self.columns + c)
+
+		if sunk:
+			self.open_hits.difference_update(bitboard.iter_cells(sunk, self.columns))
+			if not self.open_hits:
+				self.targets = []
+
+
+def window_sum(a, length, axis):
+	"""
+	Sum of every run of length consecutive entries along axis, i.e. a 'valid'
+	convolution with a row of ones. The axis shrinks by length - 1.
+	"""
+
+	a = np.moveaxis(a, axis, -1)
+	c = np.cumsum(a, axis=-1, dtype=np.int64)
+	c = np.concatenate((np.zeros(c.shape[:-1] + (1,), dtype=np.int64), c), axis=-1)
+	return np.moveaxis(c[..., length:] - c[..., :-length], -1, axis)
+
+
+def spread(a, length, axis):
+	"""
+	Spread a per-placement array back over the cells each placement covers,
+	i.e. a 'full' convolution with a row of ones. The axis grows by length - 1.
+	"""
+
+	a = np.moveaxis(a, axis, -1)
+	pad = np.zeros(a.shape[:-1] + (length - 1,), dtype=a.dtype)
+	return np.moveaxis(window_sum(np.concatenate((pad, a, pad), axis=-1), length, -1), -1, axis)
+
+
+class DensityStrategy(Strategy):
+	"""
+	Probability-density hunt/target AI.
+
+	For every ship length still afloat it keeps which horizontal and vertical
+	placements are legal given the misses and sunk ships, and how many of those
+	placements cover each cell. The hunt heatmap is the sum of those counts,
+	weighted by how many ships of that length are left. A miss or a sink only
+	removes the placements through the affected cells, so after the first
+	build each update touches O(length^2) entries instead of the whole board.
+
+	While there are hits on ships that are not sunk yet, the AI is in target
+	mode: only placements through those hits are scored, weighted by how many
+	of the hits they explain, and only in the box around the hits.
+	"""
+
+	name = "density"
+
+	# Pushes shot cells far below any real count
+	SHOT = 1 << 40
+
+	def __init__(self, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths, rng=None):
+		super().__init__(rows, columns, fleet, rng)
+		self.remaining = dict()
+		for length in self.fleet.values():
+			self.remaining[length] = self.remaining.get(length, 0) + 1
+
+		self.blocked = np.zeros((rows, columns), dtype=bool)
+		self.open_hits = np.zeros((rows, columns), dtype=bool)
+		self.valid_h = dict()
+		self.valid_v = dict()
+		self.coverage = dict()
+		self.heat = np.zeros((rows, columns), dtype=np.int64)
+		for length, count in self.remaining.items():
+			free = (~self.blocked).astype(np.int64)
+			if length <= columns:
+				self.valid_h[length] = window_sum(free, length, 1) == length
+			else:
+				self.valid_h[length] = np.zeros((rows, 0), dtype=bool)
+			if length <= rows:
+				self.valid_v[length] = window_sum(free, length, 0) == length
+			else:
+				self.valid_v[length] = np.zeros((0, columns), dtype=bool)
+			self.coverage[length] = self._cover(length, self.valid_h[length], self.valid_v[length])
+			self.heat += count * self.coverage[length]
+
+	def _cover(self, length, valid_h, valid_v):
+		"""
+		Number of placements from valid_h / valid_v covering each cell
+		"""
+
+		cover = np.zeros((self.rows, self.columns), dtype=np.int64)
+		if valid_h.size:
+			cover += spread(valid_h.astype(np.int64), length, 1)
+		if valid_v.size:
+			cover += spread(valid_v.astype(np.int64), length, 0)
+		return cover
+
+	def _block(self, row, column):
+		"""
+		Remove every placement through (row, column) from the coverage and heatmap
+		"""
+
+		if self.blocked[row, column]:
+			return
+		self.blocked[row, column] = True
+
+		for length, cover in self.coverage.items():
+			count = self.remaining[length]
+
+			valid = self.valid_h[length]
+			if valid.size:
+				lo = max(0, column - length + 1)
+				hi = min(column, valid.shape[1] - 1)
+				if lo <= hi:
+					removed = valid[row, lo:hi + 1].astype(np.int64)
+					valid[row, lo:hi + 1] = False
+					delta = np.convolve(removed, np.ones(length, dtype=np.int64))
+					cover[row, lo:hi + length] -= delta
+					self.heat[row, lo:hi + length] -= count * delta
+
+			valid = self.valid_v[length]
+			if valid.size:
+				lo = max(0, row - length + 1)
+				hi = min(row, valid.shape[0] - 1)
+				if lo <= hi:
+					removed = valid[lo:hi + 1, column].astype(np.int64)
+					valid[lo:hi + 1, column] = False
+					delta = np.convolve(removed, np.ones(length, dtype=np.int64))
+					cover[lo:hi + length, column] -= delta
+					self.heat[lo:hi + length, column] -= count * delta
+
+	def _sink(self, sunk):
+		"""
+		A ship went down: its cells are no longer open hits and one ship of
+		its length leaves the heatmap
+		"""
+
+		length = bitboard.popcount(sunk)
+		for row, column in bitboard.iter_cells(sunk, self.columns):
+			self.open_hits[row, column] = False
+			self._block(row, column)
+
+		if self.remaining.get(length, 0) > 0:
+			self.remaining[length] -= 1
+			self.heat -= self.coverage[length]
+			if self.remaining[length] == 0:
+				del self.remaining[length]
+				del self.coverage[length]
+				del self.valid_h[length]
+				del self.valid_v[length]
+
+	def observe(self, row, column, result, sunk=0):
+		self.heat[row, column] -= self.SHOT
+		if result == MISS:
+			self._block(row, column)
+		elif result == HIT:
+			self.open_hits[row, column] = True
+			if sunk:
+				self._sink(sunk)
+
+	def target_heatmap(self):
+		"""
+		Scores for target mode, or None when there are no open hits
+		"""
+
+		hit_rows, hit_columns = np.nonzero(self.open_hits)
+		if not len(hit_rows):
+			return None
+		r0, r1 = hit_rows.min(), hit_rows.max()
+		c0, c1 = hit_columns.min(), hit_columns.max()
+
+		scores = np.zeros((self.rows, self.columns), dtype=np.int64)
+		hits = self.open_hits.astype(np.int64)
+		for length in self.coverage:
+			valid = self.valid_h[length]
+			if valid.size:
+				# Horizontal placements through a hit start in rows r0..r1, columns s0..s1
+				s0 = max(0, c0 - length + 1)
+				s1 = min(c1, valid.shape[1] - 1)
+				if s0 <= s1:
+					through = window_sum(hits[r0:r1 + 1, s0:s1 + length], length, 1)
+					weight = through * valid[r0:r1 + 1, s0:s1 + 1]
+					scores[r0:r1 + 1, s0:s1 + length] += self.remaining[length] * spread(weight, length, 1)
+
+			valid = self.valid_v[length]
+			if valid.size:
+				s0 = max(0, r0 - length + 1)
+				s1 = min(r1, valid.shape[0] - 1)
+				if s0 <= s1:
+					through = window_sum(hits[s0:s1 + length, c0:c1 + 1], length, 0)
+					weight = through * valid[s0:s1 + 1, c0:c1 + 1]
+					scores[s0:s1 + length, c0:c1 + 1] += self.remaining[length] * spread(weight, length, 0)
+
+		scores[self.heat < 0] = -1
+		return scores
+
+	def heatmap(self):
+		"""
+		Current scores per cell; shot cells are negative
+		"""
+
+		scores = self.target_heatmap()
+		if scores is None or scores.max() <= 0:
+			return self.heat
+		return scores
+
+	def choose(self):
+		scores = self.heatmap()
+		best = np.flatnonzero(scores == scores.max())
+		return divmod(int(best[self.rng.randrange(len(best))]), self.columns)
+
+
+def sample_posterior(rows, columns, lengths, blocked, open_hits, seed, deadline, batch=256):
+	"""
+	Draw fleet layouts for the ships in lengths that avoid the blocked cells
+	and cover every open hit, until time.time() passes deadline.
+
+	Each ship is drawn from its placement table, less the placements on
+	blocked cells and those wholly on open hits (that ship would have been
+	reported sunk). The layout is kept only if nothing overlaps and all open
+	hits are covered, so accepted layouts are uniform over the ones
+	consistent with the observations.
+	Returns (counts, samples): how many accepted layouts cover each cell.
+	"""
+
+	rng = random.Random(seed)
+	tables = []
+	for length in sorted(lengths, reverse=True):
+		tables.append([p[0] for p in legal_placements(rows, columns, length)
+				if not p[0] & blocked and p[0] & ~open_hits])
+	counts = [0] * (rows * columns)
+	samples = 0
+	if not all(tables):
+		return counts, samples
+
+	randrange = rng.randrange
+	while time.time() < deadline:
+		for i in range(batch):
+			occupied = 0
+			for table in tables:
+				mask = table[randrange(len(table))]
+				if occupied & mask:
+					break
+				occupied |= mask
+			else:
+				if open_hits & ~occupied:
+					continue
+				samples += 1
+				while occupied:
+					low = occupied & -occupied
+					counts[low.bit_length() - 1] += 1
+					occupied ^= low
+	return counts, samples
+
+
+class MonteCarloStrategy(Strategy):
+	"""
+	Expert AI: fire at the cell most often occupied across fleet layouts
+	sampled from the posterior given the hits, misses and sunk ships.
+
+	Sampling runs on a process pool (one task per worker) and stops at a
+	wall-clock budget in seconds; whatever has been sampled by then decides
+	the shot. With workers=0 sampling runs in-process. If no consistent
+	layout turns up in time the shot falls back to a DensityStrategy that is
+	kept up to date alongside.
+
+	choose() blocks for about one budget. choose_async() returns a
+	concurrent.futures.Future instead, so a UI can keep drawing frames.
+	"""
+
+	name = "montecarlo"
+
+	# Shared between every instance in a process, created on first use: the
+	# sampling process pool and its size, and the thread choose_async uses
+	_executor = None
+	_executor_workers = 0
+	_background = None
+
+	def __init__(self, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths, rng=None, budget=0.1, workers=None):
+		super().__init__(rows, columns, fleet, rng)
+		self.budget = budget
+		self.workers = (os.cpu_count() or 1) if workers is None else workers
+		self.lengths = list(self.fleet.values())
+		self.shots = 0
+		self.blocked = 0
+		self.open_hits = 0
+		self.samples = 0
+		self.fallback = DensityStrategy(rows, columns, fleet, self.rng)
+
+	@classmethod
+	def executor(cls, workers):
+		"""
+		The shared process pool, grown to at least workers processes
+		"""
+
+		if cls._executor is None or cls._executor_workers < workers:
+			if cls._executor is not None:
+				cls._executor.shutdown(wait=False)
+			cls._executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+			cls._executor_workers = workers
+		return cls._executor
+
+	@classmethod
+	def shutdown(cls):
+		"""
+		Stop the shared process pool and background thread
+		"""
+
+		if cls._executor is not None:
+			cls._executor.shutdown()
+			cls._executor = None
+			cls._executor_workers = 0
+		if cls._background is not None:
+			cls._background.shutdown()
+			cls._background = None
+
+	def observe(self, row, column, result, sunk=0):
+		self.fallback.observe(row, column, result, sunk)
+		bit = 1 << (row * self.columns + column)
+		self.shots |= bit
+		if result == MISS:
+			self.blocked |= bit
+		elif result == HIT:
+			self.open_hits |= bit
+			if sunk:
+				self.open_hits &= ~sunk
+				self.blocked |= sunk
+				self.lengths.remove(bitboard.popcount(sunk))
+
+	def sample(self):
+		"""
+		Sample until the budget runs out. Returns (counts, samples).
+		"""
+
+		deadline = time.time() + self.budget
+		args = (self.rows, self.columns, self.lengths, self.blocked, self.open_hits)
+		if self.workers == 0:
+			return sample_posterior(*args, self.rng.getrandbits(64), deadline)
+
+		pool = self.executor(self.workers)
+		futures = [pool.submit(sample_posterior, *args, self.rng.getrandbits(64), deadline)
+				for i in range(self.workers)]
+		# Workers stop themselves at the deadline; the grace period only covers
+		# pickling and scheduling, anything later is left out of this shot
+		done, late = concurrent.futures.wait(futures, timeout=self.budget + 0.05)
+		for future in late:
+			future.cancel()
+
+		counts = [0] * (self.rows * self.columns)
+		samples = 0
+		for future in done:
+			part, n = future.result()
+			samples += n
+			for cell, count in enumerate(part):
+				counts[cell] += count
+		return counts, samples
+
+	def choose(self):
+		counts, self.samples = self.sample()
+		best = -1
+		choices = []
+		for cell, count in enumerate(counts):
+			if (self.shots >> cell) & 1 or count < best:
+				continue
+			if count > best:
+				best = count
+				choices = []
+			choices.append(cell)
+		if self.samples == 0 or best <= 0:
+			return self.fallback.choose()
+		return divmod(choices[self.rng.randrange(len(choices))], self.columns)
+
+	def choose_async(self):
+		"""
+		Run choose() on the shared background thread and return its Future
+		"""
+
+		cls = type(self)
+		if cls._background is None:
+			cls._background = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+		return cls._background.submit(self.choose)
+
+
+class ExactStrategy(Strategy):
+	"""
+	Fire at the untargeted cell with the highest exact hit probability from
+	solver.solve.
+
+	Exact counting is only fast once the board has some information on it,
+	so the first exact_after shots come from a DensityStrategy that is kept
+	up to date alongside.
+	"""
+
+	name = "exact"
+
+	def __init__(self, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths, rng=None, exact_after=16):
+		super().__init__(rows, columns, fleet, rng)
+		self.exact_after = exact_after
+		self.lengths = list(self.fleet.values())
+		self.shots = 0
+		self.fired = 0
+		self.blocked = 0
+		self.open_hits = 0
+		self.fallback = DensityStrategy(rows, columns, fleet, self.rng)
+
+	def observe(self, row, column, result, sunk=0):
+		self.fallback.observe(row, column, result, sunk)
+		bit = 1 << (row * self.columns + column)
+		self.shots |= bit
+		self.fired += 1
+		if result == MISS:
+			self.blocked |= bit
+		elif result == HIT:
+			self.open_hits |= bit
+			if sunk:
+				self.open_hits &= ~sunk
+				self.blocked |= sunk
+				self.lengths.remove(bitboard.popcount(sunk))
+
+	def probabilities(self):
+		"""
+		Exact hit probability of every cell, indexed by row * columns + column
+		"""
+
+		return solver.solve(self.blocked, self.open_hits, self.lengths, self.rows, self.columns)[1]
+
+	def choose(self):
+		if self.fired < self.exact_after:
+			return self.fallback.choose()
+
+		best = -1.0
+		choices = []
+		for cell, p in enumerate(self.probabilities()):
+			if (self.shots >> cell) & 1 or p < best:
+				continue
+			if p > best:
+				best = p
+				choices = []
+			choices.append(cell)
+		if best <= 0:
+			return self.fallback.choose()
+		return divmod(choices[self.rng.randrange(len(choices))], self.columns)
+
+
+STRATEGIES = {RandomStrategy.name: RandomStrategy,
+		HuntStrategy.name: HuntStrategy,
+		DensityStrategy.name: DensityStrategy,
+		MonteCarloStrategy.name: MonteCarloStrategy,
+		ExactStrategy.name: ExactStrategy}
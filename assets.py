@@ -0,0 +1,192 @@
+"""
+Generated ship images
+
+The inventory shows one image per ship: a gray bar as long as the ship with
+its name written on it. The images are rendered from the fleet, the cell
+size, the ship color and the font, and a hash of those inputs is kept in a
+manifest next to them. They are only rendered again, and the font only
+loaded, when the hash changes. Without a directory, or when the directory
+cannot be written, the images are kept in memory instead.
+
+Run with:
+python assets.py
+to build the images ahead of time, for example before installing read-only.
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+from PIL import Image, ImageDraw, ImageFont
+
+from engine import ships_lengths
+
+# File name for each ship's image
+DESIGNATIONS = {"Aircraft Carrier": "CV",
+		"Battleship": "BB",
+		"Destroyer": "DD",
+		"Submarine": "SS",
+		"PT Boat": "PT"}
+
+MANIFEST = "ships.json"
+
+# Rendering inputs, the window passes its own cell size and colors
+CELL_WIDTH = 50
+CELL_HEIGHT = 50
+SHIP_COLOR = (128, 128, 128)
+TEXT_COLOR = (255, 255, 255)
+FONT = "arial.ttf"
+FONT_SIZE = 24
+
+
+class ShipImages:
+	"""
+	Ship images built once per set of inputs, on disk under directory or in
+	memory when directory is None
+	"""
+
+	def __init__(self, directory="Images", fleet=ships_lengths, width=CELL_WIDTH, height=CELL_HEIGHT,
+			color=SHIP_COLOR, text_color=TEXT_COLOR, font=FONT, font_size=FONT_SIZE):
+		self.directory = directory
+		self.fleet = dict(fleet)
+		self.width = width
+		self.height = height
+		self.color = tuple(color)
+		self.text_color = tuple(text_color)
+		self.font = font
+		self.font_size = font_size
+		self.images = dict()
+		self.textures = dict()
+
+	def fingerprint(self):
+		"""
+		Hash of everything the images are rendered from
+		"""
+
+		inputs = {"fleet": self.fleet,
+				"designations": {ship: designation(ship) for ship in self.fleet},
+				"size": [self.width, self.height],
+				"color": self.color,
+				"text_color": self.text_color,
+				"font": [self.font, self.font_size]}
+		digest = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode())
+		if os.path.isfile(self.font):
+			with open(self.font, "rb") as f:
+				digest.update(f.read())
+		return digest.hexdigest()
+
+	def path(self, ship):
+		return os.path.join(self.directory, designation(ship) + ".png")
+
+	def up_to_date(self):
+		"""
+		True if the directory already holds images for the current inputs
+		"""
+
+		try:
+			with open(os.path.join(self.directory, MANIFEST)) as f:
+				manifest = json.load(f)
+		except (OSError, ValueError):
+			return False
+		return (manifest.get("hash") == self.fingerprint()
+				and all(os.path.isfile(self.path(ship)) for ship in self.fleet))
+
+	def build(self):
+		"""
+		Make sure every image exists, rendering them only if needed.
+		Returns True if anything was rendered.
+		"""
+
+		if self.images or (self.directory is not None and self.up_to_date()):
+			return False
+
+		self.images = self.render()
+		if self.directory is not None:
+			try:
+				self.save()
+			except OSError:
+				# Read-only install, keep the images in memory
+				self.directory = None
+		return True
+
+	def render(self):
+		"""
+		Draw every ship image, returns ship name -> PIL image
+		"""
+
+		try:
+			font = ImageFont.truetype(self.font, self.font_size)
+		except OSError:
+			font = ImageFont.load_default()
+
+		images = dict()
+		for ship, length in self.fleet.items():
+			image = Image.new("RGB", (length * self.width, self.height), self.color)
+			ImageDraw.Draw(image).text((0, 0), ship, self.text_color, font=font)
+			images[ship] = image
+		return images
+
+	def save(self):
+		"""
+		Write the images and then the manifest, each through a temporary file
+		so a crash never leaves a manifest pointing at half-written images
+		"""
+
+		for ship, image in self.images.items():
+			path = self.path(ship)
+			image.save(path + ".tmp", format="PNG")
+			os.replace(path + ".tmp", path)
+
+		manifest = os.path.join(self.directory, MANIFEST)
+		with open(manifest + ".tmp", "w") as f:
+			json.dump({"hash": self.fingerprint(), "files": sorted(designation(ship) + ".png" for ship in self.fleet)}, f, indent=2)
+		os.replace(manifest + ".tmp", manifest)
+
+	def image(self, ship):
+		"""
+		PIL image of one ship
+		"""
+
+		image = self.images.get(ship)
+		if image is None:
+			self.build()
+			image = self.images.get(ship)
+		if image is None:
+			image = self.images[ship] = Image.open(self.path(ship)).convert("RGB")
+		return image
+
+	def texture(self, ship):
+		"""
+		arcade texture of one ship, created once
+		"""
+
+		# Imported here so the images can be built without a display
+		import arcade
+
+		texture = self.textures.get(ship)
+		if texture is None:
+			texture = self.textures[ship] = arcade.Texture(designation(ship), image=self.image(ship))
+		return texture
+
+
+def designation(ship):
+	"""
+	Short name used for a ship's image file
+	"""
+
+	return DESIGNATIONS.get(ship) or "".join(word[0] for word in ship.split()).upper()
+
+
+def main(argv=None):
+	"""
+	Build the ship images under a directory (default Images)
+	"""
+
+	argv = argv if argv is not None else sys.argv[1:]
+	images = ShipImages(argv[0] if argv else "Images")
+	print("rendered" if images.build() else "up to date", images.directory)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,195 @@
+"""
+Batched NumPy engine
+
+Keeps N games (one board each) as stacked (N, rows, columns) arrays and
+advances all of them with one vectorized step. Cells use the same encoding
+as player_grid / computer_grid: 0 water, 1 miss, 2 ship, 3 hit. Hit, sink and
+win detection and random placement are all done across the whole batch at
+once, so the Python overhead is per step instead of per game.
+
+Each entry is one board being shot at. A two-sided game is two boards, so
+run 2N boards and pair board i with board i + N.
+"""
+
+import numpy as np
+
+from bitboard import WATER, MISS, SHIP, HIT
+from engine import ROW_COUNT, COLUMN_COUNT, ships_lengths
+from placement import MAX_LAYOUTS, check_fleet, legal_placements
+
+
+def placement_masks(rows, columns, length):
+	"""
+	Every placement of a ship as a (placements, rows * columns) bool array
+	"""
+
+	placements = legal_placements(rows, columns, length)
+	masks = np.zeros((len(placements), rows * columns), dtype=bool)
+	for i, (mask, row, column, orientation) in enumerate(placements):
+		for cell in range(rows * columns):
+			if (mask >> cell) & 1:
+				masks[i, cell] = True
+	return masks
+
+
+class BatchGames:
+	"""
+	N boards advanced in lockstep.
+
+	cells is (N, rows, columns) int8 in the grid encoding, ship_id holds the
+	index into fleet of the ship on each cell (-1 for water), health the cells
+	left per ship, remaining the ships afloat and done which boards have had
+	every ship sunk.
+	"""
+
+	def __init__(self, n, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths, rng=None):
+		self.n = n
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		self.lengths = np.array(list(self.fleet.values()), dtype=np.int16)
+		self.rng = rng if rng is not None else np.random.default_rng()
+		self._masks = dict()
+		self.reset()
+
+	def reset(self, games=None):
+		"""
+		Clear the boards (all of them, or the ones selected by games)
+		"""
+
+		if games is None:
+			self.cells = np.full((self.n, self.rows, self.columns), WATER, dtype=np.int8)
+			self.ship_id = np.full((self.n, self.rows, self.columns), -1, dtype=np.int8)
+			self.health = np.zeros((self.n, len(self.lengths)), dtype=np.int16)
+			self.remaining = np.zeros(self.n, dtype=np.int16)
+			self.done = np.zeros(self.n, dtype=bool)
+			self.shots = np.zeros(self.n, dtype=np.int32)
+			return
+
+		self.cells[games] = WATER
+		self.ship_id[games] = -1
+		self.health[games] = 0
+		self.remaining[games] = 0
+		self.done[games] = False
+		self.shots[games] = 0
+
+	def masks(self, length):
+		"""
+		Cached placement_masks for this board size
+		"""
+
+		masks = self._masks.get(length)
+		if masks is None:
+			masks = self._masks[length] = placement_masks(self.rows, self.columns, length)
+		return masks
+
+	def place_random(self, games=None):
+		"""
+		Place the whole fleet at random on every selected board, replacing any
+		ships already there. Each ship is drawn uniformly from the placements
+		that are still free on its board. A board where some ship has no free
+		placement left is started over; a fleet that cannot fit, or still has
+		boards stuck after MAX_LAYOUTS rounds, raises ValueError.
+		"""
+
+		check_fleet(self.rows, self.columns, [int(length) for length in self.lengths])
+		if games is None:
+			games = np.arange(self.n)
+		else:
+			games = np.asarray(games)
+			if games.dtype == bool:
+				games = np.flatnonzero(games)
+		flat_ids = self.ship_id.reshape(self.n, -1)
+		pending = games
+		for attempt in range(MAX_LAYOUTS):
+			flat_ids[pending] = -1
+			occupied = np.zeros((len(pending), self.rows * self.columns), dtype=bool)
+			stuck = np.zeros(len(pending), dtype=bool)
+			for ship, length in enumerate(self.lengths):
+				masks = self.masks(int(length))
+				# A placement is free if it overlaps no occupied cell
+				free = (occupied.astype(np.float32) @ masks.T.astype(np.float32)) == 0
+				stuck |= ~free.any(axis=1)
+				keys = self.rng.random(free.shape)
+				keys[~free] = -1.0
+				choice = keys.argmax(axis=1)
+				cells = masks[choice]
+				occupied |= cells
+				ids = flat_ids[pending]
+				ids[cells] = ship
+				flat_ids[pending] = ids
+			pending = pending[stuck]
+			if not len(pending):
+				break
+		else:
+			raise ValueError("no layout found for the fleet on a %dx%d board" % (self.rows, self.columns))
+
+		self.cells.reshape(self.n, -1)[games] = np.where(flat_ids[games] >= 0, SHIP, WATER)
+		self.health[games] = self.lengths
+		self.remaining[games] = len(self.lengths)
+
+	def step(self, rows, columns):
+		"""
+		Fire one shot on every board, at (rows[i], columns[i]) on board i.
+		Boards that are done, or shots at a cell already targeted, change nothing.
+
+		Returns (result, sunk): result is the cell value after the shot (MISS or
+		HIT, or -1 for no shot) and sunk the index into fleet of the ship that
+		shot sank, or -1.
+		"""
+
+		games = np.arange(self.n)
+		before = self.cells[games, rows, columns]
+		fired = ~self.done & ((before == WATER) | (before == SHIP))
+
+		result = np.where(fired, before + 1, -1).astype(np.int8)
+		self.cells[games[fired], rows[fired], columns[fired]] += 1
+		self.shots += fired
+
+		hit = result == HIT
+		sunk = np.full(self.n, -1, dtype=np.int8)
+		hit_games = games[hit]
+		ships = self.ship_id[hit_games, rows[hit], columns[hit]]
+		self.health[hit_games, ships] -= 1
+		gone = self.health[hit_games, ships] == 0
+		sunk[hit_games[gone]] = ships[gone]
+		self.remaining[hit_games[gone]] -= 1
+		self.done |= fired & (self.remaining == 0)
+		return result, sunk
+
+	def observations(self):
+		"""
+		What the shooter sees: the cells with unhit ships shown as water
+		"""
+
+		return np.where(self.cells == SHIP, WATER, self.cells)
+
+	def random_shots(self):
+		"""
+		A uniformly random untargeted cell on every board, as (rows, columns)
+		"""
+
+		keys = self.rng.random((self.n, self.rows * self.columns))
+		flat = self.cells.reshape(self.n, -1)
+		keys[(flat == MISS) | (flat == HIT)] = -1.0
+		cell = keys.argmax(axis=1)
+		return cell // self.columns, cell % self.columns
+
+	def play_random(self):
+		"""
+		Place fleets and fire random shots until every board is cleared.
+		Returns the number of shots each board took.
+		"""
+
+		self.reset()
+		self.place_random()
+
+		# A random firing order per board is the same as a random untargeted
+		# cell every turn, and costs one sort instead of a draw per cell per turn
+		order = self.rng.random((self.n, self.rows * self.columns)).argsort(axis=1)
+		turn = 0
+		while not self.done.all():
+			cell = order[:, turn]
+			self.step(cell // self.columns, cell % self.columns)
+			turn += 1
+		return self.shots.copy()
@@ -0,0 +1,489 @@
+"""
+Headless benchmarks for the Battleship engine
+
+Run with:
+python bench.py
+"""
+
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import ai
+import batch
+import engine
+import env
+import placement
+import replay
+import session
+import state
+
+
+def bench_engine(games=5000, seed=0):
+	"""
+	Play random computer-vs-computer games and report games/sec
+	"""
+
+	rng = random.Random(seed)
+	start = time.perf_counter()
+	for i in range(games):
+		engine.play_random_game(rng)
+	elapsed = time.perf_counter() - start
+	print(f"engine: {games} games in {elapsed:.2f}s, {games / elapsed:.0f} games/sec")
+
+
+def bench_placement(layouts=20000, seed=0):
+	"""
+	Fleet layouts/sec for per-ship draws from the placement tables and the
+	exact uniform sampler
+	"""
+
+	lengths = list(engine.ships_lengths.values())
+	for name, sampler in (("tables", placement.random_layout), ("uniform", placement.uniform_layout)):
+		rng = random.Random(seed)
+		start = time.perf_counter()
+		for i in range(layouts):
+			sampler(engine.ROW_COUNT, engine.COLUMN_COUNT, lengths, rng)
+		elapsed = time.perf_counter() - start
+		print(f"placement ({name}): {layouts / elapsed:.0f} layouts/sec")
+
+
+def bench_ai(games=200, seed=0):
+	"""
+	Average shots to sink a random fleet and worst move latency per strategy
+	"""
+
+	for name, strategy in ai.STRATEGIES.items():
+		if name in (ai.MonteCarloStrategy.name, ai.ExactStrategy.name):
+			# Too slow per move for this many games, see their own benchmarks
+			continue
+		rng = random.Random(seed)
+		shots = 0
+		worst = 0.0
+		for i in range(games):
+			game = engine.Game(rng=rng)
+			game.player.place_randomly(rng)
+			player = strategy(rng=rng)
+			while game.winner is None:
+				start = time.perf_counter()
+				game.take_turn(engine.COMPUTER, player)
+				worst = max(worst, time.perf_counter() - start)
+				shots += 1
+		print(f"ai ({name}): {shots / games:.1f} shots/game, worst move {worst * 1000:.2f} ms")
+
+
+def bench_montecarlo(games=5, seed=0, budget=0.05):
+	"""
+	Shots to sink a random fleet and posterior samples per move for the expert AI
+	"""
+
+	rng = random.Random(seed)
+	shots = 0
+	samples = 0
+	for i in range(games):
+		game = engine.Game(rng=rng)
+		game.player.place_randomly(rng)
+		player = ai.MonteCarloStrategy(rng=rng, budget=budget)
+		while game.winner is None:
+			game.take_turn(engine.COMPUTER, player)
+			samples += player.samples
+			shots += 1
+	ai.MonteCarloStrategy.shutdown()
+	print(f"ai (montecarlo, {player.workers} workers, {budget * 1000:.0f} ms budget): "
+		f"{shots / games:.1f} shots/game, {samples / shots:.0f} samples/move")
+
+
+# Worst exact-solver time per position the exact AI is meant to stay under
+SOLVER_TARGET = 1.0
+
+
+def bench_solver(games=20, seed=0, after=16):
+	"""
+	Worst and mean exact-solver time on mid-game positions, from the shot
+	number after onwards in games played by the exact AI, and how far the
+	worst case is from SOLVER_TARGET
+	"""
+
+	rng = random.Random(seed)
+	times = []
+	for i in range(games):
+		game = engine.Game(rng=rng)
+		game.player.place_randomly(rng)
+		player = ai.ExactStrategy(rng=rng, exact_after=after)
+		while game.winner is None:
+			if player.fired >= after:
+				start = time.perf_counter()
+				player.probabilities()
+				times.append(time.perf_counter() - start)
+			game.take_turn(engine.COMPUTER, player)
+	worst = max(times)
+	print(f"solver: {len(times)} positions from shot {after} on, "
+		f"mean {sum(times) / len(times) * 1000:.0f} ms, worst {worst * 1000:.0f} ms, "
+		f"headroom {(SOLVER_TARGET - worst) * 1000:.0f} ms ({(1 - worst / SOLVER_TARGET) * 100:.0f}% of the "
+		f"{SOLVER_TARGET:g} s target)")
+
+
+def bench_batch(boards=10000, seed=0):
+	"""
+	Random-shot boards cleared per second by the batched NumPy engine
+	"""
+
+	import numpy as np
+
+	games = batch.BatchGames(boards, rng=np.random.default_rng(seed))
+	start = time.perf_counter()
+	games.play_random()
+	elapsed = time.perf_counter() - start
+	print(f"batch: {boards} boards in {elapsed:.2f}s, {boards / elapsed:.0f} boards/sec "
+		f"({boards / elapsed / 2:.0f} two-sided games/sec)")
+
+
+def bench_env(num_envs=1000, steps=300, seed=0):
+	"""
+	Environment steps/sec for VectorEnv on each backend, random actions
+	"""
+
+	import numpy as np
+
+	for backend in ("inprocess", "subprocess"):
+		rng = np.random.default_rng(seed)
+		actions = rng.integers(0, engine.ROW_COUNT * engine.COLUMN_COUNT, (steps, num_envs))
+		with env.VectorEnv(num_envs, backend=backend, copy=False) as vector:
+			vector.reset(seed=seed)
+			start = time.perf_counter()
+			for step in range(steps):
+				vector.step(actions[step])
+			elapsed = time.perf_counter() - start
+		print(f"env ({backend}, {num_envs} envs): {num_envs * steps / elapsed:.0f} steps/sec")
+
+
+def bench_renderer(frames=600, shots=2, seed=0):
+	"""
+	Pixel-side cost per frame of the single-texture board renderer: repaint
+	the cells hit this frame and extract the dirty rectangles to upload
+	"""
+
+	import numpy as np
+
+	import renderer
+
+	palette = [(0, 0, 255), (255, 255, 255), (128, 128, 128), (255, 0, 0)]
+	for size, cell, margin in ((10, 50, 1), (100, 8, 1), (1000, 1, 0)):
+		board = renderer.BoardTexture(size, size, palette, cell, cell, margin)
+		board.region(*board.take_dirty()[0])
+		rng = np.random.default_rng(seed)
+		cells = rng.integers(0, size, (frames, shots, 2))
+		uploaded = 0
+		start = time.perf_counter()
+		for frame in range(frames):
+			for row, column in cells[frame]:
+				board.set_cell(row, column, 1 + frame % 3)
+			for region in board.take_dirty():
+				uploaded += len(board.region(*region))
+		elapsed = time.perf_counter() - start
+		full = board.pixel_width * board.pixel_height * 4
+		print(f"renderer ({size}x{size}, {cell}px cells): {frames / elapsed:.0f} frames/sec, "
+			f"{uploaded / frames / 1024:.1f} KiB/frame uploaded vs {full / 1024:.0f} KiB full texture")
+
+
+def bench_scaling(moves=10000, seed=0):
+	"""
+	Board memory, fleet placement time and per-move latency of the hunt and
+	random AIs from 10x10 up to 1000x1000
+	"""
+
+	for size in (10, 100, 1000):
+		rng = random.Random(seed)
+		# Warm up first so one-off caches are not counted against the board
+		engine.Game(size, size, rng=rng).player.place_randomly(rng)
+		tracemalloc.start()
+		start = time.perf_counter()
+		game = engine.Game(size, size, rng=rng)
+		game.player.place_randomly(rng)
+		placed = time.perf_counter() - start
+		memory = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		kind = type(game.player).__name__
+
+		latency = []
+		for name in (ai.RandomStrategy.name, ai.HuntStrategy.name):
+			game = engine.Game(size, size, rng=rng)
+			game.player.place_randomly(rng)
+			player = ai.STRATEGIES[name](size, size, rng=rng)
+			played = 0
+			start = time.perf_counter()
+			while game.winner is None and played < moves:
+				game.take_turn(engine.COMPUTER, player)
+				played += 1
+			latency.append(f"{name} {(time.perf_counter() - start) / played * 1e6:.1f} us/move")
+		print(f"scaling ({size}x{size}, {kind}): {memory / 1024:.0f} KiB for both boards, "
+			f"placed in {placed * 1000:.2f} ms, " + ", ".join(latency))
+
+
+def bench_sessions(count=1000000, layouts=1000, sample=2000, seed=0):
+	"""
+	A million session.GameSession objects alive at once, both fleets placed:
+	time to build them and the memory they take, against engine.Game, then
+	the footprint of finished games and the cost of a shot. Layouts are
+	drawn up front, so this times building the sessions and not the
+	placement draws.
+	"""
+
+	import gc
+
+	rng = random.Random(seed)
+	rules = session.Rules(engine.ROW_COUNT, engine.COLUMN_COUNT, engine.ships_lengths)
+	drawn = [placement.random_layout(rules.rows, rules.columns, rules.lengths, rng) for i in range(layouts)]
+
+	def build(i):
+		game = session.GameSession(rules, i)
+		for player, layout in ((engine.USER, drawn[i % layouts]), (engine.COMPUTER, drawn[(i + 1) % layouts])):
+			for ship, (mask, row, column, orientation) in enumerate(layout):
+				game.place(player, ship, row, column, orientation)
+		return game
+
+	def play(games):
+		shots = 0
+		for game in games:
+			player = engine.USER
+			while game.winner is None:
+				game.shoot(player, *game.random_shot(player, rng))
+				player = engine.COMPUTER if player == engine.USER else engine.USER
+				shots += 1
+		return shots
+
+	# Bytes per session from a sample, placed and then played out
+	build(0)
+	tracemalloc.start()
+	games = [build(i) for i in range(sample)]
+	placed = (tracemalloc.get_traced_memory()[0] - sys.getsizeof(games)) / sample
+	play(games)
+	finished = (tracemalloc.get_traced_memory()[0] - sys.getsizeof(games)) / sample
+	del games
+	before = tracemalloc.get_traced_memory()[0]
+	games = [engine.Game(rng=rng) for i in range(sample)]
+	for game in games:
+		game.player.place_randomly(rng)
+		game.computer.place_randomly(rng)
+	full = (tracemalloc.get_traced_memory()[0] - before - sys.getsizeof(games)) / sample
+	tracemalloc.stop()
+	del games
+
+	# The million, with the collector paused as server.tune_gc does for live games
+	gc.collect()
+	gc.disable()
+	rss = resident_kib()
+	start = time.perf_counter()
+	sessions = [build(i) for i in range(count)]
+	elapsed = time.perf_counter() - start
+	grown = resident_kib() - rss
+	start = time.perf_counter()
+	shots = play(sessions[:sample])
+	shot = (time.perf_counter() - start) / shots
+	del sessions
+	gc.enable()
+
+	print(f"sessions: {placed:.0f} bytes/session placed, {finished:.0f} finished (engine.Game {full:.0f} bytes)")
+	print(f"sessions: {count} created in {elapsed:.1f} s, process grew {grown / 1024:.0f} MiB, "
+		f"random shot + shoot {shot * 1e6:.2f} us")
+
+
+def resident_kib():
+	"""
+	Resident memory of this process in KiB, 0 where /proc is not available
+	"""
+
+	try:
+		with open("/proc/self/statm") as f:
+			return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+	except (OSError, ValueError, AttributeError):
+		return 0
+
+
+def bench_replay(games=10000, copies=10, seed=0):
+	"""
+	Replay file size per game, then records/sec for a header-only scan, for
+	decoding every shot and for rebuilding every final board, over
+	games * copies records read through the memory map
+	"""
+
+	import pickle
+
+	rng = random.Random(seed)
+	records = []
+	pickled = 0
+	for index in range(games):
+		game = engine.Game(rng=rng)
+		game.player.place_randomly(rng)
+		game.computer.place_randomly(rng)
+		player = engine.USER
+		while game.winner is None:
+			row, column = divmod(game.target(player).untargeted.draw(rng), engine.COLUMN_COUNT)
+			game.shoot(player, row, column)
+			player = engine.COMPUTER if player == engine.USER else engine.USER
+		records.append(replay.pack(game, seed, index))
+		pickled += len(pickle.dumps((seed, index, game.winner, game.player.placements,
+				game.computer.placements, list(game.history))))
+
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, "games.bsr")
+		with replay.ReplayWriter(path) as writer:
+			for i in range(copies):
+				for record in records:
+					writer.write_packed(record)
+		size = os.path.getsize(path)
+		total = games * copies
+		print(f"replay: {size / total:.0f} bytes/game vs {pickled / games:.0f} pickled, "
+			f"{size / 1024 / 1024:.1f} MiB for {total} games")
+
+		with replay.ReplayFile(path) as replays:
+			start = time.perf_counter()
+			shots = sum(record[4] for record in replays.scan())
+			elapsed = time.perf_counter() - start
+			print(f"replay (scan): {total / elapsed:.0f} games/sec, {shots / total:.0f} shots/game")
+
+			start = time.perf_counter()
+			for game in replays:
+				for player, row, column in game.moves():
+					pass
+			elapsed = time.perf_counter() - start
+			print(f"replay (decode shots): {total / elapsed:.0f} games/sec")
+
+			start = time.perf_counter()
+			rebuilt = min(total, games)
+			for i in range(rebuilt):
+				replays[i].game()
+			elapsed = time.perf_counter() - start
+			print(f"replay (final boards): {rebuilt / elapsed:.0f} games/sec")
+
+
+def bench_state(forks=20000, depth=3, seed=0):
+	"""
+	Cost of forking a game and firing one shot: deepcopy of an engine.Game
+	against GameState.shoot, then a full search tree to depth plies with a
+	transposition table keyed by the state hash
+	"""
+
+	import copy
+
+	rng = random.Random(seed)
+	game = engine.Game(rng=rng)
+	game.player.place_randomly(rng)
+	game.computer.place_randomly(rng)
+	cells = [divmod(cell, engine.COLUMN_COUNT) for cell in range(engine.ROW_COUNT * engine.COLUMN_COUNT)]
+
+	start = time.perf_counter()
+	for i in range(forks // 10):
+		fork = copy.deepcopy(game)
+		fork.shoot(engine.USER, *cells[i % len(cells)])
+	deep = (time.perf_counter() - start) / (forks // 10)
+
+	root = state.GameState.from_game(game)
+	start = time.perf_counter()
+	for i in range(forks):
+		root.shoot(*cells[i % len(cells)])
+	fork = (time.perf_counter() - start) / forks
+	print(f"state (fork + shot): {fork * 1e6:.2f} us vs {deep * 1e6:.1f} us deepcopy of engine.Game")
+
+	# state -> plies searched below it, a hit skips the whole subtree
+	table = dict()
+	shots = [0]
+
+	def search(node, plies):
+		if plies == 0 or node.winner is not None or table.get(node, -1) >= plies:
+			return
+		table[node] = plies
+		for row, column in node.legal_moves():
+			shots[0] += 1
+			search(node.shoot(row, column)[0], plies - 1)
+
+	start = time.perf_counter()
+	search(root, depth)
+	elapsed = time.perf_counter() - start
+	print(f"state (search, depth {depth}): {shots[0]} shots, {len(table)} distinct states, "
+		f"{shots[0] / elapsed:.0f} shots/sec")
+
+
+def bench_server(sessions=500, think=0.2, saturate=200):
+	"""
+	Latency of a loopback server under load: sessions concurrent players
+	against the random AI with think seconds between shots, then saturate
+	players that never wait, for throughput
+	"""
+
+	import asyncio
+	import server
+
+	report = asyncio.run(server.load(sessions, think=think))
+	latency = report["latency_ms"]
+	print(f"server ({sessions} sessions, {think} s think): p50 {latency['p50']:.2f} ms, "
+		f"p99 {latency['p99']:.2f} ms, {report['errors']} errors")
+	report = asyncio.run(server.load(saturate))
+	print(f"server ({saturate} sessions, no think): {report['moves_per_sec']:.0f} moves/sec")
+
+
+# Cold-start probes, each run in a fresh interpreter. They print the heavy
+# modules that ended up loaded, which should be none for the headless ones.
+HEAVY = "print(' '.join(sorted(m for m in ('arcade', 'pyglet', 'PIL', 'numpy') if m in sys.modules)))"
+STARTUP = {"import battleship": "import sys, battleship; " + HEAVY,
+		"import engine": "import sys, engine; " + HEAVY,
+		"first simulated game": "import sys, simulate; simulate.play_game(0, 0, 'density', 'random', 'random', 'random', 10, 10, simulate.engine.ships_lengths); " + HEAVY,
+		"first frame": "import sys, window; w = window.Battleship(window.SCREEN_WIDTH, window.SCREEN_HEIGHT); w.setup(); w.on_draw(); w.flip(); w.close(); " + HEAVY}
+
+
+def bench_startup(runs=5):
+	"""
+	Wall time from process start to the end of each STARTUP probe, best and
+	median of runs fresh processes
+	"""
+
+	for name, code in STARTUP.items():
+		times = []
+		for i in range(runs):
+			start = time.perf_counter()
+			process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+					cwd=os.path.dirname(os.path.abspath(__file__)))
+			times.append(time.perf_counter() - start)
+			if process.returncode:
+				break
+		if process.returncode:
+			reason = (process.stderr.strip().splitlines() or ["exit code %d" % process.returncode])[-1]
+			print(f"startup ({name}): skipped, {reason}")
+			continue
+		loaded = process.stdout.strip() or "none"
+		print(f"startup ({name}): best {min(times) * 1000:.0f} ms, median {statistics.median(times) * 1000:.0f} ms, heavy modules: {loaded}")
+
+
+BENCHMARKS = {"engine": bench_engine,
+		"placement": bench_placement,
+		"ai": bench_ai,
+		"montecarlo": bench_montecarlo,
+		"solver": bench_solver,
+		"batch": bench_batch,
+		"env": bench_env,
+		"renderer": bench_renderer,
+		"replay": bench_replay,
+		"state": bench_state,
+		"sessions": bench_sessions,
+		"server": bench_server,
+		"scaling": bench_scaling,
+		"startup": bench_startup}
+
+
+def main(argv=None):
+	"""
+	Run the benchmarks named on the command line, or all of them
+	"""
+
+	names = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+	for name in names:
+		BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+	main()
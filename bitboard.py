@@ -0,0 +1,153 @@
+"""
+Bitboard helpers for Battleship grids
+
+A board is stored as Python ints used as bit sets, one bit per cell with
+cell (row, column) at bit row * columns + column. Ships, hits and misses
+each get their own mask, so placement, collision, hit/miss and "all sunk"
+checks are single mask operations instead of per-cell loops.
+"""
+
+# Cell values, kept in sync with engine.py
+WATER = 0
+MISS = 1
+SHIP = 2
+HIT = 3
+
+HORIZONTAL = 0
+VERTICAL = 1
+
+
+def cell_index(row, column, columns):
+	"""
+	Bit index of a cell
+	"""
+
+	return row * columns + column
+
+
+def cell_bit(row, column, columns):
+	"""
+	Mask with only the bit for (row, column) set
+	"""
+
+	return 1 << (row * columns + column)
+
+
+def ship_mask(row, column, length, orientation, columns):
+	"""
+	Mask covering a ship. The caller is responsible for bounds checks.
+	"""
+
+	if orientation == HORIZONTAL:
+		return ((1 << length) - 1) << (row * columns + column)
+
+	mask = 0
+	bit = 1 << (row * columns + column)
+	for i in range(length):
+		mask |= bit
+		bit <<= columns
+	return mask
+
+
+def in_bounds(row, column, length, orientation, rows, columns):
+	"""
+	True if a ship starting at (row, column) fits on the grid
+	"""
+
+	if row < 0 or column < 0:
+		return False
+	if orientation == HORIZONTAL:
+		return row < rows and column + length <= columns
+	return column < columns and row + length <= rows
+
+
+def popcount(mask):
+	"""
+	Number of set bits
+	"""
+
+	return bin(mask).count("1")
+
+
+def iter_cells(mask, columns):
+	"""
+	Yield the (row, column) of every set bit, lowest first
+	"""
+
+	while mask:
+		low = mask & -mask
+		index = low.bit_length() - 1
+		yield divmod(index, columns)
+		mask ^= low
+
+
+def cell_value(ships, shots, index):
+	"""
+	Grid value of a cell: 0 water, 1 miss, 2 ship, 3 hit
+	"""
+
+	return ((ships >> index) & 1) * 2 + ((shots >> index) & 1)
+
+
+class RowView:
+	"""
+	Read-only view of one grid row
+	"""
+
+	def __init__(self, board, row):
+		self.board = board
+		self.row = row
+
+	def __len__(self):
+		return self.board.columns
+
+	def __getitem__(self, column):
+		if column < 0:
+			column += self.board.columns
+		if not 0 <= column < self.board.columns:
+			raise IndexError("column out of range")
+		board = self.board
+		return cell_value(board.ships, board.hits | board.misses, self.row * board.columns + column)
+
+	def __iter__(self):
+		board = self.board
+		ships = board.ships >> (self.row * board.columns)
+		shots = (board.hits | board.misses) >> (self.row * board.columns)
+		for column in range(board.columns):
+			yield cell_value(ships, shots, column)
+
+	def __eq__(self, other):
+		return list(self) == list(other)
+
+	def __repr__(self):
+		return repr(list(self))
+
+
+class GridView:
+	"""
+	Read-only list-of-lists view over a bitboard, so code written against
+	the old player_grid / computer_grid lists keeps working
+	"""
+
+	def __init__(self, board):
+		self.board = board
+
+	def __len__(self):
+		return self.board.rows
+
+	def __getitem__(self, row):
+		if row < 0:
+			row += self.board.rows
+		if not 0 <= row < self.board.rows:
+			raise IndexError("row out of range")
+		return RowView(self.board, row)
+
+	def __iter__(self):
+		for row in range(self.board.rows):
+			yield RowView(self.board, row)
+
+	def __eq__(self, other):
+		return [list(row) for row in self] == [list(row) for row in other]
+
+	def __repr__(self):
+		return repr([list(row) for row in self])
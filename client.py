@@ -0,0 +1,323 @@
+"""
+Network client for server.py
+
+RemoteGame stands in for engine.Game when the window plays on a server.
+The user's own board is a local engine board, so placing ships and taking
+shots look the same as in a local game. The opponent's board is a
+MirrorBoard that only knows what the user's shots found. The opponent's
+moves arrive through RemoteOpponent.choose_async, the same way a background
+AI's moves do, and the answers to the user's shots through
+RemoteGame.fire_async, so the window keeps drawing while it waits.
+"""
+
+import collections
+import concurrent.futures
+import queue
+import socket
+import threading
+from array import array
+
+import engine
+from engine import USER, COMPUTER, MISS, HIT
+
+# Seconds to wait for the server to answer a command
+TIMEOUT = 30.0
+
+
+class ServerError(Exception):
+	"""
+	The server went away, did not answer or answered out of turn
+	"""
+
+
+class CommandError(ServerError):
+	"""
+	The server answered a command with an error line
+	"""
+
+
+class Connection:
+	"""
+	Line-based connection to the server. A reader thread sorts incoming
+	lines: the opponent's shots go to incoming and everything else to
+	replies. The end of the game goes to both, since it can come while the
+	opponent is waited on (they left) or as the answer to a shot. Notices
+	that can come at any time (the opponent joined, the game started) are
+	dropped, nothing waits on them: a shot fired too early is simply refused.
+	"""
+
+	NOTICES = ("joined", "start")
+
+	def __init__(self, host, port):
+		self.socket = socket.create_connection((host, port), timeout=TIMEOUT)
+		self.socket.settimeout(None)
+		self.file = self.socket.makefile("r", encoding="utf-8", newline="\n")
+		self.replies = queue.Queue()
+		self.incoming = queue.Queue()
+		self.reader = threading.Thread(target=self.read, daemon=True)
+		self.reader.start()
+
+	def read(self):
+		try:
+			for line in self.file:
+				words = line.split()
+				if not words:
+					continue
+				if words[0] in ("incoming", "over"):
+					self.incoming.put(words)
+				if words[0] != "incoming" and words[0] not in self.NOTICES:
+					self.replies.put(words)
+		except (OSError, ValueError):
+			pass
+		self.file.close()
+		# Wake up anyone waiting
+		self.replies.put(None)
+		self.incoming.put(None)
+
+	def send(self, *words):
+		self.socket.sendall((" ".join(str(word) for word in words) + "\n").encode())
+
+	def reply(self, *expected):
+		"""
+		The next reply, which has to start with one of the expected words
+		"""
+
+		try:
+			words = self.replies.get(timeout=TIMEOUT)
+		except queue.Empty:
+			raise ServerError("no answer from the server") from None
+		if words is None:
+			raise ServerError("connection closed")
+		if words[0] == "error":
+			raise CommandError(" ".join(words[1:]))
+		if expected and words[0] not in expected:
+			raise ServerError("unexpected reply: " + " ".join(words))
+		return words
+
+	def close(self):
+		try:
+			self.send("quit")
+			# Ends the reader thread, which closes the file
+			self.socket.shutdown(socket.SHUT_RDWR)
+		except OSError:
+			pass
+		self.socket.close()
+
+
+class MirrorBoard:
+	"""
+	The opponent's board as far as the user knows it: the result of each
+	shot fired at it. Enough of the Board interface for the window.
+	"""
+
+	def __init__(self, rows, columns, fleet):
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		self.grid = [[engine.WATER] * columns for row in range(rows)]
+		self.shots = dict()
+		self.ship_coords = dict()
+		self.health = dict(self.fleet)
+		self.placements = dict()
+		self.ships_remaining = len(self.fleet)
+
+	def mark(self, row, column, result, sunk=None):
+		"""
+		Record what a shot found, and the ship it sank if any
+		"""
+
+		self.grid[row][column] = result
+		self.shots[(row, column)] = result
+		if sunk is not None:
+			self.health[sunk] = 0
+			self.ships_remaining -= 1
+
+	def marked_cells(self):
+		for (row, column), value in self.shots.items():
+			yield row, column, value
+
+	def all_sunk(self):
+		return self.ships_remaining == 0
+
+
+class RemoteOpponent:
+	"""
+	The other side of a remote game, as a strategy whose choose_async()
+	resolves when the server reports the opponent's next shot. If the game
+	ends instead (the opponent left), end is called with the "over" reply
+	and choose() returns None.
+	"""
+
+	name = "remote"
+
+	def __init__(self, connection, end):
+		self.connection = connection
+		self.end = end
+		self.background = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+		# Words of shots handed out by choose() and not applied yet
+		self.shots = collections.deque()
+
+	def choose(self):
+		words = self.connection.incoming.get()
+		if words is None:
+			raise ServerError("connection closed")
+		if words[0] == "over":
+			self.end(words)
+			return None
+		self.shots.append(words)
+		return int(words[1]), int(words[2])
+
+	def choose_async(self):
+		return self.background.submit(self.choose)
+
+	def observe(self, row, column, result, sunk=0):
+		pass
+
+
+class RemoteGame:
+	"""
+	A game played on a server, with the parts of engine.Game the window uses.
+	mode is "ai" (against the server's AI, strategy picks which), "pvp" to
+	host a game for someone to join, or "join" with the game id to join.
+	"""
+
+	def __init__(self, host, port=None, mode="ai", game_id=None, strategy=None):
+		if port is None:
+			host, _, port = host.rpartition(":")
+		self.connection = Connection(host or "127.0.0.1", int(port))
+		hello = self.connection.reply("hello")
+		self.rows = int(hello[1])
+		self.columns = int(hello[2])
+		self.fleet = engine.parse_fleet(" ".join(hello[3:]))
+		self.names = list(self.fleet)
+
+		self.player = engine.new_board(self.rows, self.columns, self.fleet)
+		self.computer = MirrorBoard(self.rows, self.columns, self.fleet)
+		self.winner = None
+		self.sink_listeners = []
+		self.history = array("I")
+		self.computer_strategy = RemoteOpponent(self.connection, self.end)
+		# Waits for the answers to the user's shots, see fire_async
+		self.background = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+		self.rng = None
+
+		if mode == "join":
+			self.connection.send("join", game_id)
+		elif mode == "pvp":
+			self.connection.send("new", "pvp")
+		else:
+			self.connection.send("new", "ai", *([strategy] if strategy else []))
+		self.id = int(self.connection.reply("game")[1])
+		# The host moves first
+		self.moves_first = mode != "join"
+
+	def board(self, player):
+		return self.player if player == USER else self.computer
+
+	def target(self, player):
+		return self.computer if player == USER else self.player
+
+	def computer_place_ships(self):
+		"""
+		Send the user's fleet, placed locally, and say we are ready. The
+		opponent's ships stay unknown.
+		"""
+
+		for i, ship in enumerate(self.names):
+			self.connection.send("place", i, *self.player.placements[ship])
+			self.connection.reply("placed")
+		self.connection.send("ready")
+
+	def end(self, words):
+		"""
+		An "over" reply: set the winner
+		"""
+
+		self.winner = USER if words[1] == "win" else COMPUTER
+
+	def shoot(self, player, row, column):
+		"""
+		Fire the user's shot on the server and wait for the answer. Returns
+		MISS or HIT, or None if the server refused it (not started, not our
+		turn, already fired there). Raises ServerError if the connection is
+		lost.
+		"""
+
+		self.connection.send("fire", row, column)
+		return self.finish_shot(row, column, self.answer())
+
+	def fire_async(self, row, column):
+		"""
+		Send the user's shot without waiting. Returns a future of the
+		server's answer, to hand to finish_shot once it is done.
+		"""
+
+		self.connection.send("fire", row, column)
+		return self.background.submit(self.answer)
+
+	def answer(self):
+		"""
+		Wait for the answer to a shot: (reply, the "over" that follows a
+		shot sinking the last ship or None), or None if the shot was refused
+		"""
+
+		try:
+			words = self.connection.reply("fired", "over")
+		except CommandError:
+			return None
+		if words[0] == "fired" and len(words) > 5 and self.computer.ships_remaining == 1:
+			return words, self.connection.reply("over")
+		return words, None
+
+	def finish_shot(self, row, column, answer):
+		"""
+		Apply the answer to the user's shot at (row, column). Returns MISS or
+		HIT, or None if the shot was refused or the game ended without it.
+		"""
+
+		if answer is None:
+			return None
+		words, over = answer
+		if words[0] == "over":
+			# The opponent left
+			self.end(words)
+			return None
+
+		result = HIT if words[3] == "hit" else MISS
+		ship = self.names[int(words[5])] if len(words) > 5 else None
+		self.computer.mark(row, column, result, ship)
+		self.history.append((row * self.columns + column) * 2)
+		if ship is not None:
+			for listener in self.sink_listeners:
+				listener(USER, ship, row, column)
+		if over is not None:
+			self.end(over)
+		return result
+
+	def strategy_shot(self, player, strategy, row, column):
+		"""
+		Apply the opponent's shot, already resolved on the server, to the
+		user's board. The "over" after the last ship sinks comes in the same
+		write as the shot, so it is already there to read.
+		"""
+
+		words = strategy.shots.popleft()
+		if (int(words[1]), int(words[2])) != (row, column):
+			raise ServerError("shot at %d %d does not match the server's %s %s" % (row, column, words[1], words[2]))
+		result = self.player.fire(row, column)
+		self.history.append((row * self.columns + column) * 2 + 1)
+		ship = self.player.check_sink(row, column) if result == HIT else None
+		if ship is not None:
+			for listener in self.sink_listeners:
+				listener(COMPUTER, ship, row, column)
+			if self.player.all_sunk():
+				self.end(self.connection.reply("over"))
+		return result
+
+	def check_sink(self, row, column, player):
+		return self.target(player).check_sink(row, column) if player == COMPUTER else None
+
+	def close(self):
+		self.connection.close()
+		self.background.shutdown(wait=False)
+		self.computer_strategy.background.shutdown(wait=False)
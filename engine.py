@@ -0,0 +1,737 @@
+"""
+Headless Battleship rules engine
+
+Everything here is plain Python: no arcade, pyglet or PIL, so games can be
+simulated on a machine without a display. The arcade window in window.py
+is a view over a Game object from this module.
+"""
+
+import collections.abc
+import random
+from array import array
+
+import bitboard
+import placement
+
+# Cell values (also the index into the window's texture list) and orientations
+from bitboard import WATER, MISS, SHIP, HIT, HORIZONTAL, VERTICAL
+
+# Default board size
+ROW_COUNT = 10
+COLUMN_COUNT = 10
+
+# Boards with more cells than this use SparseBoard and SparseShotPool
+SPARSE_CELLS = 64 * 64
+
+# Ship ids are stored as int8, 0 meaning no ship
+MAX_SHIPS = 127
+
+# Player identifiers, same values as the window's USER / COMPUTER states
+USER = 5
+COMPUTER = 6
+
+# Define the ship names
+ships_lengths = {"Aircraft Carrier":5,
+		 "Battleship":4,
+		 "Submarine":3,
+		 "Destroyer":3,
+		 "PT Boat":2}
+
+
+def ship_cells(row, column, length, orientation):
+	"""
+	List the (row, column) cells covered by a ship
+	"""
+
+	if orientation == HORIZONTAL:
+		return [(row, column + i) for i in range(length)]
+	return [(row + i, column) for i in range(length)]
+
+
+class ShotPool:
+	"""
+	Cells that have not been shot at yet, as bit indices.
+
+	Kept as a list plus a position table so a random draw and the removal of
+	a shot cell are both O(1) (swap with the last entry and pop).
+	"""
+
+	def __init__(self, size):
+		self.cells = list(range(size))
+		self.position = list(range(size))
+
+	def __len__(self):
+		return len(self.cells)
+
+	def __contains__(self, cell):
+		return self.position[cell] >= 0
+
+	def remove(self, cell):
+		"""
+		Take a cell out of the pool
+		"""
+
+		i = self.position[cell]
+		if i < 0:
+			return
+		last = self.cells.pop()
+		if last != cell:
+			self.cells[i] = last
+			self.position[last] = i
+		self.position[cell] = -1
+
+	def draw(self, rng=random):
+		"""
+		A uniformly random untargeted cell
+		"""
+
+		return self.cells[rng.randrange(len(self.cells))]
+
+
+class SparseShotPool:
+	"""
+	ShotPool for large boards.
+
+	The pool is a Fisher-Yates shuffle of range(size) that only stores the
+	entries that have moved, so it starts empty and grows with the shots
+	fired instead of the board area. Draws and removals are still O(1).
+	"""
+
+	def __init__(self, size):
+		self.size = size
+		# position -> cell and cell -> position, only where they differ;
+		# removed cells have position -1
+		self.cells = dict()
+		self.position = dict()
+
+	def __len__(self):
+		return self.size
+
+	def __contains__(self, cell):
+		return 0 <= self.position.get(cell, cell) < self.size
+
+	def _set(self, i, cell):
+		if i == cell:
+			self.cells.pop(i, None)
+			self.position.pop(cell, None)
+		else:
+			self.cells[i] = cell
+			self.position[cell] = i
+
+	def remove(self, cell):
+		"""
+		Take a cell out of the pool
+		"""
+
+		i = self.position.get(cell, cell)
+		if not 0 <= i < self.size:
+			return
+		self.size -= 1
+		last = self.cells.pop(self.size, self.size)
+		if last != cell:
+			self._set(i, last)
+		self.position[cell] = -1
+
+	def draw(self, rng=random):
+		"""
+		A uniformly random untargeted cell
+		"""
+
+		i = rng.randrange(self.size)
+		return self.cells.get(i, i)
+
+
+def new_pool(size):
+	"""
+	A pool of untargeted cells, sparse for large boards
+	"""
+
+	return SparseShotPool(size) if size > SPARSE_CELLS else ShotPool(size)
+
+
+class ShipCoordsView(collections.abc.Mapping):
+	"""
+	Read-only (row, column) -> ship name view of a board's ship-id map, so
+	code written against the old ship_coords dicts keeps working
+	"""
+
+	__slots__ = ("board",)
+
+	def __init__(self, board):
+		self.board = board
+
+	def __getitem__(self, cell):
+		board = self.board
+		try:
+			row, column = cell
+		except (TypeError, ValueError):
+			raise KeyError(cell) from None
+		if not (0 <= row < board.rows and 0 <= column < board.columns):
+			raise KeyError(cell)
+		ship = board.ship_id(row * board.columns + column)
+		if not ship:
+			raise KeyError(cell)
+		return board.names[ship]
+
+	def __iter__(self):
+		return self.board.occupied()
+
+	def __len__(self):
+		return sum(1 for cell in self.board.occupied())
+
+	def __repr__(self):
+		return repr(dict(self))
+
+
+class HealthView(collections.abc.Mapping):
+	"""
+	Ship name -> cells left afloat, a view of a board's health array
+	"""
+
+	__slots__ = ("board",)
+
+	def __init__(self, board):
+		self.board = board
+
+	def __getitem__(self, ship):
+		return self.board.ship_health[self.board.ids[ship]]
+
+	def __setitem__(self, ship, health):
+		self.board.ship_health[self.board.ids[ship]] = health
+
+	def __iter__(self):
+		return iter(self.board.ids)
+
+	def __len__(self):
+		return len(self.board.ids)
+
+	def __repr__(self):
+		return repr(dict(self))
+
+
+def fleet_ids(fleet):
+	"""
+	Ship ids for a fleet: names indexed by id, id by name and the starting
+	health array, all with id 0 left for "no ship"
+	"""
+
+	names = [None] + list(fleet)
+	ids = {ship: i for i, ship in enumerate(names) if i}
+	return names, ids, array("h", [0] + list(fleet.values()))
+
+
+class Board:
+	"""
+	One side of the game: where each ship sits and which cells have been shot.
+
+	The board is a bitboard (see bitboard.py) with separate masks for ships,
+	hits and misses. grid is a read-only list-of-lists view of it. untargeted
+	is the pool of cells not shot at yet and ships_remaining counts ships
+	still afloat, so shot selection, sink and win checks are constant time.
+
+	Which ship sits on each cell is a flat int8 array of ship ids, and the
+	cells each ship has left afloat a small array indexed by id, so a hit
+	costs two array lookups. ship_coords and health are dict-like views of
+	them for older code.
+	"""
+
+	def __init__(self, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths):
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		if len(self.fleet) > MAX_SHIPS:
+			raise ValueError("at most %d ships per board" % MAX_SHIPS)
+		self.ships = 0
+		self.hits = 0
+		self.misses = 0
+		self.ship_masks = dict()
+		# Ship name -> (row, column, orientation) it was placed at
+		self.placements = dict()
+		self.names, self.ids, self.ship_health = fleet_ids(self.fleet)
+		self.ship_ids = array("b", bytes(rows * columns))
+		self.ship_coords = ShipCoordsView(self)
+		self.health = HealthView(self)
+		self.ships_remaining = 0
+		self.untargeted = ShotPool(rows * columns)
+		self.grid = bitboard.GridView(self)
+
+	def can_place(self, row, column, length, orientation):
+		"""
+		Checks if a ship is within the grid and doesn't collide with another ship
+		"""
+
+		if not bitboard.in_bounds(row, column, length, orientation, self.rows, self.columns):
+			return False
+		return not self.ships & bitboard.ship_mask(row, column, length, orientation, self.columns)
+
+	def ship_mask(self, ship):
+		"""
+		Bitboard mask of a placed ship
+		"""
+
+		return self.ship_masks[ship]
+
+	def ship_id(self, index):
+		"""
+		Id of the ship on a cell index, 0 for none
+		"""
+
+		return self.ship_ids[index]
+
+	def occupied(self):
+		"""
+		Yield the (row, column) of every ship cell
+		"""
+
+		return bitboard.iter_cells(self.ships, self.columns)
+
+	def value(self, row, column):
+		"""
+		Grid value of one cell
+		"""
+
+		return bitboard.cell_value(self.ships, self.hits | self.misses, row * self.columns + column)
+
+	def marked_cells(self):
+		"""
+		Yield (row, column, value) for every cell that is not untouched water
+		"""
+
+		shots = self.hits | self.misses
+		for row, column in bitboard.iter_cells(self.ships | shots, self.columns):
+			yield row, column, self.value(row, column)
+
+	def place(self, ship, row, column, orientation):
+		"""
+		Place a named ship if the position is valid, returns the covered cells or None
+		"""
+
+		length = self.fleet[ship]
+		if not bitboard.in_bounds(row, column, length, orientation, self.rows, self.columns):
+			return None
+		mask = bitboard.ship_mask(row, column, length, orientation, self.columns)
+		if self.ships & mask:
+			return None
+
+		self.ships |= mask
+		self.ship_masks[ship] = mask
+		self.placements[ship] = (row, column, orientation)
+		self.ships_remaining += 1
+		cells = ship_cells(row, column, length, orientation)
+		ship_id = self.ids[ship]
+		for r, c in cells:
+			self.ship_ids[r * self.columns + c] = ship_id
+		return cells
+
+	def place_randomly(self, rng=random, uniform=False):
+		"""
+		Generate random but valid positions for every ship in the fleet.
+
+		Ships are drawn from precomputed tables of legal placements, about one
+		draw per ship (see placement.random_layout). With uniform=True the
+		whole layout is sampled exactly uniformly instead.
+		"""
+
+		lengths = list(self.fleet.values())
+		if uniform:
+			layout = placement.uniform_layout(self.rows, self.columns, lengths, rng)
+		else:
+			layout = placement.random_layout(self.rows, self.columns, lengths, rng)
+
+		for ship, (mask, row, column, orientation) in zip(self.fleet, layout):
+			self.place(ship, row, column, orientation)
+
+	def fire(self, row, column):
+		"""
+		Fire at a cell. Returns the new cell value (MISS or HIT), or None if
+		the cell was already targeted.
+		"""
+
+		index = row * self.columns + column
+		bit = 1 << index
+		if (self.hits | self.misses) & bit:
+			return None
+		self.untargeted.remove(index)
+
+		if not self.ships & bit:
+			self.misses |= bit
+			return MISS
+
+		self.hits |= bit
+		ship = self.ship_ids[index]
+		self.ship_health[ship] -= 1
+		if not self.ship_health[ship]:
+			self.ships_remaining -= 1
+		return HIT
+
+	def check_sink(self, row, column):
+		"""
+		Returns the name of the ship at (row, column) if it has been sunk, otherwise None
+		"""
+
+		ship = self.ship_ids[row * self.columns + column]
+		if ship and not self.ship_health[ship]:
+			return self.names[ship]
+		return None
+
+	def all_sunk(self):
+		"""
+		True once every placed ship on this board has been sunk
+		"""
+
+		return self.ships_remaining == 0
+
+
+class SparseRowView(bitboard.RowView):
+	"""
+	RowView over a SparseBoard
+	"""
+
+	def __getitem__(self, column):
+		if column < 0:
+			column += self.board.columns
+		if not 0 <= column < self.board.columns:
+			raise IndexError("column out of range")
+		return self.board.value(self.row, column)
+
+	def __iter__(self):
+		for column in range(self.board.columns):
+			yield self.board.value(self.row, column)
+
+
+class SparseGridView(bitboard.GridView):
+	"""
+	GridView over a SparseBoard
+	"""
+
+	def __getitem__(self, row):
+		if row < 0:
+			row += self.board.rows
+		if not 0 <= row < self.board.rows:
+			raise IndexError("row out of range")
+		return SparseRowView(self.board, row)
+
+	def __iter__(self):
+		for row in range(self.board.rows):
+			yield SparseRowView(self.board, row)
+
+
+class SparseBoard:
+	"""
+	Board for large grids, with the same interface as Board.
+
+	Instead of masks with one bit per cell it keeps the ship id on each
+	occupied cell index and the result of each shot in dicts, and untargeted
+	is a SparseShotPool. Memory and the cost of placing, firing and checking for
+	a sink or a win depend on the fleet and the shots fired, not on the area.
+	"""
+
+	def __init__(self, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths):
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		self.names, self.ids, self.ship_health = fleet_ids(self.fleet)
+		# Cell index -> ship id, for occupied cells only
+		self.ship_ids = dict()
+		self.ship_cells = dict()
+		self.placements = dict()
+		# Cell index -> MISS or HIT
+		self.shots = dict()
+		self.ship_coords = ShipCoordsView(self)
+		self.health = HealthView(self)
+		self.ships_remaining = 0
+		self.untargeted = SparseShotPool(rows * columns)
+		self.grid = SparseGridView(self)
+
+	def can_place(self, row, column, length, orientation):
+		"""
+		Checks if a ship is within the grid and doesn't collide with another ship
+		"""
+
+		if not bitboard.in_bounds(row, column, length, orientation, self.rows, self.columns):
+			return False
+		return not any(r * self.columns + c in self.ship_ids for r, c in ship_cells(row, column, length, orientation))
+
+	def place(self, ship, row, column, orientation):
+		"""
+		Place a named ship if the position is valid, returns the covered cells or None
+		"""
+
+		length = self.fleet[ship]
+		if not self.can_place(row, column, length, orientation):
+			return None
+
+		cells = ship_cells(row, column, length, orientation)
+		ship_id = self.ids[ship]
+		for r, c in cells:
+			self.ship_ids[r * self.columns + c] = ship_id
+		self.ship_cells[ship] = cells
+		self.placements[ship] = (row, column, orientation)
+		self.ships_remaining += 1
+		return cells
+
+	def place_randomly(self, rng=random, uniform=False):
+		"""
+		Generate random but valid positions for every ship in the fleet, see
+		placement.sparse_layout
+		"""
+
+		layout = placement.sparse_layout(self.rows, self.columns, list(self.fleet.values()), rng, uniform)
+		for ship, (row, column, orientation) in zip(self.fleet, layout):
+			self.place(ship, row, column, orientation)
+
+	def ship_mask(self, ship):
+		"""
+		Bitboard mask of a placed ship
+		"""
+
+		mask = 0
+		for row, column in self.ship_cells[ship]:
+			mask |= 1 << (row * self.columns + column)
+		return mask
+
+	def ship_id(self, index):
+		"""
+		Id of the ship on a cell index, 0 for none
+		"""
+
+		return self.ship_ids.get(index, 0)
+
+	def occupied(self):
+		"""
+		Yield the (row, column) of every ship cell
+		"""
+
+		for index in self.ship_ids:
+			yield divmod(index, self.columns)
+
+	def value(self, row, column):
+		"""
+		Grid value of one cell
+		"""
+
+		index = row * self.columns + column
+		return (2 if index in self.ship_ids else 0) + (1 if index in self.shots else 0)
+
+	def marked_cells(self):
+		"""
+		Yield (row, column, value) for every cell that is not untouched water
+		"""
+
+		for row, column in self.occupied():
+			yield row, column, self.value(row, column)
+		for index, result in self.shots.items():
+			if result == MISS:
+				yield index // self.columns, index % self.columns, MISS
+
+	def fire(self, row, column):
+		"""
+		Fire at a cell. Returns the new cell value (MISS or HIT), or None if
+		the cell was already targeted.
+		"""
+
+		index = row * self.columns + column
+		if index in self.shots:
+			return None
+		self.untargeted.remove(index)
+
+		ship = self.ship_ids.get(index)
+		if ship is None:
+			self.shots[index] = MISS
+			return MISS
+
+		self.shots[index] = HIT
+		self.ship_health[ship] -= 1
+		if not self.ship_health[ship]:
+			self.ships_remaining -= 1
+		return HIT
+
+	def check_sink(self, row, column):
+		"""
+		Returns the name of the ship at (row, column) if it has been sunk, otherwise None
+		"""
+
+		ship = self.ship_ids.get(row * self.columns + column)
+		if ship and not self.ship_health[ship]:
+			return self.names[ship]
+		return None
+
+	def all_sunk(self):
+		"""
+		True once every placed ship on this board has been sunk
+		"""
+
+		return self.ships_remaining == 0
+
+
+def new_board(rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths, sparse=None):
+	"""
+	A Board, or a SparseBoard when sparse is set or, by default, when the
+	board has more than SPARSE_CELLS cells
+	"""
+
+	if sparse is None:
+		sparse = rows * columns > SPARSE_CELLS
+	return SparseBoard(rows, columns, fleet) if sparse else Board(rows, columns, fleet)
+
+
+def parse_fleet(text):
+	"""
+	Fleet from the command line: "5,4,3,3,2" or "Carrier:5,Cruiser:3".
+	Unnamed ships are called "Ship 1", "Ship 2" and so on.
+	"""
+
+	fleet = dict()
+	for i, item in enumerate(text.split(",")):
+		name, _, length = item.rpartition(":")
+		name = name.strip() or "Ship %d" % (i + 1)
+		if name in fleet:
+			raise ValueError("duplicate ship name %r" % name)
+		fleet[name] = int(length)
+	return fleet
+
+
+class Game:
+	"""
+	Rules for a full game: the user's board, the computer's board and the winner.
+	Large boards get a SparseBoard, see new_board.
+
+	Callbacks in sink_listeners are called as listener(player, ship, row, column)
+	whenever player's shot at (row, column) sinks ship.
+
+	computer_strategy, if set, picks the computer's shots (see ai.py); a
+	strategy has choose() -> (row, column) and observe(row, column, result, sunk),
+	where sunk is the mask of the ship that shot sank or 0.
+
+	history records every shot that landed, in order, as
+	cell index * 2 + 1 if the computer fired it (+ 0 for the user), which is
+	what replay.py stores.
+	"""
+
+	def __init__(self, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths, rng=None, computer_strategy=None):
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		self.rng = rng if rng is not None else random.Random()
+		self.player = new_board(rows, columns, self.fleet)
+		self.computer = new_board(rows, columns, self.fleet)
+		self.winner = None
+		self.sink_listeners = []
+		self.computer_strategy = computer_strategy
+		self.history = array("I")
+
+	def board(self, player):
+		"""
+		The board that belongs to player
+		"""
+
+		return self.player if player == USER else self.computer
+
+	def target(self, player):
+		"""
+		The board that player shoots at
+		"""
+
+		return self.computer if player == USER else self.player
+
+	def computer_place_ships(self):
+		"""
+		Generate random but valid positions for the computer's fleet
+		"""
+
+		self.computer.place_randomly(self.rng)
+
+	def shoot(self, player, row, column):
+		"""
+		Fire a shot for player. Returns the cell value after the shot, or None
+		if the cell was already targeted.
+		"""
+
+		target = self.target(player)
+		result = target.fire(row, column)
+		if result is None:
+			return None
+		self.history.append((row * self.columns + column) * 2 + (player == COMPUTER))
+		if result == HIT:
+			ship = target.check_sink(row, column)
+			if ship is not None:
+				for listener in self.sink_listeners:
+					listener(player, ship, row, column)
+				self.check_win(player)
+		return result
+
+	def take_turn(self, player, strategy):
+		"""
+		Let a strategy pick player's shot, fire it and report back what happened.
+		Returns (row, column, result).
+		"""
+
+		row, column = strategy.choose()
+		return row, column, self.strategy_shot(player, strategy, row, column)
+
+	def strategy_shot(self, player, strategy, row, column):
+		"""
+		Fire a shot a strategy has already chosen (e.g. in the background) and
+		report the outcome back to it. Returns the cell value after the shot.
+		"""
+
+		target = self.target(player)
+		result = self.shoot(player, row, column)
+		sunk = 0
+		if result == HIT:
+			ship = target.check_sink(row, column)
+			if ship is not None:
+				sunk = target.ship_mask(ship)
+		strategy.observe(row, column, result, sunk)
+		return result
+
+	def computer_turn(self):
+		"""
+		Computer turn generator, returns (row, column, result). Uses
+		computer_strategy when set, otherwise a uniformly random untargeted cell.
+		"""
+
+		if self.computer_strategy is not None:
+			return self.take_turn(COMPUTER, self.computer_strategy)
+
+		row, column = divmod(self.player.untargeted.draw(self.rng), self.columns)
+		return row, column, self.shoot(COMPUTER, row, column)
+
+	def check_sink(self, row, column, player):
+		"""
+		If player registered a hit, returns the name of the ship it sank, otherwise None
+		"""
+
+		return self.target(player).check_sink(row, column)
+
+	def check_win(self, player):
+		"""
+		Check if player wins by sinking all of the other side's ships
+		"""
+
+		if self.target(player).ships_remaining == 0:
+			self.winner = player
+			return True
+		return False
+
+
+def play_random_game(rng=None, rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=ships_lengths):
+	"""
+	Play one computer-vs-computer game with random placement and random shots.
+	Returns (winner, number of shots fired by the winner).
+	"""
+
+	rng = rng if rng is not None else random.Random()
+	game = Game(rows, columns, fleet, rng)
+	game.player.place_randomly(rng)
+	game.computer.place_randomly(rng)
+
+	shots = {USER: 0, COMPUTER: 0}
+	player = USER
+	while game.winner is None:
+		row, column = divmod(game.target(player).untargeted.draw(rng), columns)
+		game.shoot(player, row, column)
+		shots[player] += 1
+		player = COMPUTER if player == USER else USER
+
+	return game.winner, shots[game.winner]
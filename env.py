@@ -0,0 +1,288 @@
+"""
+Gym-style environments for training Battleship agents
+
+BattleshipEnv is one board for the agent to clear. VectorEnv steps many
+boards with one call, either in this process or spread over worker
+processes; the worker backend keeps actions, observations, rewards and done
+flags in shared memory so only short commands go through the pipes.
+
+Both follow the gymnasium API without depending on it:
+reset(seed) -> (observation, info)
+step(action) -> (observation, reward, terminated, truncated, info)
+
+An action is a cell index, row * columns + column. An observation is the
+target board as the shooter sees it, in the computer_grid encoding with
+unhit ships shown as water: 0 unknown, 1 miss, 3 hit.
+"""
+
+import multiprocessing
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import engine
+from batch import BatchGames
+from bitboard import MISS, HIT
+
+# Rewards for a shot
+HIT_REWARD = 1.0
+MISS_REWARD = 0.0
+INVALID_REWARD = -1.0
+
+
+def mask_to_array(mask, size):
+	"""
+	Bitboard mask as a flat bool array of size cells
+	"""
+
+	data = np.frombuffer(mask.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+	return np.unpackbits(data, bitorder="little")[:size].astype(bool)
+
+
+class BattleshipEnv:
+	"""
+	Single board environment on top of the rules engine
+	"""
+
+	def __init__(self, rows=engine.ROW_COUNT, columns=engine.COLUMN_COUNT, fleet=engine.ships_lengths, max_steps=None):
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		self.max_steps = max_steps or rows * columns
+		self.rng = np.random.default_rng()
+		self.board = None
+		self.steps = 0
+
+	def observation(self):
+		"""
+		The board as the shooter sees it
+		"""
+
+		size = self.rows * self.columns
+		obs = np.zeros(size, dtype=np.int8)
+		obs[mask_to_array(self.board.misses, size)] = MISS
+		obs[mask_to_array(self.board.hits, size)] = HIT
+		return obs.reshape(self.rows, self.columns)
+
+	def reset(self, seed=None):
+		if seed is not None:
+			self.rng = np.random.default_rng(seed)
+		self.board = engine.Board(self.rows, self.columns, self.fleet)
+		self.board.place_randomly(random.Random(int(self.rng.integers(1 << 63))))
+		self.steps = 0
+		return self.observation(), {}
+
+	def step(self, action):
+		row, column = divmod(int(action), self.columns)
+		self.steps += 1
+		result = self.board.fire(row, column)
+		if result == HIT:
+			reward = HIT_REWARD
+		elif result == MISS:
+			reward = MISS_REWARD
+		else:
+			reward = INVALID_REWARD
+
+		info = {"result": result, "sunk": self.board.check_sink(row, column) if result == HIT else None}
+		terminated = self.board.ships_remaining == 0
+		truncated = not terminated and self.steps >= self.max_steps
+		return self.observation(), reward, terminated, truncated, info
+
+
+class _BatchStepper:
+	"""
+	Runs a BatchGames and writes its results into caller-owned arrays, so the
+	same code fills plain arrays in-process and shared memory in a worker
+	"""
+
+	def __init__(self, n, rows, columns, fleet, max_steps, obs, rewards, terminated, truncated):
+		self.games = BatchGames(n, rows, columns, fleet)
+		self.columns = columns
+		self.max_steps = max_steps
+		self.steps = np.zeros(n, dtype=np.int32)
+		self.obs = obs
+		self.rewards = rewards
+		self.terminated = terminated
+		self.truncated = truncated
+
+	def reset(self, seed=None):
+		if seed is not None:
+			self.games.rng = np.random.default_rng(seed)
+		self.games.reset()
+		self.games.place_random()
+		self.steps[:] = 0
+		self.obs[:] = self.games.observations()
+		self.rewards[:] = 0.0
+		self.terminated[:] = False
+		self.truncated[:] = False
+
+	def step(self, actions):
+		actions = np.asarray(actions)
+		result, sunk = self.games.step(actions // self.columns, actions % self.columns)
+		self.steps += 1
+		self.rewards[:] = np.where(result == HIT, HIT_REWARD, np.where(result == MISS, MISS_REWARD, INVALID_REWARD))
+		self.terminated[:] = self.games.done
+		self.truncated[:] = ~self.games.done & (self.steps >= self.max_steps)
+
+		# Finished boards start a new episode straight away
+		finished = self.terminated | self.truncated
+		if finished.any():
+			self.games.reset(finished)
+			self.games.place_random(finished)
+			self.steps[finished] = 0
+		self.obs[:] = self.games.observations()
+
+
+def _worker(conn, names, start, stop, num_envs, rows, columns, fleet, max_steps):
+	"""
+	Subprocess loop for VectorEnv: owns boards start..stop of the shared buffers
+	"""
+
+	buffers = [shared_memory.SharedMemory(name=name) for name in names]
+	arrays = _shared_arrays(buffers, num_envs, rows, columns)
+	actions, obs, rewards, terminated, truncated = [a[start:stop] for a in arrays]
+	stepper = _BatchStepper(stop - start, rows, columns, fleet, max_steps, obs, rewards, terminated, truncated)
+	try:
+		while True:
+			command, arg = conn.recv()
+			if command == "step":
+				stepper.step(actions)
+			elif command == "reset":
+				stepper.reset(arg)
+			elif command == "close":
+				break
+			conn.send(True)
+	finally:
+		del actions, obs, rewards, terminated, truncated, arrays
+		for buffer in buffers:
+			buffer.close()
+		conn.close()
+
+
+# (dtype, extra shape) of the shared buffers: actions, observations, rewards, terminated, truncated
+_LAYOUT = ((np.int32, ()), (np.int8, None), (np.float32, ()), (np.bool_, ()), (np.bool_, ()))
+
+
+def _shared_arrays(buffers, num_envs, rows, columns):
+	"""
+	NumPy views over the shared buffers
+	"""
+
+	arrays = []
+	for buffer, (dtype, shape) in zip(buffers, _LAYOUT):
+		shape = (num_envs, rows, columns) if shape is None else (num_envs,)
+		arrays.append(np.ndarray(shape, dtype=dtype, buffer=buffer.buf))
+	return arrays
+
+
+class VectorEnv:
+	"""
+	num_envs boards stepped together.
+
+	backend="inprocess" runs them all on one BatchGames. backend="subprocess"
+	splits them over workers processes, each stepping its own slice of the
+	shared buffers. Boards that finish are reset at once, so the observation
+	returned for them is the first one of their next episode.
+
+	Returned arrays are copies unless copy=False, in which case they are views
+	that the next step overwrites.
+	"""
+
+	def __init__(self, num_envs, rows=engine.ROW_COUNT, columns=engine.COLUMN_COUNT, fleet=engine.ships_lengths,
+			backend="inprocess", workers=None, max_steps=None, copy=True):
+		self.num_envs = num_envs
+		self.rows = rows
+		self.columns = columns
+		self.backend = backend
+		self.copy = copy
+		max_steps = max_steps or rows * columns
+		fleet = dict(fleet)
+
+		self.buffers = []
+		self.workers = []
+		if backend == "inprocess":
+			self.actions = np.zeros(num_envs, dtype=np.int32)
+			self.obs = np.zeros((num_envs, rows, columns), dtype=np.int8)
+			self.rewards = np.zeros(num_envs, dtype=np.float32)
+			self.terminated = np.zeros(num_envs, dtype=bool)
+			self.truncated = np.zeros(num_envs, dtype=bool)
+			self.stepper = _BatchStepper(num_envs, rows, columns, fleet, max_steps,
+					self.obs, self.rewards, self.terminated, self.truncated)
+		elif backend == "subprocess":
+			for dtype, shape in _LAYOUT:
+				cells = rows * columns if shape is None else 1
+				size = max(1, num_envs * cells * np.dtype(dtype).itemsize)
+				self.buffers.append(shared_memory.SharedMemory(create=True, size=size))
+			self.actions, self.obs, self.rewards, self.terminated, self.truncated = \
+					_shared_arrays(self.buffers, num_envs, rows, columns)
+
+			workers = min(num_envs, workers or multiprocessing.cpu_count())
+			names = [buffer.name for buffer in self.buffers]
+			bounds = np.linspace(0, num_envs, workers + 1).astype(int)
+			for start, stop in zip(bounds[:-1], bounds[1:]):
+				parent, child = multiprocessing.Pipe()
+				process = multiprocessing.Process(target=_worker, daemon=True,
+						args=(child, names, int(start), int(stop), num_envs, rows, columns, fleet, max_steps))
+				process.start()
+				child.close()
+				self.workers.append((process, parent))
+		else:
+			raise ValueError("unknown backend %r" % backend)
+
+	def _call(self, command, args):
+		"""
+		Send one command per worker and wait for all of them
+		"""
+
+		for (process, conn), arg in zip(self.workers, args):
+			conn.send((command, arg))
+		for process, conn in self.workers:
+			conn.recv()
+
+	def _result(self, array):
+		return array.copy() if self.copy else array
+
+	def reset(self, seed=None):
+		if self.backend == "inprocess":
+			self.stepper.reset(seed)
+		else:
+			seeds = [None if seed is None else seed + i for i in range(len(self.workers))]
+			self._call("reset", seeds)
+		return self._result(self.obs), {}
+
+	def step(self, actions):
+		if self.backend == "inprocess":
+			self.stepper.step(actions)
+		else:
+			self.actions[:] = actions
+			self._call("step", [None] * len(self.workers))
+		return (self._result(self.obs), self._result(self.rewards),
+				self._result(self.terminated), self._result(self.truncated), {})
+
+	def close(self):
+		"""
+		Stop the workers and free the shared buffers
+		"""
+
+		for process, conn in self.workers:
+			try:
+				conn.send(("close", None))
+			except (BrokenPipeError, OSError):
+				pass
+		for process, conn in self.workers:
+			process.join(timeout=5)
+			conn.close()
+		self.workers = []
+
+		self.actions = self.obs = self.rewards = self.terminated = self.truncated = None
+		for buffer in self.buffers:
+			buffer.close()
+			buffer.unlink()
+		self.buffers = []
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
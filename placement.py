@@ -0,0 +1,200 @@
+"""
+Legal-placement tables for ship layouts
+
+Every legal (row, column, orientation) for a ship length on an empty board is
+enumerated once per board size and cached with its bitboard mask. Drawing a
+ship is a random pick from its table and one mask test against the ships
+already placed. A fleet that cannot fit the board raises ValueError instead
+of looping forever.
+
+No index of the placements still legal is kept as ships are placed: on
+the boards the engine plays, updating one costs more than the one or two
+extra draws it would save (see the README for the measurements).
+"""
+
+import random
+
+import bitboard
+from bitboard import HORIZONTAL, VERTICAL
+
+# (rows, columns, length) -> placements
+_placement_cache = dict()
+
+
+def legal_placements(rows, columns, length):
+	"""
+	All placements of a ship on an empty board as (mask, row, column, orientation),
+	built once per board size
+	"""
+
+	key = (rows, columns, length)
+	placements = _placement_cache.get(key)
+	if placements is not None:
+		return placements
+
+	placements = []
+	for orientation in (HORIZONTAL, VERTICAL):
+		for row in range(rows):
+			for column in range(columns):
+				if bitboard.in_bounds(row, column, length, orientation, rows, columns):
+					mask = bitboard.ship_mask(row, column, length, orientation, columns)
+					placements.append((mask, row, column, orientation))
+
+	_placement_cache[key] = placements
+	return placements
+
+
+# Draws from the full table before falling back to the filtered list
+TABLE_TRIES = 16
+
+# Whole-layout attempts before a fleet is taken not to fit the board
+MAX_LAYOUTS = 10000
+
+
+def check_fleet(rows, columns, lengths):
+	"""
+	Raise ValueError for a fleet that cannot fit the board: a ship longer
+	than both sides, or more ship cells than the board has
+	"""
+
+	if any(length > max(rows, columns) or length < 1 for length in lengths):
+		raise ValueError("a ship does not fit on a %dx%d board" % (rows, columns))
+	if sum(lengths) > rows * columns:
+		raise ValueError("the fleet does not fit on a %dx%d board" % (rows, columns))
+
+
+def random_layout(rows, columns, lengths, rng=random):
+	"""
+	Place ships one at a time, each uniform over the placements still legal.
+	Returns a list of (mask, row, column, orientation) in the order of lengths.
+
+	A ship is drawn from its full table until it lands clear of the ships
+	before it, which is uniform over the legal placements. Only when
+	TABLE_TRIES draws in a row collide is the table filtered down to what is
+	still legal, so on an open board no list is ever built. Each ship is
+	uniform given the ships before it, which is not quite uniform over whole
+	layouts; see uniform_layout for that.
+	"""
+
+	check_fleet(rows, columns, lengths)
+	tables = [legal_placements(rows, columns, length) for length in lengths]
+	randrange = rng.randrange
+	for attempt in range(MAX_LAYOUTS):
+		occupied = 0
+		layout = []
+		for table in tables:
+			for i in range(TABLE_TRIES):
+				placement = table[randrange(len(table))]
+				if not placement[0] & occupied:
+					break
+			else:
+				live = [p for p in table if not p[0] & occupied]
+				if not live:
+					# Dead end on a crowded board, start over
+					break
+				placement = live[randrange(len(live))]
+			occupied |= placement[0]
+			layout.append(placement)
+		else:
+			return layout
+	raise ValueError("no layout found for the fleet on a %dx%d board" % (rows, columns))
+
+
+def uniform_layout(rows, columns, lengths, rng=random):
+	"""
+	Exactly uniform sample over all non-overlapping fleet layouts.
+
+	Every ship is drawn independently from its full placement list and the
+	fleet is accepted only if nothing overlaps. Each valid layout is equally
+	likely to come out of one attempt, so the accepted layout is uniform.
+	About two attempts in five succeed for the standard 10x10 fleet. Raises
+	ValueError after MAX_LAYOUTS rejected attempts.
+	"""
+
+	check_fleet(rows, columns, lengths)
+	tables = [legal_placements(rows, columns, length) for length in lengths]
+	randrange = rng.randrange
+	for attempt in range(MAX_LAYOUTS):
+		occupied = 0
+		layout = []
+		for placements in tables:
+			placement = placements[randrange(len(placements))]
+			if occupied & placement[0]:
+				break
+			occupied |= placement[0]
+			layout.append(placement)
+		else:
+			return layout
+	raise ValueError("no layout found for the fleet on a %dx%d board" % (rows, columns))
+
+
+def placement_count(rows, columns, length):
+	"""
+	Number of placements of a ship on an empty board, horizontal then vertical
+	"""
+
+	return rows * max(0, columns - length + 1) + max(0, rows - length + 1) * columns
+
+
+def placement_at(rows, columns, length, i):
+	"""
+	Placement number i in the order of legal_placements, as (row, column,
+	orientation), without building the table
+	"""
+
+	across = max(0, columns - length + 1)
+	horizontal = rows * across
+	if i < horizontal:
+		row, column = divmod(i, across)
+		return row, column, HORIZONTAL
+	row, column = divmod(i - horizontal, columns)
+	return row, column, VERTICAL
+
+
+def placement_cells(row, column, length, orientation, columns):
+	"""
+	Cell indices covered by a placement
+	"""
+
+	step = 1 if orientation == HORIZONTAL else columns
+	start = row * columns + column
+	return range(start, start + step * length, step)
+
+
+# Attempts at one ship before sparse_layout starts the layout over
+MAX_TRIES = 64
+
+
+def sparse_layout(rows, columns, lengths, rng=random, uniform=False):
+	"""
+	Random layout for large, sparsely filled boards, as a list of
+	(row, column, orientation) in the order of lengths.
+
+	Placements are drawn by number from placement_at instead of from a table,
+	and collisions are checked against the set of occupied cells, so the cost
+	depends on the fleet and not on the board area. With uniform=False each
+	ship is redrawn until it fits, like random_layout. With uniform=True a
+	collision rejects the whole fleet, like uniform_layout, and for the same
+	rng the result is the same layout uniform_layout would return.
+	"""
+
+	check_fleet(rows, columns, lengths)
+	counts = [placement_count(rows, columns, length) for length in lengths]
+	tries = 1 if uniform else MAX_TRIES
+	for start in range(MAX_LAYOUTS):
+		occupied = set()
+		layout = []
+		for length, count in zip(lengths, counts):
+			for attempt in range(tries):
+				row, column, orientation = placement_at(rows, columns, length, rng.randrange(count))
+				cells = placement_cells(row, column, length, orientation, columns)
+				if occupied.isdisjoint(cells):
+					break
+			else:
+				# Rejected fleet, or a dead end on a crowded board: start over
+				break
+			occupied.update(cells)
+			layout.append((row, column, orientation))
+		else:
+			return layout
+	raise ValueError("no layout found for the fleet on a %dx%d board" % (rows, columns))
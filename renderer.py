@@ -0,0 +1,193 @@
+"""
+Single-texture board renderer
+
+A board is kept as one NumPy RGBA image: every cell is a WIDTH x HEIGHT
+block of its color from the palette, with MARGIN pixel gaps between cells.
+Changing a cell only repaints its block and records it as dirty. The next
+draw uploads just the dirty sub-rectangles into one GPU texture and draws it
+as a single quad, however many cells the board has. For large boards use
+small cells (down to 1 pixel with no margin) and draw the texture scaled to
+the space available.
+
+The GPU side uses arcade.gl (arcade 2.6 and later) and is only set up on the
+first draw, so the pixel side can be built and benchmarked without a window.
+"""
+
+import numpy as np
+
+# More dirty cells than this in one frame are uploaded as their bounding box
+MAX_REGIONS = 16
+
+VERTEX_SHADER = """
+#version 330
+uniform Projection {
+	uniform mat4 matrix;
+} proj;
+in vec2 in_vert;
+in vec2 in_uv;
+out vec2 uv;
+void main() {
+	gl_Position = proj.matrix * vec4(in_vert, 0.0, 1.0);
+	uv = in_uv;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+uniform sampler2D board;
+in vec2 uv;
+out vec4 fragColor;
+void main() {
+	fragColor = texture(board, uv);
+}
+"""
+
+
+class BoardTexture:
+	"""
+	A rows x columns board drawn from one texture. Cell values index palette,
+	row 0 is the bottom row like the sprite boards.
+	"""
+
+	def __init__(self, rows, columns, palette, width=50, height=50, margin=1, background=(0, 0, 0),
+			left=0, bottom=0, draw_width=None, draw_height=None):
+		self.rows = rows
+		self.columns = columns
+		self.width = width
+		self.height = height
+		self.margin = margin
+		self.palette = np.array([tuple(color[:3]) + (255,) for color in palette], dtype=np.uint8)
+
+		self.pixel_width = (width + margin) * columns + margin
+		self.pixel_height = (height + margin) * rows + margin
+		self.pixels = np.empty((self.pixel_height, self.pixel_width, 4), dtype=np.uint8)
+		self.pixels[:, :] = tuple(background[:3]) + (255,)
+		self.values = np.zeros((rows, columns), dtype=np.int8)
+		self.cells = self.pixel_view()
+		self.cells[:] = self.palette[0]
+
+		# Where on screen the board goes, by default at its pixel size
+		self.left = left
+		self.bottom = bottom
+		self.draw_width = draw_width or self.pixel_width
+		self.draw_height = draw_height or self.pixel_height
+
+		# Dirty cells as (row, column), or True for the whole board
+		self.dirty = True
+		self.texture = None
+		self.program = None
+		self.geometry = None
+
+	def pixel_view(self):
+		"""
+		(rows, columns, height, width, 4) view of pixels without the margins,
+		so whole cells can be painted with one assignment
+		"""
+
+		stride_y, stride_x, channel = self.pixels.strides
+		return np.lib.stride_tricks.as_strided(
+				self.pixels[self.margin:, self.margin:],
+				shape=(self.rows, self.columns, self.height, self.width, 4),
+				strides=(stride_y * (self.height + self.margin), stride_x * (self.width + self.margin),
+						stride_y, stride_x, channel),
+				writeable=True)
+
+	def set_cell(self, row, column, value):
+		"""
+		Show value on one cell
+		"""
+
+		if self.values[row, column] == value:
+			return
+		self.values[row, column] = value
+		self.cells[row, column] = self.palette[value]
+		if self.dirty is not True:
+			if not self.dirty:
+				self.dirty = []
+			self.dirty.append((row, column))
+
+	def set_grid(self, grid):
+		"""
+		Show a whole grid of values (rows x columns), repainting only the
+		cells that changed
+		"""
+
+		grid = np.asarray(grid if isinstance(grid, np.ndarray) else [list(row) for row in grid], dtype=np.int8)
+		changed = grid != self.values
+		if not changed.any():
+			return
+		rows, columns = np.nonzero(changed)
+		self.values[changed] = grid[changed]
+		self.cells[rows, columns] = self.palette[grid[changed]][:, None, None, :]
+		if self.dirty is True or len(rows) > MAX_REGIONS:
+			self.dirty = True
+		else:
+			self.dirty = (self.dirty or []) + list(zip(rows.tolist(), columns.tolist()))
+
+	def take_dirty(self):
+		"""
+		The pixel rectangles to upload as (x, y, width, height), and clear them.
+		A few dirty cells are uploaded one by one, many as their bounding box.
+		"""
+
+		dirty, self.dirty = self.dirty, None
+		if not dirty:
+			return []
+		if dirty is True:
+			return [(0, 0, self.pixel_width, self.pixel_height)]
+
+		step_x = self.width + self.margin
+		step_y = self.height + self.margin
+		if len(dirty) <= MAX_REGIONS:
+			return [(self.margin + column * step_x, self.margin + row * step_y, self.width, self.height)
+					for row, column in dirty]
+
+		rows = [row for row, column in dirty]
+		columns = [column for row, column in dirty]
+		x = self.margin + min(columns) * step_x
+		y = self.margin + min(rows) * step_y
+		return [(x, y, (max(columns) - min(columns) + 1) * step_x - self.margin,
+				(max(rows) - min(rows) + 1) * step_y - self.margin)]
+
+	def region(self, x, y, width, height):
+		"""
+		Contiguous bytes of one pixel rectangle, as the texture upload wants them
+		"""
+
+		return np.ascontiguousarray(self.pixels[y:y + height, x:x + width]).tobytes()
+
+	def upload(self):
+		"""
+		Write the dirty rectangles into the GPU texture
+		"""
+
+		if self.texture is None:
+			self.create()
+		for x, y, width, height in self.take_dirty():
+			self.texture.write(self.region(x, y, width, height), viewport=(x, y, width, height))
+
+	def create(self):
+		"""
+		Set up the texture, shader and quad, needs an open window
+		"""
+
+		# Imported here so the pixel side works without a display
+		import arcade
+		from arcade.gl import geometry
+
+		ctx = arcade.get_window().ctx
+		self.texture = ctx.texture((self.pixel_width, self.pixel_height), components=4,
+				filter=(ctx.NEAREST, ctx.NEAREST))
+		self.program = ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+		self.program["board"] = 0
+		self.geometry = geometry.screen_rectangle(self.left, self.bottom, self.draw_width, self.draw_height)
+		self.dirty = True
+
+	def draw(self):
+		"""
+		Upload what changed and draw the board
+		"""
+
+		self.upload()
+		self.texture.use(0)
+		self.geometry.render(self.program)
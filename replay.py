@@ -0,0 +1,400 @@
+"""
+Compact binary game replays
+
+A replay file is a header followed by one record per game. The header holds
+the board size and the fleet, which every game in the file shares. A record
+holds the game's seed and index, the winner, where both sides placed each
+ship and every shot in the order it was fired. Cells are packed into the
+fewest bytes that fit the board, one byte per shot up to 11x11.
+
+ReplayFile memory-maps a file and walks its records without reading the rest
+into memory, so millions of games can be scanned for analysis. Any replay
+can be turned back into an engine.Game at any point of the game, with no
+window and no AI involved.
+
+Run with:
+python replay.py games.bsr
+to summarize a file, or
+python replay.py games.bsr --game 12 --shots 40
+to print the boards of one game after its first 40 shots.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import engine
+from engine import USER, COMPUTER
+
+MAGIC = b"BSRP"
+VERSION = 1
+
+# magic, version, bytes per cell, rows, columns, number of ships
+HEADER = struct.Struct("<4sBBIIH")
+# per ship: length, name length, followed by the UTF-8 name
+SHIP = struct.Struct("<IB")
+# seed, game index, winner, number of shots
+RECORD = struct.Struct("<QIBI")
+
+# Seeds a record can hold, an unsigned 64-bit value
+MAX_SEED = (1 << 64) - 1
+
+# Winner codes in a record
+WINNERS = (None, USER, COMPUTER)
+
+# Array type codes for each cell size
+TYPECODES = {1: "B", 2: "H", 4: "I"}
+
+
+def cell_bytes(rows, columns):
+	"""
+	Bytes per stored cell. A cell is stored as index * 2 plus the shooter or
+	the orientation, and the largest value is kept free for unplaced ships.
+	"""
+
+	for size in (1, 2, 4):
+		if rows * columns * 2 < 256 ** size:
+			return size
+	raise ValueError("board too large for a replay")
+
+
+def encode(values, size):
+	"""
+	Little-endian bytes of values, size bytes each
+	"""
+
+	packed = array(TYPECODES[size], values)
+	if sys.byteorder == "big":
+		packed.byteswap()
+	return packed.tobytes()
+
+
+def decode(data, size):
+	"""
+	Sequence of ints from encode's bytes
+	"""
+
+	if size == 1:
+		return data
+	if sys.byteorder == "little":
+		return memoryview(data).cast(TYPECODES[size])
+	values = array(TYPECODES[size], data)
+	values.byteswap()
+	return values
+
+
+def pack_header(rows, columns, fleet):
+	"""
+	File header for a board size and fleet
+	"""
+
+	parts = [HEADER.pack(MAGIC, VERSION, cell_bytes(rows, columns), rows, columns, len(fleet))]
+	for ship, length in fleet.items():
+		name = ship.encode("utf-8")
+		parts.append(SHIP.pack(length, len(name)) + name)
+	return b"".join(parts)
+
+
+def unpack_header(buffer):
+	"""
+	(rows, columns, fleet, bytes per cell, header size) from the start of a file
+	"""
+
+	if len(buffer) < HEADER.size:
+		raise ValueError("not a replay file")
+	magic, version, size, rows, columns, ships = HEADER.unpack_from(buffer, 0)
+	if magic != MAGIC:
+		raise ValueError("not a replay file")
+	if version != VERSION:
+		raise ValueError("unsupported replay version %d" % version)
+
+	offset = HEADER.size
+	fleet = dict()
+	for i in range(ships):
+		length, name_size = SHIP.unpack_from(buffer, offset)
+		offset += SHIP.size
+		fleet[bytes(buffer[offset:offset + name_size]).decode("utf-8")] = length
+		offset += name_size
+	return rows, columns, fleet, size, offset
+
+
+def pack(game, seed=0, index=0):
+	"""
+	One record for a game, finished or not. seed has to be 0 to MAX_SEED.
+	"""
+
+	if not 0 <= seed <= MAX_SEED:
+		raise ValueError("replay seeds are 0 to 2**64 - 1, not %d" % seed)
+	size = cell_bytes(game.rows, game.columns)
+	unplaced = 256 ** size - 1
+	layout = []
+	for board in (game.player, game.computer):
+		for ship in game.fleet:
+			placed = board.placements.get(ship)
+			if placed is None:
+				layout.append(unplaced)
+			else:
+				row, column, orientation = placed
+				layout.append((row * game.columns + column) * 2 + orientation)
+
+	return (RECORD.pack(seed, index, WINNERS.index(game.winner), len(game.history))
+			+ encode(layout, size) + encode(game.history, size))
+
+
+class Replay:
+	"""
+	One recorded game. layout and shots are the stored cell codes, see
+	placements and moves for them decoded.
+	"""
+
+	__slots__ = ("rows", "columns", "fleet", "seed", "index", "winner", "layout", "shots")
+
+	def __init__(self, rows, columns, fleet, seed, index, winner, layout, shots):
+		self.rows = rows
+		self.columns = columns
+		self.fleet = fleet
+		self.seed = seed
+		self.index = index
+		self.winner = winner
+		self.layout = layout
+		self.shots = shots
+
+	def __len__(self):
+		return len(self.shots)
+
+	def placements(self, player):
+		"""
+		Ship name -> (row, column, orientation) for player's fleet, leaving
+		out ships that were never placed
+		"""
+
+		start = 0 if player == USER else len(self.fleet)
+		unplaced = 256 ** cell_bytes(self.rows, self.columns) - 1
+		placed = dict()
+		for ship, code in zip(self.fleet, self.layout[start:start + len(self.fleet)]):
+			if code != unplaced:
+				row, column = divmod(code >> 1, self.columns)
+				placed[ship] = (row, column, code & 1)
+		return placed
+
+	def moves(self):
+		"""
+		Yield (player, row, column) for every shot in order
+		"""
+
+		columns = self.columns
+		for code in self.shots:
+			row, column = divmod(code >> 1, columns)
+			yield COMPUTER if code & 1 else USER, row, column
+
+	def game(self, shots=None):
+		"""
+		The engine.Game after the first shots shots, or at the end. Sink
+		events, the winner and the history are rebuilt along the way.
+		"""
+
+		game = engine.Game(self.rows, self.columns, self.fleet)
+		for player in (USER, COMPUTER):
+			board = game.board(player)
+			for ship, (row, column, orientation) in self.placements(player).items():
+				board.place(ship, row, column, orientation)
+
+		columns = self.columns
+		for code in self.shots[:len(self.shots) if shots is None else shots]:
+			row, column = divmod(code >> 1, columns)
+			game.shoot(COMPUTER if code & 1 else USER, row, column)
+		return game
+
+	def grids(self, shots=None):
+		"""
+		(player grid, computer grid) as lists of lists after the first shots
+		shots, the boards that show_player_board and show_computer_board draw
+		"""
+
+		game = self.game(shots)
+		return [list(row) for row in game.player.grid], [list(row) for row in game.computer.grid]
+
+
+class ReplayWriter:
+	"""
+	Appends game records to a replay file. With append=True an existing
+	file is extended, as long as it is for the same board size and fleet;
+	a record cut short at its end is dropped first.
+	"""
+
+	def __init__(self, path, rows=engine.ROW_COUNT, columns=engine.COLUMN_COUNT, fleet=engine.ships_lengths, append=False):
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		header = pack_header(rows, columns, self.fleet)
+
+		if append and os.path.exists(path) and os.path.getsize(path):
+			with open(path, "rb") as f:
+				existing = f.read(len(header))
+			if existing != header:
+				raise ValueError("%s holds games for another board size or fleet" % path)
+			with ReplayFile(path) as replays:
+				end = replays.end()
+			self.file = open(path, "r+b")
+			self.file.truncate(end)
+			self.file.seek(end)
+		else:
+			self.file = open(path, "wb")
+			self.file.write(header)
+
+	def write(self, game, seed=0, index=0):
+		"""
+		Record one game
+		"""
+
+		if (game.rows, game.columns, game.fleet) != (self.rows, self.columns, self.fleet):
+			raise ValueError("game does not match the replay file's board size and fleet")
+		self.file.write(pack(game, seed, index))
+
+	def write_packed(self, record):
+		"""
+		Record one game already packed with pack(), e.g. in a worker process
+		"""
+
+		self.file.write(record)
+
+	def close(self):
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+class ReplayFile:
+	"""
+	Read-only, memory-mapped replay file. Iterating yields Replay objects;
+	scan() only reads the fixed part of each record and is faster still.
+	A record cut short at the end of the file, by a writer that was killed,
+	is ignored.
+	"""
+
+	def __init__(self, path):
+		self.file = open(path, "rb")
+		try:
+			self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			# Empty file
+			self.file.close()
+			raise ValueError("not a replay file") from None
+		self.rows, self.columns, self.fleet, self.size, self.start = unpack_header(self.map)
+		self.layout_size = 2 * len(self.fleet) * self.size
+		self._offsets = None
+
+	def scan(self):
+		"""
+		Yield (offset, seed, index, winner, shots) for every record
+		"""
+
+		data = self.map
+		end = len(data)
+		offset = self.start
+		unpack = RECORD.unpack_from
+		fixed = RECORD.size + self.layout_size
+		size = self.size
+		while offset + RECORD.size <= end:
+			seed, index, winner, shots = unpack(data, offset)
+			following = offset + fixed + shots * size
+			if following > end:
+				break
+			yield offset, seed, index, WINNERS[winner], shots
+			offset = following
+
+	def end(self):
+		"""
+		Offset just past the last complete record
+		"""
+
+		end = self.start
+		fixed = RECORD.size + self.layout_size
+		for offset, seed, index, winner, shots in self.scan():
+			end = offset + fixed + shots * self.size
+		return end
+
+	def read(self, offset):
+		"""
+		The Replay stored at offset
+		"""
+
+		seed, index, winner, shots = RECORD.unpack_from(self.map, offset)
+		start = offset + RECORD.size
+		middle = start + self.layout_size
+		return Replay(self.rows, self.columns, self.fleet, seed, index, WINNERS[winner],
+				decode(self.map[start:middle], self.size),
+				decode(self.map[middle:middle + shots * self.size], self.size))
+
+	def __iter__(self):
+		for offset, seed, index, winner, shots in self.scan():
+			yield self.read(offset)
+
+	def offsets(self):
+		"""
+		Offset of every record, found on first use
+		"""
+
+		if self._offsets is None:
+			self._offsets = array("Q", (record[0] for record in self.scan()))
+		return self._offsets
+
+	def __len__(self):
+		return len(self.offsets())
+
+	def __getitem__(self, i):
+		return self.read(self.offsets()[i])
+
+	def close(self):
+		self.map.close()
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+def main(argv=None):
+	"""
+	Summarize a replay file, or print one game's boards
+	"""
+
+	parser = argparse.ArgumentParser(description="Summarize or inspect a Battleship replay file.")
+	parser.add_argument("path", help="replay file, e.g. from simulate.py --replay")
+	parser.add_argument("--game", type=int, help="print the boards of this game (its position in the file)")
+	parser.add_argument("--shots", type=int, help="stop after this many shots (default: the end of the game)")
+	args = parser.parse_args(argv)
+
+	with ReplayFile(args.path) as replays:
+		if args.game is not None:
+			player, computer = replays[args.game].grids(args.shots)
+			for name, grid in (("player", player), ("computer", computer)):
+				print(name)
+				for row in reversed(grid):
+					print(" ".join(".o#X"[value] for value in row))
+			return
+
+		games = 0
+		shots = 0
+		wins = {USER: 0, COMPUTER: 0, None: 0}
+		for offset, seed, index, winner, count in replays.scan():
+			games += 1
+			shots += count
+			wins[winner] += 1
+		size = len(replays.map) - replays.start
+		print("%d games on %dx%d, %d shots, %.1f bytes/game" % (games, replays.rows, replays.columns,
+				shots, size / games if games else 0))
+		print("user won %d, computer won %d, unfinished %d" % (wins[USER], wins[COMPUTER], wins[None]))
+
+
+if __name__ == "__main__":
+	main()
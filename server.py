@@ -0,0 +1,710 @@
+"""
+Asyncio Battleship server
+
+Hosts thousands of games at once, human vs computer or human vs human, over
+a plain line-based TCP protocol. Each game is a session.GameSession, a few
+hundred bytes of bitboards with the same rules as engine.Game in the
+window. Each command is one line of space separated words and gets
+its answer in kind:
+
+	(on connect)                 <- hello <rows> <columns> <fleet>
+	new ai [strategy]            <- game <id> ai
+	new pvp                      <- game <id> waiting
+	join <id>                    <- game <id> joined, and the host gets: joined
+	place <ship> <row> <column> <orientation>
+	                             <- placed <ship> <row> <column> <orientation>
+	place random                 <- placed ... for every ship
+	ready                        <- start first | start second, once both sides are ready
+	fire <row> <column>          <- fired <row> <column> hit|miss [sunk <ship>]
+	                                and the opponent gets: incoming <row> <column> hit|miss [sunk <ship>]
+	                             <- over win | over lose | over abandoned, when the game ends
+	ping                         <- pong
+	quit
+	                             <- error <message>, for anything malformed or out of turn
+
+Ships are numbered by their place in the fleet, which hello lists in the
+--fleet format. The host of a game moves first; against the computer that
+is the connecting player.
+
+A connection's commands are handled one at a time, and its next line is
+only read once the answers to the last one are flushed, so a client that
+stops reading stops being served and TCP holds back the rest. A client that
+lets messages pile up past MAX_BUFFER while its opponent plays is dropped.
+Connections with no command for IDLE_TIMEOUT seconds are closed, and
+everything sent to a client in one pass of the event loop goes out in one
+write.
+
+The random and hunt AIs move inline on the event loop, which is the only
+path that keeps move latency predictable. Every other AI is pickled to a
+process pool for each move: a thread would still hold the GIL the event
+loop needs, and slow every other game while it thinks. If the pool fails,
+the move is made inline rather than leaving the game stuck.
+
+Run with:
+python server.py --port 8765
+python server.py load --sessions 1000 --think 0.5
+or
+python battleship.py server --port 8765
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import gc
+import itertools
+import os
+import pickle
+import random
+import sys
+import time
+
+import ai
+import engine
+import session as sessions
+from engine import USER, COMPUTER, HIT
+
+PORT = 8765
+
+# Longest command line accepted, in bytes
+LINE_LIMIT = 256
+
+# Seconds without a command before a connection is closed
+IDLE_TIMEOUT = 300.0
+
+# Bytes queued for a client that is not reading before it is dropped
+MAX_BUFFER = 64 * 1024
+
+MAX_CONNECTIONS = 10000
+
+# Garbage collector thresholds for a long-running server. Thousands of live
+# games make every full collection slow, and the default thresholds run one
+# often enough to show up in the move latency tail.
+GC_THRESHOLDS = (100000, 50, 1000)
+
+# Strategies cheap enough to run on the event loop, others go to the process pool
+INLINE_STRATEGIES = {ai.RandomStrategy.name, ai.HuntStrategy.name}
+
+# The random AI keeps nothing per game: its shots are drawn from the cells
+# the session has not shot at, with the server's generator
+RANDOM_AI = ai.RandomStrategy.name
+
+# Extra constructor arguments for server AIs. The Monte Carlo AI would
+# otherwise start a process pool per game.
+STRATEGY_OPTIONS = {"montecarlo": {"workers": 0}}
+
+
+class ProtocolError(Exception):
+	"""
+	A command that is malformed or out of place, reported back to the client
+	"""
+
+
+def fleet_text(fleet):
+	"""
+	Fleet in the --fleet format, see engine.parse_fleet
+	"""
+
+	return ",".join("%s:%d" % (ship, length) for ship, length in fleet.items())
+
+
+def shot_words(row, column, result, sunk):
+	"""
+	The words after fired / incoming for one shot
+	"""
+
+	words = [row, column, "hit" if result == HIT else "miss"]
+	if sunk is not None:
+		words += ["sunk", sunk]
+	return words
+
+
+class Session(sessions.GameSession):
+	"""
+	One game on the server and the clients playing it: the host plays USER,
+	the guest COMPUTER, and the guest is None when the AI plays that side.
+	strategy is the AI's strategy, or RANDOM_AI, or None for two players.
+	"""
+
+	__slots__ = ("strategy", "host", "guest")
+
+	def __init__(self, rules, id, strategy=None):
+		super().__init__(rules, id)
+		self.strategy = strategy
+		self.host = None
+		self.guest = None
+
+	@property
+	def started(self):
+		return self.ready == 3
+
+	def client(self, player):
+		return self.host if player == USER else self.guest
+
+
+class Client:
+	"""
+	One connection and the side it plays in its session
+	"""
+
+	__slots__ = ("reader", "writer", "session", "player", "closed", "active", "pending")
+
+	def __init__(self, reader, writer):
+		self.reader = reader
+		self.writer = writer
+		self.session = None
+		self.player = None
+		self.closed = False
+		# Event loop time of the last command, for the idle timeout
+		self.active = asyncio.get_running_loop().time()
+		# Lines not written yet, see flush
+		self.pending = []
+
+	def send(self, *words):
+		"""
+		Queue one line for the client. Everything sent to it during one pass
+		of the event loop goes out in a single write.
+		"""
+
+		if self.closed:
+			return
+		if not self.pending:
+			asyncio.get_running_loop().call_soon(self.flush)
+		self.pending.append(" ".join(str(word) for word in words) + "\n")
+
+	def flush(self):
+		"""
+		Write the queued lines. A client that has stopped reading is dropped
+		rather than buffered for without end.
+		"""
+
+		if self.closed or not self.pending:
+			return
+		self.writer.write("".join(self.pending).encode())
+		self.pending = []
+		if self.writer.transport.get_write_buffer_size() > MAX_BUFFER:
+			self.close()
+
+	def close(self):
+		if not self.closed:
+			self.flush()
+			self.closed = True
+			self.writer.close()
+
+
+class Server:
+	"""
+	The game server. start() listens, serve_forever() runs until cancelled.
+	"""
+
+	def __init__(self, host="127.0.0.1", port=PORT, rows=engine.ROW_COUNT, columns=engine.COLUMN_COUNT,
+			fleet=engine.ships_lengths, strategy="density", idle_timeout=IDLE_TIMEOUT,
+			max_connections=MAX_CONNECTIONS, executor=None):
+		self.host = host
+		self.port = port
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		self.names = list(self.fleet)
+		self.rules = sessions.Rules(rows, columns, self.fleet)
+		self.strategy = strategy
+		self.idle_timeout = idle_timeout
+		self.max_connections = max_connections
+		self.own_executor = executor is None
+		# A process pool, see choose_move. Started on the first AI move that needs it.
+		self.executor = executor or concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+		self.rng = random.Random()
+		self.ids = itertools.count(1)
+		self.sessions = dict()
+		self.clients = set()
+		self.server = None
+		self.reaper = None
+
+		self.commands = {"new": self.new_game,
+				"join": self.join,
+				"place": self.place,
+				"ready": self.ready,
+				"fire": self.fire,
+				"ping": self.ping}
+
+	async def start(self):
+		self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=LINE_LIMIT)
+		self.port = self.server.sockets[0].getsockname()[1]
+		self.reaper = asyncio.get_running_loop().create_task(self.reap())
+
+	async def reap(self):
+		"""
+		Close connections idle for longer than idle_timeout. One sweep every
+		so often is much cheaper than a timeout on every read.
+		"""
+
+		loop = asyncio.get_running_loop()
+		while True:
+			await asyncio.sleep(min(self.idle_timeout / 4, 10.0))
+			deadline = loop.time() - self.idle_timeout
+			for client in list(self.clients):
+				if client.active < deadline:
+					client.send("error", "idle timeout")
+					client.close()
+
+	async def serve_forever(self):
+		if self.server is None:
+			await self.start()
+		async with self.server:
+			await self.server.serve_forever()
+
+	def close(self):
+		"""
+		Stop listening, drop every connection and stop the executor if it is ours
+		"""
+
+		if self.server is not None:
+			self.server.close()
+		if self.reaper is not None:
+			self.reaper.cancel()
+		for client in list(self.clients):
+			client.close()
+		if self.own_executor:
+			self.executor.shutdown(wait=False)
+
+	async def handle(self, reader, writer):
+		"""
+		Serve one connection until it quits, goes idle or breaks
+		"""
+
+		client = Client(reader, writer)
+		if len(self.clients) >= self.max_connections:
+			client.send("error", "server full")
+			client.close()
+			return
+
+		self.clients.add(client)
+		client.send("hello", self.rows, self.columns, fleet_text(self.fleet))
+		loop = asyncio.get_running_loop()
+		try:
+			while not client.closed:
+				client.flush()
+				await writer.drain()
+				try:
+					line = await reader.readline()
+				except ValueError:
+					client.send("error", "line too long")
+					break
+				client.active = loop.time()
+				words = line.decode("utf-8", "replace").split()
+				if not line or words[:1] == ["quit"]:
+					break
+				if not words:
+					continue
+
+				handler = self.commands.get(words[0].lower())
+				try:
+					if handler is None:
+						raise ProtocolError("unknown command " + words[0])
+					await handler(client, words[1:])
+				except ProtocolError as e:
+					client.send("error", e)
+		except (ConnectionError, OSError):
+			pass
+		finally:
+			self.leave(client)
+			self.clients.discard(client)
+			client.close()
+
+	def session(self, client, started=None):
+		"""
+		The client's session, checking whether it has started if started is given
+		"""
+
+		session = client.session
+		if session is None:
+			raise ProtocolError("not in a game")
+		if started is True and not session.started:
+			raise ProtocolError("game not started")
+		if started is False and session.started:
+			raise ProtocolError("game already started")
+		return session
+
+	def numbers(self, words, count):
+		try:
+			if len(words) != count:
+				raise ValueError
+			return [int(word) for word in words]
+		except ValueError:
+			raise ProtocolError("expected %d numbers" % count) from None
+
+	async def new_game(self, client, words):
+		if client.session is not None:
+			raise ProtocolError("already in a game")
+		mode = words[0] if words else "ai"
+		if mode not in ("ai", "pvp"):
+			raise ProtocolError("mode is ai or pvp")
+
+		strategy = None
+		if mode == "ai":
+			name = words[1] if len(words) > 1 else self.strategy
+			if name not in ai.STRATEGIES:
+				raise ProtocolError("unknown strategy " + name)
+			if name == RANDOM_AI:
+				strategy = RANDOM_AI
+			else:
+				strategy = ai.STRATEGIES[name](self.rows, self.columns, self.fleet, self.rng,
+						**STRATEGY_OPTIONS.get(name, {}))
+
+		session = Session(self.rules, next(self.ids), strategy)
+		self.sessions[session.id] = session
+		session.host = client
+		client.session = session
+		client.player = USER
+		if strategy is not None:
+			session.place_randomly(COMPUTER, self.rng)
+			session.ready |= 2
+		client.send("game", session.id, mode if strategy is not None else "waiting")
+
+	async def join(self, client, words):
+		if client.session is not None:
+			raise ProtocolError("already in a game")
+		id, = self.numbers(words, 1)
+		session = self.sessions.get(id)
+		if session is None or session.strategy is not None or session.guest is not None:
+			raise ProtocolError("no game %d to join" % id)
+
+		session.guest = client
+		client.session = session
+		client.player = COMPUTER
+		client.send("game", id, "joined")
+		session.host.send("joined")
+
+	async def place(self, client, words):
+		session = self.session(client, started=False)
+		player = client.player
+		if words == ["random"]:
+			if not session.place_randomly(player, self.rng):
+				raise ProtocolError("fleet already placed")
+			for i in range(len(self.names)):
+				client.send("placed", i, *session.placement(player, i))
+			return
+
+		index, row, column, orientation = self.numbers(words, 4)
+		if not 0 <= index < len(self.names) or orientation not in (engine.HORIZONTAL, engine.VERTICAL):
+			raise ProtocolError("no such ship or orientation")
+		if session.placement(player, index) is not None:
+			raise ProtocolError("ship already placed")
+		if session.place(player, index, row, column, orientation) is None:
+			raise ProtocolError("ship does not fit there")
+		client.send("placed", index, row, column, orientation)
+
+	async def ready(self, client, words):
+		session = self.session(client, started=False)
+		if session.placed(client.player) < len(self.names):
+			raise ProtocolError("fleet not placed")
+		session.ready |= 1 if client.player == USER else 2
+		if session.started:
+			for player, other in ((USER, "first"), (COMPUTER, "second")):
+				if session.client(player) is not None:
+					session.client(player).send("start", other)
+
+	async def fire(self, client, words):
+		session = self.session(client, started=True)
+		if session.turn != client.player:
+			raise ProtocolError("not your turn")
+		row, column = self.numbers(words, 2)
+		if not (0 <= row < self.rows and 0 <= column < self.columns):
+			raise ProtocolError("off the board")
+		if self.shot(session, client.player, row, column) is None:
+			raise ProtocolError("already fired there")
+
+		if session.strategy is not None and session.winner is None:
+			await self.computer_turn(session)
+
+	def shot(self, session, player, row, column):
+		"""
+		Fire one shot, tell both sides and end the game if it was the last.
+		Returns (result, sunk) as GameSession.shoot does, or None if the cell
+		was already targeted.
+		"""
+
+		shot = session.shoot(player, row, column)
+		if shot is None:
+			return None
+
+		words = shot_words(row, column, *shot)
+		other = COMPUTER if player == USER else USER
+		if session.client(player) is not None:
+			session.client(player).send("fired", *words)
+		if session.client(other) is not None:
+			session.client(other).send("incoming", *words)
+
+		session.turn = other
+		if session.winner is not None:
+			self.finish(session)
+		return shot
+
+	async def computer_turn(self, session):
+		"""
+		The AI's move, inline if it is cheap and on the process pool if not
+		"""
+
+		strategy = session.strategy
+		if strategy == RANDOM_AI:
+			self.shot(session, COMPUTER, *session.random_shot(COMPUTER, self.rng))
+			return
+		if strategy.name in INLINE_STRATEGIES:
+			row, column = strategy.choose()
+		else:
+			row, column = await self.choose_pooled(strategy)
+			if session.id not in self.sessions:
+				# The player left while the AI was thinking
+				return
+		result, sunk = self.shot(session, COMPUTER, row, column)
+		strategy.observe(row, column, result, 0 if sunk is None else session.ship_mask(USER, sunk))
+
+	async def choose_pooled(self, strategy):
+		"""
+		The AI's move from the process pool. If the pool cannot run it (a
+		worker died, or the strategy would not pickle) the move is chosen
+		inline instead, and a broken pool of our own is replaced.
+		"""
+
+		try:
+			return await asyncio.get_running_loop().run_in_executor(self.executor, choose_move,
+					strategy, self.rng.getrandbits(64))
+		except concurrent.futures.BrokenExecutor:
+			if self.own_executor:
+				self.executor.shutdown(wait=False)
+				self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+		except (pickle.PicklingError, TypeError, AttributeError):
+			pass
+		return strategy.choose()
+
+	async def ping(self, client, words):
+		client.send("pong")
+
+	def finish(self, session, result=None):
+		"""
+		Tell both sides how the game ended and free the session. result
+		overrides win/lose for every side still connected.
+		"""
+
+		for player, client in ((USER, session.host), (COMPUTER, session.guest)):
+			if client is not None:
+				client.send("over", result or ("win" if session.winner == player else "lose"))
+				client.session = None
+				client.player = None
+		self.sessions.pop(session.id, None)
+
+	def leave(self, client):
+		"""
+		A client disconnected, its opponent wins a started game
+		"""
+
+		session = client.session
+		if session is None:
+			return
+		if client.player == USER:
+			session.host = None
+		else:
+			session.guest = None
+		client.session = None
+		self.finish(session, "win" if session.started else "abandoned")
+
+
+def choose_move(strategy, seed):
+	"""
+	Run in a worker process: a copy of the strategy picks the next shot. The
+	copy is thrown away, so its generator is reseeded to avoid picking the
+	same way every move.
+	"""
+
+	strategy.rng.seed(seed)
+	return strategy.choose()
+
+
+def percentile(values, fraction):
+	"""
+	Value at fraction of the way through sorted values
+	"""
+
+	return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def tune_gc():
+	"""
+	Move what is alive now out of the collector's view and collect less often
+	"""
+
+	gc.freeze()
+	gc.set_threshold(*GC_THRESHOLDS)
+
+
+def raise_open_files():
+	"""
+	Lift the soft open-file limit to the hard one for thousands of sockets
+	"""
+
+	try:
+		import resource
+	except ImportError:
+		return
+	soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+	if soft != hard:
+		try:
+			resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+		except (ValueError, OSError):
+			pass
+
+
+async def load_session(host, port, games, strategy, think, seed, latencies, stats):
+	"""
+	One simulated player: play games against the server's AI with random
+	shots, waiting about think seconds between them, and record the time from
+	each fire to the AI's answer
+	"""
+
+	rng = random.Random(seed)
+	reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+	try:
+		words = (await reader.readline()).decode().split(" ", 3)
+		rows, columns = int(words[1]), int(words[2])
+		afloat_cells = sum(engine.parse_fleet(words[3]).values())
+
+		for game in range(games):
+			writer.write(("new ai %s\nplace random\nready\n" % strategy).encode())
+			while not (await reader.readline()).startswith(b"start"):
+				pass
+
+			cells = list(range(rows * columns))
+			rng.shuffle(cells)
+			hits_taken = 0
+			for cell in cells:
+				if think:
+					await asyncio.sleep(rng.uniform(0, 2 * think))
+				start = time.perf_counter()
+				writer.write(b"fire %d %d\n" % divmod(cell, columns))
+				while True:
+					line = await reader.readline()
+					if not line:
+						raise ConnectionError("server closed the connection")
+					if line.startswith(b"error"):
+						stats["errors"] += 1
+						break
+					if line.startswith(b"over"):
+						break
+					if line.startswith(b"incoming"):
+						latencies.append(time.perf_counter() - start)
+						if b" hit" in line:
+							hits_taken += 1
+						if hits_taken == afloat_cells:
+							await reader.readline()
+							line = b"over"
+						break
+				if line.startswith(b"over"):
+					break
+			stats["games"] += 1
+		writer.write(b"quit\n")
+		await writer.drain()
+	except (ConnectionError, OSError):
+		stats["errors"] += 1
+	finally:
+		writer.close()
+
+
+async def load(sessions=1000, games=1, strategy="random", think=0.0, host=None, port=None, connect_rate=2000,
+		**server_options):
+	"""
+	Play sessions concurrent games against a server, one started here on
+	loopback unless host and port are given. Returns a report dict with the
+	p50 / p99 time from a fire command to the AI's answer. With think=0 every
+	session fires as soon as it has its answer, which measures throughput and
+	makes latency mostly queueing; a think time gives latency at a set load.
+	"""
+
+	raise_open_files()
+	tune_gc()
+	server = None
+	if port is None:
+		server = Server("127.0.0.1", 0, **server_options)
+		await server.start()
+		host, port = "127.0.0.1", server.port
+
+	latencies = []
+	stats = {"games": 0, "errors": 0}
+	start = time.perf_counter()
+	tasks = []
+	for i in range(sessions):
+		tasks.append(asyncio.create_task(load_session(host, port, games, strategy, think, i, latencies, stats)))
+		if connect_rate and i % 100 == 99:
+			# Spread the connects out instead of flooding the accept queue
+			await asyncio.sleep(100 / connect_rate)
+	await asyncio.gather(*tasks)
+	elapsed = time.perf_counter() - start
+	if server is not None:
+		server.close()
+
+	latencies.sort()
+	return {"sessions": sessions,
+			"games": stats["games"],
+			"errors": stats["errors"],
+			"moves": len(latencies),
+			"seconds": round(elapsed, 3),
+			"moves_per_sec": round(len(latencies) / elapsed, 1) if elapsed else None,
+			"latency_ms": {"p50": round(percentile(latencies, 0.50) * 1000, 3),
+					"p99": round(percentile(latencies, 0.99) * 1000, 3),
+					"max": round(latencies[-1] * 1000, 3) if latencies else 0.0}}
+
+
+def load_main(argv):
+	"""
+	Command-line entry point of the load generator
+	"""
+
+	import json
+
+	parser = argparse.ArgumentParser(prog="server.py load", description="Load test a Battleship server over loopback.")
+	parser.add_argument("--sessions", type=int, default=1000, help="concurrent connections, each playing against the AI")
+	parser.add_argument("--games", type=int, default=1, help="games per connection")
+	parser.add_argument("--ai", default="random", choices=sorted(ai.STRATEGIES), help="server AI each session plays")
+	parser.add_argument("--think", type=float, default=0.0, help="mean seconds between a session's shots (default: none)")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=None, help="server to test (default: start one in this process)")
+	args = parser.parse_args(argv)
+
+	report = asyncio.run(load(args.sessions, args.games, args.ai, args.think, args.host if args.port else None, args.port))
+	print(json.dumps(report, indent=2))
+
+
+def main(argv=None):
+	"""
+	Command-line entry point: run the server, or the load generator with "load"
+	"""
+
+	argv = argv if argv is not None else sys.argv[1:]
+	if argv[:1] == ["load"]:
+		load_main(argv[1:])
+		return
+
+	parser = argparse.ArgumentParser(description="Serve Battleship games over TCP.")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=PORT)
+	parser.add_argument("--rows", type=int, default=engine.ROW_COUNT)
+	parser.add_argument("--columns", type=int, default=engine.COLUMN_COUNT)
+	parser.add_argument("--fleet", type=engine.parse_fleet, default=engine.ships_lengths,
+			help='ship lengths, e.g. "5,4,3,3,2" or "Carrier:5,Cruiser:3" (default: the standard fleet)')
+	parser.add_argument("--ai", default="density", choices=sorted(ai.STRATEGIES), help="default computer opponent")
+	parser.add_argument("--idle", type=float, default=IDLE_TIMEOUT, help="seconds before an idle connection is closed")
+	parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS)
+	args = parser.parse_args(argv)
+
+	raise_open_files()
+	tune_gc()
+	server = Server(args.host, args.port, args.rows, args.columns, args.fleet, args.ai, args.idle, args.max_connections)
+	print("serving on %s:%d" % (args.host, args.port))
+	try:
+		asyncio.run(server.serve_forever())
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.close()
+
+
+if __name__ == "__main__":
+	main()
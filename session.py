@@ -0,0 +1,241 @@
+"""
+Lean game sessions for hosting many games in one process
+
+A GameSession is one game's rules state and nothing else: no window, no
+sprites, no random generator and no AI. Each board is two bitboards (see
+bitboard.py), the cells with a ship and the cells shot at. Hits are the
+cells in both, misses the cells shot at and not in ships. The fleet layout
+is a few bytes, in the same cell codes replay.py stores. The board size and
+fleet live in a Rules object that every session on a server shares.
+
+A 10x10 session takes about 260 bytes with both fleets placed and about
+340 bytes once the game is over, against about 8 KB for an engine.Game. The size grows with the board area, since
+each mask holds one bit per cell. python bench.py sessions creates a million.
+
+Ships are numbered by their place in the fleet, as in the server protocol.
+"""
+
+import random
+
+import bitboard
+import placement
+import replay
+from bitboard import MISS, HIT, HORIZONTAL, VERTICAL
+from engine import USER, COMPUTER
+
+
+class Rules:
+	"""
+	Board size and fleet, shared by every session played with them
+	"""
+
+	__slots__ = ("rows", "columns", "fleet", "names", "lengths", "size", "unplaced", "empty")
+
+	def __init__(self, rows, columns, fleet):
+		self.rows = rows
+		self.columns = columns
+		self.fleet = dict(fleet)
+		self.names = list(self.fleet)
+		self.lengths = list(self.fleet.values())
+		# Bytes per layout code, and the code of a ship not placed yet
+		self.size = replay.cell_bytes(rows, columns)
+		self.unplaced = 256 ** self.size - 1
+		# Layout of two fleets with nothing placed
+		self.empty = replay.encode([self.unplaced] * (2 * len(self.fleet)), self.size)
+
+	def mask(self, ship, code):
+		"""
+		Bitboard mask of a ship placed at a layout code
+		"""
+
+		row, column = divmod(code >> 1, self.columns)
+		return bitboard.ship_mask(row, column, self.lengths[ship], code & 1, self.columns)
+
+
+class GameSession:
+	"""
+	One game: both boards, the fleet layouts, whose turn it is, the winner
+	and which sides are ready. The turn and ready fields are the host's to
+	use; the session itself only checks the rules of a shot.
+	"""
+
+	__slots__ = ("rules", "id", "player_ships", "player_shots", "computer_ships", "computer_shots",
+			"layout", "turn", "winner", "ready")
+
+	def __init__(self, rules, id=0):
+		self.rules = rules
+		self.id = id
+		self.player_ships = 0
+		self.player_shots = 0
+		self.computer_ships = 0
+		self.computer_shots = 0
+		# Both fleets' layout codes, the user's first, see replay.py
+		self.layout = rules.empty
+		self.turn = USER
+		self.winner = None
+		# Bit 0 for the user, bit 1 for the computer
+		self.ready = 0
+
+	def ships(self, player):
+		"""
+		Mask of the ships on player's board
+		"""
+
+		return self.player_ships if player == USER else self.computer_ships
+
+	def shots(self, player):
+		"""
+		Mask of the cells shot at on player's board
+		"""
+
+		return self.player_shots if player == USER else self.computer_shots
+
+	def code(self, player, ship):
+		"""
+		Layout code of one of player's ships
+		"""
+
+		size = self.rules.size
+		start = ((0 if player == USER else len(self.rules.names)) + ship) * size
+		if size == 1:
+			return self.layout[start]
+		return int.from_bytes(self.layout[start:start + size], "little")
+
+	def placement(self, player, ship):
+		"""
+		(row, column, orientation) of one of player's ships, None if not placed
+		"""
+
+		code = self.code(player, ship)
+		if code == self.rules.unplaced:
+			return None
+		row, column = divmod(code >> 1, self.rules.columns)
+		return row, column, code & 1
+
+	def placed(self, player):
+		"""
+		Number of player's ships on the board
+		"""
+
+		return sum(self.code(player, ship) != self.rules.unplaced for ship in range(len(self.rules.names)))
+
+	def ship_mask(self, player, ship):
+		"""
+		Mask of one of player's placed ships
+		"""
+
+		return self.rules.mask(ship, self.code(player, ship))
+
+	def place(self, player, ship, row, column, orientation):
+		"""
+		Place one of player's ships if it fits and is not placed yet. Returns
+		its mask, or None.
+		"""
+
+		rules = self.rules
+		if self.code(player, ship) != rules.unplaced or orientation not in (HORIZONTAL, VERTICAL):
+			return None
+		if not bitboard.in_bounds(row, column, rules.lengths[ship], orientation, rules.rows, rules.columns):
+			return None
+		mask = bitboard.ship_mask(row, column, rules.lengths[ship], orientation, rules.columns)
+		if self.ships(player) & mask:
+			return None
+
+		if player == USER:
+			self.player_ships |= mask
+		else:
+			self.computer_ships |= mask
+		start = ((0 if player == USER else len(rules.names)) + ship) * rules.size
+		code = ((row * rules.columns + column) * 2 + orientation).to_bytes(rules.size, "little")
+		self.layout = self.layout[:start] + code + self.layout[start + rules.size:]
+		return mask
+
+	def place_randomly(self, player, rng=random, uniform=False):
+		"""
+		Place all of player's fleet at random, as engine.Board.place_randomly
+		does. Returns False if some of it was already placed.
+		"""
+
+		if self.ships(player):
+			return False
+		rules = self.rules
+		if uniform:
+			layout = placement.uniform_layout(rules.rows, rules.columns, rules.lengths, rng)
+		else:
+			layout = placement.random_layout(rules.rows, rules.columns, rules.lengths, rng)
+		for ship, (mask, row, column, orientation) in enumerate(layout):
+			self.place(player, ship, row, column, orientation)
+		return True
+
+	def value(self, player, row, column):
+		"""
+		Grid value of a cell on player's board
+		"""
+
+		return bitboard.cell_value(self.ships(player), self.shots(player), row * self.rules.columns + column)
+
+	def remaining(self, player):
+		"""
+		Number of player's ships still afloat
+		"""
+
+		shots = self.shots(player)
+		return sum(1 for ship in range(len(self.rules.names))
+				if self.code(player, ship) != self.rules.unplaced and self.ship_mask(player, ship) & ~shots)
+
+	def shoot(self, player, row, column):
+		"""
+		Player fires at (row, column) on the other board. Returns (result,
+		sunk): MISS or HIT and the number of the ship it sank or None. Returns
+		None if the cell is off the board or was already shot at. Sinking
+		the last ship makes player the winner.
+		"""
+
+		rules = self.rules
+		if not (0 <= row < rules.rows and 0 <= column < rules.columns):
+			return None
+		target = COMPUTER if player == USER else USER
+		bit = 1 << (row * rules.columns + column)
+		ships = self.ships(target)
+		shots = self.shots(target)
+		if shots & bit:
+			return None
+		shots |= bit
+		if target == USER:
+			self.player_shots = shots
+		else:
+			self.computer_shots = shots
+
+		if not ships & bit:
+			return MISS, None
+		sunk = None
+		for ship in range(len(rules.names)):
+			code = self.code(target, ship)
+			if code != rules.unplaced:
+				mask = rules.mask(ship, code)
+				if mask & bit:
+					if not mask & ~shots:
+						sunk = ship
+					break
+		if sunk is not None and not ships & ~shots:
+			self.winner = player
+		return HIT, sunk
+
+	def random_shot(self, player, rng=random):
+		"""
+		A uniformly random cell player has not shot at yet, as (row, column)
+		"""
+
+		rules = self.rules
+		cells = rules.rows * rules.columns
+		shots = self.shots(COMPUTER if player == USER else USER)
+		# Mostly a few tries, and a walk over the free cells late in a game
+		for attempt in range(8):
+			index = rng.randrange(cells)
+			if not shots >> index & 1:
+				return divmod(index, rules.columns)
+		free = ((1 << cells) - 1) & ~shots
+		skip = rng.randrange(bitboard.popcount(free))
+		for i in range(skip):
+			free &= free - 1
+		return divmod((free & -free).bit_length() - 1, rules.columns)
@@ -0,0 +1,221 @@
+"""
+AI-vs-AI self-play simulator
+
+Plays complete computer-vs-computer games with pluggable shot and placement
+strategies, spread over worker processes. Every game gets its own seeded
+random stream, so a run is reproducible whatever the number of workers.
+
+Run with:
+python simulate.py --games 1000 --a density --b random
+or
+python battleship.py simulate --games 1000 --a density --b random
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import sys
+import time
+
+import ai
+import engine
+import replay
+from engine import USER, COMPUTER
+
+
+def place_random(board, rng):
+	board.place_randomly(rng)
+
+
+def place_uniform(board, rng):
+	board.place_randomly(rng, uniform=True)
+
+
+# Placement strategies by name
+PLACEMENTS = {"random": place_random,
+		"uniform": place_uniform}
+
+# Extra constructor arguments for shot strategies when run inside a worker.
+# The Monte Carlo AI would otherwise start a process pool per game.
+STRATEGY_OPTIONS = {"montecarlo": {"workers": 0}}
+
+
+def game_rng(seed, index):
+	"""
+	Independent random stream for game number index of a run
+	"""
+
+	return random.Random("%d:%d" % (seed, index))
+
+
+def play_game(index, seed, a, b, place_a, place_b, rows, columns, fleet, record=False):
+	"""
+	Play game number index between shot strategies a and b. Side a fires
+	first in even games and side b in odd ones.
+	Returns a dict with the winning side ("a" or "b"), its moves and the shots
+	each side fired, plus the packed replay record under "replay" if record is set.
+	"""
+
+	rng = game_rng(seed, index)
+	game = engine.Game(rows, columns, fleet, rng)
+	PLACEMENTS[place_a](game.player, rng)
+	PLACEMENTS[place_b](game.computer, rng)
+
+	players = {USER: ai.STRATEGIES[a](rows, columns, fleet, rng, **STRATEGY_OPTIONS.get(a, {})),
+			COMPUTER: ai.STRATEGIES[b](rows, columns, fleet, rng, **STRATEGY_OPTIONS.get(b, {}))}
+	shots = {USER: 0, COMPUTER: 0}
+	player = USER if index % 2 == 0 else COMPUTER
+	while game.winner is None:
+		game.take_turn(player, players[player])
+		shots[player] += 1
+		player = COMPUTER if player == USER else USER
+
+	result = {"game": index,
+			"winner": "a" if game.winner == USER else "b",
+			"moves": shots[game.winner],
+			"shots_a": shots[USER],
+			"shots_b": shots[COMPUTER]}
+	if record:
+		result["replay"] = replay.pack(game, seed, index)
+	return result
+
+
+def play_games(indices, *args):
+	"""
+	Worker task: play a batch of games
+	"""
+
+	return [play_game(index, *args) for index in indices]
+
+
+def run(games, a="density", b="random", place_a="random", place_b="random", seed=0,
+		workers=None, rows=engine.ROW_COUNT, columns=engine.COLUMN_COUNT,
+		fleet=engine.ships_lengths, batch=None, record=False):
+	"""
+	Play games in worker processes and yield each result as its batch finishes.
+	With workers=0 everything runs in this process. record adds each game's
+	replay record, see play_game.
+	"""
+
+	args = (seed, a, b, place_a, place_b, rows, columns, dict(fleet), record)
+	if workers == 0:
+		for index in range(games):
+			yield play_game(index, *args)
+		return
+
+	workers = workers or os.cpu_count() or 1
+	batch = batch or max(1, min(100, games // (workers * 4)))
+	with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+		futures = [pool.submit(play_games, range(start, min(start + batch, games)), *args)
+				for start in range(0, games, batch)]
+		for future in concurrent.futures.as_completed(futures):
+			for result in future.result():
+				yield result
+
+
+class Summary:
+	"""
+	Running statistics over finished games
+	"""
+
+	def __init__(self, a, b):
+		self.names = {"a": a, "b": b}
+		self.games = 0
+		self.wins = {"a": 0, "b": 0}
+		self.moves = dict()
+		self.start = time.perf_counter()
+
+	def add(self, result):
+		self.games += 1
+		self.wins[result["winner"]] += 1
+		self.moves[result["moves"]] = self.moves.get(result["moves"], 0) + 1
+
+	def report(self):
+		"""
+		Summary as a dict: games/sec, win rate per side and the moves-to-win distribution
+		"""
+
+		elapsed = time.perf_counter() - self.start
+		values = sorted(self.moves.items())
+		total = sum(moves * count for moves, count in values)
+		seen = 0
+		median = None
+		for moves, count in values:
+			seen += count
+			if median is None and seen * 2 >= self.games:
+				median = moves
+
+		return {"games": self.games,
+				"seconds": round(elapsed, 3),
+				"games_per_sec": round(self.games / elapsed, 1) if elapsed else None,
+				"win_rate": {"%s (%s)" % (side, name): round(self.wins[side] / self.games, 4) if self.games else None
+						for side, name in self.names.items()},
+				"moves_to_win": {"min": values[0][0] if values else None,
+						"mean": round(total / self.games, 2) if self.games else None,
+						"median": median,
+						"max": values[-1][0] if values else None,
+						"histogram": {str(moves): count for moves, count in values}}}
+
+
+def seed_value(text):
+	"""
+	argparse type for --seed: an int that fits a replay record
+	"""
+
+	seed = int(text)
+	if not 0 <= seed <= replay.MAX_SEED:
+		raise argparse.ArgumentTypeError("seed must be 0 to 2**64 - 1")
+	return seed
+
+
+def main(argv=None):
+	"""
+	Command-line entry point
+	"""
+
+	parser = argparse.ArgumentParser(description="Run computer-vs-computer Battleship games.")
+	parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+	parser.add_argument("--a", default="density", choices=sorted(ai.STRATEGIES), help="shot strategy for side a")
+	parser.add_argument("--b", default="random", choices=sorted(ai.STRATEGIES), help="shot strategy for side b")
+	parser.add_argument("--place-a", default="random", choices=sorted(PLACEMENTS), help="placement strategy for side a")
+	parser.add_argument("--place-b", default="random", choices=sorted(PLACEMENTS), help="placement strategy for side b")
+	parser.add_argument("--seed", type=seed_value, default=0, help="base seed, 0 to 2**64 - 1; each game gets its own stream")
+	parser.add_argument("--workers", type=int, default=None, help="worker processes, 0 to play in-process (default: one per core)")
+	parser.add_argument("--rows", type=int, default=engine.ROW_COUNT)
+	parser.add_argument("--columns", type=int, default=engine.COLUMN_COUNT)
+	parser.add_argument("--fleet", type=engine.parse_fleet, default=engine.ships_lengths,
+			help='ship lengths, e.g. "5,4,3,3,2" or "Carrier:5,Cruiser:3" (default: the standard fleet)')
+	parser.add_argument("--output", help="write one JSON line per finished game to this file ('-' for stdout)")
+	parser.add_argument("--replay", help="record every game to this binary replay file, see replay.py")
+	args = parser.parse_args(argv)
+
+	summary = Summary(args.a, args.b)
+	out = None
+	if args.output == "-":
+		out = sys.stdout
+	elif args.output:
+		out = open(args.output, "w")
+	replays = replay.ReplayWriter(args.replay, args.rows, args.columns, args.fleet) if args.replay else None
+
+	try:
+		for result in run(args.games, args.a, args.b, args.place_a, args.place_b, args.seed,
+				args.workers, args.rows, args.columns, args.fleet, record=replays is not None):
+			summary.add(result)
+			if replays is not None:
+				replays.write_packed(result.pop("replay"))
+			if out is not None:
+				out.write(json.dumps(result) + "\n")
+				out.flush()
+	finally:
+		if out is not None and out is not sys.stdout:
+			out.close()
+		if replays is not None:
+			replays.close()
+
+	print(json.dumps(summary.report(), indent=2), file=sys.stderr if out is sys.stdout else sys.stdout)
+
+
+if __name__ == "__main__":
+	main()
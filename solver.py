@@ -0,0 +1,286 @@
+"""
+Exact cell-probability solver
+
+Counts every fleet configuration consistent with a partial board and returns
+the exact probability that each cell holds a ship. Configurations are
+enumerated row by row: the state between two rows is the remaining length of
+every vertical ship crossing the boundary plus how many ships of each length
+are left to place. The ways to fill a single row are memoized on that row's
+constraints, and the number of ways to finish the board from a state on the
+constraints of the rows that are left, so work is shared between positions
+and between games.
+"""
+
+import functools
+
+import bitboard
+from engine import ROW_COUNT, COLUMN_COUNT, ships_lengths
+
+# The profile of vertical ships crossing a row boundary is packed into one
+# int, FIELD bits per column holding how many cells of the ship are still below
+FIELD = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _ones(columns):
+	"""
+	Packed profile with 1 in every column
+	"""
+
+	return int("0001" * columns, 2) if columns else 0
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _fits(columns, rows_left, blocked, longest):
+	"""
+	For each column, the longest vertical ship (up to longest) that can start
+	in the first row without running into a blocked cell or off the board
+	"""
+
+	fits = []
+	for c in range(columns):
+		k = 0
+		while k < longest and k < rows_left and not (blocked >> (k * columns + c)) & 1:
+			k += 1
+		fits.append(k)
+	return tuple(fits)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _covered(columns, rows_left, required, longest):
+	"""
+	For each column, how many cells (up to longest) from the first row down
+	are all required. A vertical ship no longer than that would lie wholly on
+	hits, and would have been reported sunk.
+	"""
+
+	covered = []
+	for c in range(columns):
+		k = 0
+		while k < longest and k < rows_left and (required >> (k * columns + c)) & 1:
+			k += 1
+		covered.append(k)
+	return tuple(covered)
+
+
+@functools.lru_cache(maxsize=1 << 18)
+def _row_fills(columns, blocked, required, crossing, fits, covered, counts, lengths):
+	"""
+	Every way to fill one row. crossing is a packed profile with 1 in each
+	column taken by a vertical ship from above, fits and covered are from
+	_fits and _covered and counts says how many ships of each length are
+	left. No ship is placed wholly on required cells, since those are hits
+	on ships not sunk yet. Returns a tuple of (occupied, starts, left) where
+	starts is the packed profile of the vertical ships that start in this row.
+	"""
+
+	through = 0
+	for c in range(columns):
+		if (crossing >> (c * FIELD)) & 1:
+			through |= 1 << c
+	if through & blocked:
+		return ()
+
+	result = []
+
+	def walk(c, occupied, starts, counts):
+		if c == columns:
+			if not required & ~occupied:
+				result.append((occupied, starts, counts))
+			return
+
+		bit = 1 << c
+		if through & bit:
+			walk(c + 1, occupied, starts, counts)
+			return
+
+		# Leave the cell empty
+		if not required & bit:
+			walk(c + 1, occupied, starts, counts)
+		if blocked & bit:
+			return
+
+		for i, length in enumerate(lengths):
+			if not counts[i]:
+				continue
+			left = counts[:i] + (counts[i] - 1,) + counts[i + 1:]
+
+			# Horizontal ship starting here
+			span = ((1 << length) - 1) << c
+			if c + length <= columns and not span & (blocked | through) and span & ~required:
+				walk(c + length, occupied | span, starts, left)
+
+			# Vertical ship starting here
+			if 1 < length <= fits[c] and length > covered[c]:
+				walk(c + 1, occupied | bit, starts + ((length - 1) << (c * FIELD)), left)
+
+	walk(0, through, 0, counts)
+	return tuple(result)
+
+
+def _transitions(columns, rows_left, blocked, required, profile, counts, lengths):
+	"""
+	Row fills for the first of rows_left rows, given the packed profile of the
+	vertical ships coming in from above. Returns a list of
+	(occupied, new_profile, left).
+	"""
+
+	full = (1 << columns) - 1
+	crossing = (profile | profile >> 1 | profile >> 2 | profile >> 3) & _ones(columns)
+	out = profile - crossing
+
+	longest = lengths[0] if lengths else 0
+	fits = _fits(columns, rows_left, blocked, longest)
+	covered = _covered(columns, rows_left, required, longest)
+	fills = _row_fills(columns, blocked & full, required & full, crossing, fits, covered, counts, lengths)
+	return [(occupied, out + starts, left) for occupied, starts, left in fills]
+
+
+@functools.lru_cache(maxsize=1 << 20)
+def _completions(columns, rows_left, blocked, required, profile, counts, lengths):
+	"""
+	Number of ways to finish the last rows_left rows from a boundary state.
+	blocked and required hold only those rows, the first one at bit 0.
+	"""
+
+	if not rows_left:
+		return 0 if profile or any(counts) else 1
+
+	total = 0
+	next_blocked = blocked >> columns
+	next_required = required >> columns
+	for occupied, out, left in _transitions(columns, rows_left, blocked, required, profile, counts, lengths):
+		total += _completions(columns, rows_left - 1, next_blocked, next_required, out, left, lengths)
+	return total
+
+
+def _transform(mask, rows, columns, flip_rows, flip_columns, transpose):
+	"""
+	Apply a board symmetry to a mask. Returns (mask, rows, columns).
+	"""
+
+	out_rows, out_columns = (columns, rows) if transpose else (rows, columns)
+	out = 0
+	for row, column in bitboard.iter_cells(mask, columns):
+		if flip_rows:
+			row = rows - 1 - row
+		if flip_columns:
+			column = columns - 1 - column
+		if transpose:
+			row, column = column, row
+		out |= 1 << (row * out_columns + column)
+	return out, out_rows, out_columns
+
+
+def _symmetries(rows, columns):
+	"""
+	The board symmetries as (flip_rows, flip_columns, transpose)
+	"""
+
+	transposes = (False, True) if rows == columns else (False,)
+	return [(fr, fc, t) for t in transposes for fr in (False, True) for fc in (False, True)]
+
+
+# (rows, columns, lengths, blocked, required) in canonical form -> (total, counts)
+_solutions = dict()
+MAX_SOLUTIONS = 1 << 14
+
+
+def _solve_canonical(rows, columns, lengths, blocked, required):
+	"""
+	Total number of configurations and how many of them cover each cell
+	"""
+
+	key = (rows, columns, lengths, blocked, required)
+	cached = _solutions.get(key)
+	if cached is not None:
+		return cached
+
+	distinct = tuple(sorted(set(lengths), reverse=True))
+	counts = tuple(lengths.count(length) for length in distinct)
+	empty = 0
+
+	total = _completions(columns, rows, blocked, required, empty, counts, distinct)
+	cells = [0] * (rows * columns)
+	forward = {(empty, counts): 1}
+	for r in range(rows):
+		shift = r * columns
+		here_blocked = blocked >> shift
+		here_required = required >> shift
+		next_blocked = here_blocked >> columns
+		next_required = here_required >> columns
+		row_weights = dict()
+		following = dict()
+		for (profile, left), ways in forward.items():
+			for occupied, out, after in _transitions(columns, rows - r, here_blocked, here_required, profile, left, distinct):
+				finish = _completions(columns, rows - r - 1, next_blocked, next_required, out, after, distinct)
+				if not finish:
+					continue
+				row_weights[occupied] = row_weights.get(occupied, 0) + ways * finish
+				state = (out, after)
+				following[state] = following.get(state, 0) + ways
+		for occupied, weight in row_weights.items():
+			for c in range(columns):
+				if (occupied >> c) & 1:
+					cells[shift + c] += weight
+		forward = following
+
+	if len(_solutions) >= MAX_SOLUTIONS:
+		_solutions.clear()
+	_solutions[key] = (total, cells)
+	return total, cells
+
+
+def clear_cache():
+	"""
+	Drop every memoized count and solution
+	"""
+
+	_solutions.clear()
+	_completions.cache_clear()
+	_row_fills.cache_clear()
+	_fits.cache_clear()
+	_covered.cache_clear()
+
+
+def solve(blocked, required, lengths=None, rows=ROW_COUNT, columns=COLUMN_COUNT):
+	"""
+	Exact hit probabilities for a partial board.
+
+	blocked is a bitboard of cells known to be empty (misses and the cells of
+	sunk ships), required a bitboard of cells known to hold one of the ships
+	in lengths (hits on ships that are not sunk yet). Since those ships are
+	not sunk, none of them lies wholly on required cells. lengths defaults to the
+	whole fleet. Returns (total, probabilities) where total is the number of
+	consistent configurations (ships of equal length are interchangeable) and
+	probabilities is a flat list indexed by row * columns + column.
+
+	The position is first mapped to a canonical orientation under the board's
+	mirror and rotation symmetries, so equivalent positions share a result.
+	"""
+
+	if lengths is None:
+		lengths = list(ships_lengths.values())
+	lengths = tuple(sorted(lengths, reverse=True))
+	if lengths and lengths[0] > 1 << FIELD:
+		raise ValueError("ships longer than %d cells are not supported" % (1 << FIELD))
+
+	best = None
+	for symmetry in _symmetries(rows, columns):
+		b, out_rows, out_columns = _transform(blocked, rows, columns, *symmetry)
+		r = _transform(required, rows, columns, *symmetry)[0]
+		key = (b, r)
+		if best is None or key < best[0]:
+			best = (key, symmetry, out_rows, out_columns)
+
+	(b, r), symmetry, out_rows, out_columns = best
+	total, counts = _solve_canonical(out_rows, out_columns, lengths, b, r)
+	if not total:
+		return 0, [0.0] * (rows * columns)
+
+	probabilities = [0.0] * (rows * columns)
+	for row in range(rows):
+		for column in range(columns):
+			cell = _transform(1 << (row * columns + column), rows, columns, *symmetry)[0]
+			probabilities[row * columns + column] = counts[cell.bit_length() - 1] / total
+	return total, probabilities
@@ -0,0 +1,238 @@
+"""
+Immutable game states for lookahead search
+
+A GameState is the whole rules state of a game as a value: both boards as
+bitboard masks (see bitboard.py), whose turn it is and the winner. It is
+never changed in place. shoot() returns a new state that shares the board
+that was not shot at with the old one. Forking a state is just keeping a
+reference to it, and going back up the search tree is just using the
+parent's state again.
+
+Every state carries a Zobrist hash, updated in O(1) per shot, that is the
+same in every process and every run, so it can key transposition tables
+that are saved or shared between workers. The hash and equality take in
+which cells make up each ship, not just the cells with a ship: two fleets
+over the same cells split into ships differently are different positions,
+since the same shot can sink a ship in one and not in the other.
+"""
+
+import bitboard
+import engine
+from bitboard import MISS, HIT
+from engine import USER, COMPUTER
+
+MASK64 = (1 << 64) - 1
+
+# Zobrist codes for what a cell holds. Ships are keyed whole, see ship_key.
+MISS_CODE = 1
+HIT_CODE = 2
+
+
+def splitmix64(x):
+	"""
+	Well mixed 64-bit value of x, used instead of a table of random keys
+	"""
+
+	x = (x + 0x9E3779B97F4A7C15) & MASK64
+	x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+	x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+	return x ^ (x >> 31)
+
+
+def zobrist(side, index, code):
+	"""
+	Hash key for one fact about a cell: side 0 is the user's board, 1 the
+	computer's
+	"""
+
+	return splitmix64(index * 6 + side * 3 + code + 1)
+
+
+def ship_key(side, mask):
+	"""
+	Hash key for one ship at the cells in mask, on side 0 (the user's
+	board) or 1
+	"""
+
+	key = splitmix64(side)
+	while mask:
+		key = splitmix64(key ^ (mask & MASK64))
+		mask >>= 64
+	return key
+
+
+# Mixed in when the computer is to move
+TURN_KEY = splitmix64(0)
+
+
+class BoardState:
+	"""
+	One side's board: ship masks in fleet order, hits, misses and ships
+	still afloat, with its part of the hash
+	"""
+
+	__slots__ = ("ships", "ship_masks", "hits", "misses", "remaining", "hash")
+
+	def __init__(self, ships, ship_masks, hits, misses, remaining, key):
+		self.ships = ships
+		self.ship_masks = ship_masks
+		self.hits = hits
+		self.misses = misses
+		self.remaining = remaining
+		self.hash = key
+
+	@classmethod
+	def from_board(cls, board, side):
+		"""
+		Snapshot of an engine Board or SparseBoard
+		"""
+
+		ship_masks = tuple(board.ship_mask(ship) for ship in board.fleet if ship in board.placements)
+		ships = 0
+		for mask in ship_masks:
+			ships |= mask
+		if isinstance(board, engine.SparseBoard):
+			hits = misses = 0
+			for index, result in board.shots.items():
+				if result == HIT:
+					hits |= 1 << index
+				else:
+					misses |= 1 << index
+		else:
+			hits, misses = board.hits, board.misses
+
+		key = 0
+		for mask in ship_masks:
+			key ^= ship_key(side, mask)
+		for code, mask in ((MISS_CODE, misses), (HIT_CODE, hits)):
+			while mask:
+				low = mask & -mask
+				key ^= zobrist(side, low.bit_length() - 1, code)
+				mask ^= low
+		return cls(ships, ship_masks, hits, misses, board.ships_remaining, key)
+
+	def value(self, index):
+		"""
+		Grid value of one cell index
+		"""
+
+		return bitboard.cell_value(self.ships, self.hits | self.misses, index)
+
+	def __eq__(self, other):
+		# Ships of the same length in the other order are the same position
+		return (isinstance(other, BoardState) and self.hash == other.hash
+				and (self.hits, self.misses) == (other.hits, other.misses)
+				and set(self.ship_masks) == set(other.ship_masks))
+
+	def __hash__(self):
+		return self.hash
+
+
+class GameState:
+	"""
+	Immutable state of a game. boards is (user's board, computer's board),
+	turn the player to shoot next and winner None until one side is sunk.
+	"""
+
+	__slots__ = ("rows", "columns", "boards", "turn", "winner", "hash")
+
+	def __init__(self, rows, columns, boards, turn=USER, winner=None):
+		self.rows = rows
+		self.columns = columns
+		self.boards = boards
+		self.turn = turn
+		self.winner = winner
+		self.hash = boards[0].hash ^ boards[1].hash ^ (TURN_KEY if turn == COMPUTER else 0)
+
+	@classmethod
+	def from_game(cls, game, turn=USER):
+		"""
+		Snapshot of an engine.Game, with turn to move next
+		"""
+
+		return cls(game.rows, game.columns,
+				(BoardState.from_board(game.player, 0), BoardState.from_board(game.computer, 1)),
+				turn, game.winner)
+
+	def board(self, player):
+		"""
+		The board that belongs to player
+		"""
+
+		return self.boards[0 if player == USER else 1]
+
+	def target(self, player=None):
+		"""
+		The board that player (by default the one to move) shoots at
+		"""
+
+		player = self.turn if player is None else player
+		return self.boards[1 if player == USER else 0]
+
+	def legal_moves(self):
+		"""
+		Yield the (row, column) of every cell the player to move can shoot at
+		"""
+
+		if self.winner is not None:
+			return iter(())
+		target = self.target()
+		free = ((1 << (self.rows * self.columns)) - 1) & ~(target.hits | target.misses)
+		return bitboard.iter_cells(free, self.columns)
+
+	def shoot(self, row, column):
+		"""
+		The player to move fires at (row, column). Returns (state, result,
+		sunk): the state after the shot with the other player to move, MISS or
+		HIT, and the mask of the ship it sank or 0. Self is left as it was.
+		"""
+
+		if self.winner is not None:
+			raise ValueError("the game is over")
+		side = 1 if self.turn == USER else 0
+		board = self.boards[side]
+		index = row * self.columns + column
+		bit = 1 << index
+		if (board.hits | board.misses) & bit:
+			raise ValueError("cell already targeted")
+
+		sunk = 0
+		remaining = board.remaining
+		if board.ships & bit:
+			result = HIT
+			hits = board.hits | bit
+			for mask in board.ship_masks:
+				if mask & bit:
+					if not mask & ~hits:
+						sunk = mask
+						remaining -= 1
+					break
+			board = BoardState(board.ships, board.ship_masks, hits, board.misses, remaining,
+					board.hash ^ zobrist(side, index, HIT_CODE))
+		else:
+			result = MISS
+			board = BoardState(board.ships, board.ship_masks, board.hits, board.misses | bit, remaining,
+					board.hash ^ zobrist(side, index, MISS_CODE))
+
+		boards = (self.boards[0], board) if side else (board, self.boards[1])
+		winner = self.turn if not remaining else None
+		state = GameState(self.rows, self.columns, boards, COMPUTER if self.turn == USER else USER, winner)
+		return state, result, sunk
+
+	def __eq__(self, other):
+		return (isinstance(other, GameState) and self.hash == other.hash and self.turn == other.turn
+				and self.boards == other.boards)
+
+	def __hash__(self):
+		return self.hash
+
+	# Immutable, so copies are the same object
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+	def __repr__(self):
+		return "<GameState %dx%d turn=%s winner=%s hash=%016x>" % (self.rows, self.columns,
+				self.turn, self.winner, self.hash)
@@ -0,0 +1,8 @@
+"""
+The modules live at the top of the repository, put it on the path
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
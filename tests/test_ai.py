@@ -0,0 +1,102 @@
+"""
+Computer strategies
+"""
+
+import random
+import time
+
+import numpy as np
+
+import ai
+import bitboard
+import engine
+import solver
+from placement import legal_placements
+
+
+def test_posterior_skips_ships_wholly_on_open_hits():
+	# The only place for the ship is on the two hits, where it would be sunk
+	counts, samples = ai.sample_posterior(3, 4, [2], 0, (1 << 5) | (1 << 6), 0, time.time() + 0.05)
+	assert samples == 0
+
+
+def test_posterior_matches_the_solver():
+	blocked = 1 << 0 | 1 << 10
+	open_hits = 1 << 5 | 1 << 6
+	counts, samples = ai.sample_posterior(4, 4, [3, 2], blocked, open_hits, 1, time.time() + 0.3)
+	total, probabilities = solver.solve(blocked, open_hits, [3, 2], 4, 4)
+	assert samples > 2000
+	for cell, p in enumerate(probabilities):
+		assert abs(counts[cell] / samples - p) < 0.05
+
+
+def rebuilt_heat(strategy, blocked, shots):
+	"""
+	The hunt heatmap from scratch: every placement clear of blocked cells,
+	once per ship of its length still afloat
+	"""
+
+	heat = np.zeros((strategy.rows, strategy.columns), dtype=np.int64)
+	for length, count in strategy.remaining.items():
+		for mask, row, column, orientation in legal_placements(strategy.rows, strategy.columns, length):
+			if not mask & blocked:
+				for r, c in bitboard.iter_cells(mask, strategy.columns):
+					heat[r, c] += count
+	for r, c in bitboard.iter_cells(shots, strategy.columns):
+		heat[r, c] -= strategy.SHOT
+	return heat
+
+
+def rebuilt_target(strategy, blocked, open_hits):
+	"""
+	Target scores from scratch: placements through open hits, weighted by
+	the hits they cover
+	"""
+
+	scores = np.zeros((strategy.rows, strategy.columns), dtype=np.int64)
+	for length, count in strategy.remaining.items():
+		for mask, row, column, orientation in legal_placements(strategy.rows, strategy.columns, length):
+			through = bitboard.popcount(mask & open_hits)
+			if through and not mask & blocked:
+				for r, c in bitboard.iter_cells(mask, strategy.columns):
+					scores[r, c] += count * through
+	return scores
+
+
+def test_density_updates_match_a_rebuild():
+	rng = random.Random(3)
+	for rows, columns in ((10, 10), (6, 9)):
+		game = engine.Game(rows, columns, rng=rng)
+		game.player.place_randomly(rng)
+		strategy = ai.DensityStrategy(rows, columns, rng=rng)
+		blocked = shots = open_hits = 0
+		targeted = 0
+		while game.winner is None:
+			row, column, result = game.take_turn(engine.COMPUTER, strategy)
+			bit = 1 << (row * columns + column)
+			shots |= bit
+			if result == engine.MISS:
+				blocked |= bit
+			else:
+				open_hits |= bit
+				ship = game.player.check_sink(row, column)
+				if ship is not None:
+					sunk = game.player.ship_mask(ship)
+					open_hits &= ~sunk
+					blocked |= sunk
+			assert np.array_equal(strategy.heat, rebuilt_heat(strategy, blocked, shots))
+
+			scores = strategy.target_heatmap()
+			if not open_hits:
+				assert scores is None
+				continue
+			targeted += 1
+			expected = rebuilt_target(strategy, blocked, open_hits)
+			expected[strategy.heat < 0] = -1
+			assert np.array_equal(scores, expected)
+			# Only cells in line with an open hit, and near enough to share a ship with it, score
+			reach = max(strategy.remaining) - 1
+			hits = list(bitboard.iter_cells(open_hits, columns))
+			for r, c in zip(*np.nonzero(scores > 0)):
+				assert any((r == hr and abs(c - hc) <= reach) or (c == hc and abs(r - hr) <= reach) for hr, hc in hits)
+		assert targeted
@@ -0,0 +1,53 @@
+"""
+Batched engine: random placement and stepping
+"""
+
+import numpy as np
+import pytest
+
+import batch
+import engine
+from bitboard import SHIP, HIT
+
+
+def test_placements_do_not_overlap_on_crowded_boards():
+	# 14 ship cells out of 16, where some draws leave a ship no room
+	fleet = {"a": 4, "b": 3, "c": 3, "d": 2, "e": 2}
+	games = batch.BatchGames(500, 4, 4, fleet, rng=np.random.default_rng(0))
+	games.place_random()
+	ids = games.ship_id.reshape(games.n, -1)
+	for ship, length in enumerate(fleet.values()):
+		masks = games.masks(length)
+		cells = ids == ship
+		assert (cells.sum(axis=1) == length).all()
+		# Every ship covers exactly the cells of one legal placement
+		assert (cells[:, None, :] == masks[None, :, :]).all(axis=2).any(axis=1).all()
+	assert ((games.cells.reshape(games.n, -1) == SHIP) == (ids >= 0)).all()
+
+
+def test_impossible_fleet():
+	games = batch.BatchGames(4, 3, 3)
+	with pytest.raises(ValueError):
+		games.place_random()
+
+
+def test_play_random_sinks_every_ship():
+	games = batch.BatchGames(64, rng=np.random.default_rng(1))
+	shots = games.play_random()
+	assert games.done.all()
+	assert (games.remaining == 0).all()
+	assert ((games.cells == HIT).sum(axis=(1, 2)) == sum(engine.ships_lengths.values())).all()
+	assert (shots >= sum(engine.ships_lengths.values())).all() and (shots <= 100).all()
+
+
+def test_step_reports_sinks():
+	games = batch.BatchGames(1, rng=np.random.default_rng(2))
+	games.place_random()
+	rows, columns = np.nonzero(games.ship_id[0] == 0)
+	for i, (row, column) in enumerate(zip(rows, columns)):
+		result, sunk = games.step(np.array([row]), np.array([column]))
+		assert result[0] == HIT
+		assert sunk[0] == (0 if i == len(rows) - 1 else -1)
+	# A second shot at the same cell changes nothing
+	result, sunk = games.step(np.array([rows[0]]), np.array([columns[0]]))
+	assert (result[0], sunk[0]) == (-1, -1)
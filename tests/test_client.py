@@ -0,0 +1,89 @@
+"""
+The network client against a server on loopback
+"""
+
+import asyncio
+import random
+import threading
+
+import pytest
+
+import client
+import server
+from engine import USER, COMPUTER
+
+
+@pytest.fixture
+def address():
+	"""
+	(host, port) of a server running on its own event loop thread
+	"""
+
+	srv = server.Server("127.0.0.1", 0, strategy="random")
+	loop = asyncio.new_event_loop()
+	started = threading.Event()
+
+	def run():
+		asyncio.set_event_loop(loop)
+		loop.run_until_complete(srv.start())
+		started.set()
+		loop.run_forever()
+
+	thread = threading.Thread(target=run, daemon=True)
+	thread.start()
+	started.wait(5)
+	yield "127.0.0.1", srv.port
+
+	async def stop():
+		srv.close()
+		# Let the connection handlers and the reaper wind down
+		await asyncio.sleep(0.1)
+
+	asyncio.run_coroutine_threadsafe(stop(), loop).result(5)
+	loop.call_soon_threadsafe(loop.stop)
+	thread.join(5)
+	loop.close()
+
+
+def start(game, rng):
+	game.player.place_randomly(rng)
+	game.computer_place_ships()
+
+
+def test_game_against_the_computer(address):
+	rng = random.Random(0)
+	game = client.RemoteGame(*address, strategy="random")
+	start(game, rng)
+	cells = [(row, column) for row in range(game.rows) for column in range(game.columns)]
+	rng.shuffle(cells)
+	while game.winner is None:
+		row, column = cells.pop()
+		# Every other shot the way the window fires them, answered in the background
+		if len(cells) % 2:
+			answer = game.fire_async(row, column)
+			assert game.finish_shot(row, column, answer.result(5)) is not None
+		else:
+			assert game.shoot(USER, row, column) is not None
+		if game.winner is not None:
+			break
+		move = game.computer_strategy.choose_async().result(5)
+		game.strategy_shot(COMPUTER, game.computer_strategy, *move)
+	assert game.winner in (USER, COMPUTER)
+	assert game.computer.all_sunk() if game.winner == USER else game.player.all_sunk()
+	game.close()
+
+
+def test_opponent_leaving_on_their_turn_ends_the_game(address):
+	rng = random.Random(1)
+	host = client.RemoteGame(*address, mode="pvp")
+	guest = client.RemoteGame(*address, mode="join", game_id=host.id)
+	start(host, rng)
+	start(guest, rng)
+	# Refused until the server has the guest's ready
+	while host.shoot(USER, 0, 0) is None:
+		pass
+	pending = host.computer_strategy.choose_async()
+	guest.close()
+	assert pending.result(5) is None
+	assert host.winner == USER
+	host.close()
@@ -0,0 +1,207 @@
+"""
+Rules engine: shot pools, sinks and wins against brute force, on dense and
+sparse boards
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+import engine
+from engine import USER, COMPUTER, MISS, HIT
+
+
+POOLS = [engine.ShotPool, engine.SparseShotPool]
+
+
+@pytest.mark.parametrize("pool_type", POOLS)
+def test_pool_matches_a_set(pool_type):
+	rng = random.Random(0)
+	size = 400
+	pool = pool_type(size)
+	left = set(range(size))
+	order = list(range(size))
+	rng.shuffle(order)
+	for i, cell in enumerate(order):
+		assert len(pool) == len(left)
+		assert all((c in pool) == (c in left) for c in range(size))
+		for j in range(5):
+			assert pool.draw(rng) in left
+		pool.remove(cell)
+		left.discard(cell)
+		if i % 3 == 0:
+			# Removing a cell twice changes nothing
+			pool.remove(cell)
+	assert len(pool) == 0
+
+
+@pytest.mark.parametrize("pool_type", POOLS)
+def test_pool_draws_are_uniform(pool_type):
+	rng = random.Random(1)
+	pool = pool_type(20)
+	for cell in range(0, 20, 2):
+		pool.remove(cell)
+	counts = Counter(pool.draw(rng) for i in range(20000))
+	assert set(counts) == set(range(1, 20, 2))
+	assert max(counts.values()) - min(counts.values()) < 400
+
+
+def reference(board):
+	"""
+	Ship name -> set of cell indices, from the placements alone
+	"""
+
+	return {ship: {r * board.columns + c for r, c in engine.ship_cells(row, column, board.fleet[ship], orientation)}
+			for ship, (row, column, orientation) in board.placements.items()}
+
+
+def play_against_reference(game, rng):
+	"""
+	Random shots from both sides, each checked against sets of cells
+	"""
+
+	ships = {player: reference(game.board(player)) for player in (USER, COMPUTER)}
+	shot = {USER: set(), COMPUTER: set()}
+	sinks = []
+	game.sink_listeners.append(lambda player, ship, row, column: sinks.append((player, ship)))
+	player = USER
+	while game.winner is None:
+		target = game.target(player)
+		other = COMPUTER if player == USER else USER
+		cell = target.untargeted.draw(rng)
+		assert cell not in shot[other]
+		row, column = divmod(cell, game.columns)
+		owner = [ship for ship, cells in ships[other].items() if cell in cells]
+
+		result = game.shoot(player, row, column)
+		shot[other].add(cell)
+		assert result == (HIT if owner else MISS)
+		assert game.shoot(player, row, column) is None
+		sunk = [ship for ship, cells in ships[other].items() if cells <= shot[other]]
+		if owner and owner[0] in sunk:
+			assert target.check_sink(row, column) == owner[0]
+			assert sinks[-1] == (player, owner[0])
+		else:
+			assert target.check_sink(row, column) is None
+		assert len(sinks) == sum(len([s for s in ships[p] if ships[p][s] <= shot[p]]) for p in (USER, COMPUTER))
+		assert target.ships_remaining == len(ships[other]) - len(sunk)
+		assert target.all_sunk() == (len(sunk) == len(ships[other]))
+		assert len(target.untargeted) == game.rows * game.columns - len(shot[other])
+		if target.all_sunk():
+			assert game.winner == player
+		else:
+			assert game.winner is None
+		player = other
+	return game
+
+
+@pytest.mark.parametrize("rows, columns, sparse", [(10, 10, False), (7, 13, False), (10, 10, True), (7, 13, True)])
+def test_sinks_and_wins(rows, columns, sparse):
+	rng = random.Random(2)
+	for i in range(5):
+		game = engine.Game(rows, columns, rng=rng)
+		game.player = engine.new_board(rows, columns, sparse=sparse)
+		game.computer = engine.new_board(rows, columns, sparse=sparse)
+		game.player.place_randomly(rng)
+		game.computer.place_randomly(rng)
+		play_against_reference(game, rng)
+		for player in (USER, COMPUTER):
+			board = game.board(player)
+			cells = set().union(*reference(board).values())
+			for row in range(rows):
+				for column in range(columns):
+					index = row * columns + column
+					expected = (engine.SHIP if index in cells else engine.WATER) + (index not in board.untargeted)
+					assert board.grid[row][column] == expected
+
+
+def test_large_boards_are_sparse():
+	assert isinstance(engine.new_pool(engine.SPARSE_CELLS), engine.ShotPool)
+	assert isinstance(engine.new_pool(engine.SPARSE_CELLS + 1), engine.SparseShotPool)
+	assert isinstance(engine.new_board(64, 64), engine.Board)
+	assert isinstance(engine.new_board(65, 64), engine.SparseBoard)
+	assert isinstance(engine.new_board(10, 10, sparse=True), engine.SparseBoard)
+
+	rng = random.Random(3)
+	game = engine.Game(80, 80, rng=rng)
+	assert isinstance(game.player, engine.SparseBoard) and isinstance(game.computer, engine.SparseBoard)
+	game.player.place_randomly(rng)
+	game.computer.place_randomly(rng, uniform=True)
+	play_against_reference(game, rng)
+	# The pool only holds the cells that moved, never the whole board
+	assert len(game.target(game.winner).untargeted.cells) <= 80 * 80 - len(game.target(game.winner).untargeted)
+
+
+def test_sparse_board_matches_dense():
+	rng = random.Random(4)
+	for i in range(10):
+		dense = engine.Board(9, 11)
+		dense.place_randomly(rng)
+		sparse = engine.SparseBoard(9, 11)
+		for ship, placed in dense.placements.items():
+			assert sparse.place(ship, *placed) is not None
+		# Overlapping or off the board is refused the same way on both
+		for row in range(9):
+			for column in range(11):
+				for orientation in (engine.HORIZONTAL, engine.VERTICAL):
+					assert sparse.can_place(row, column, 3, orientation) == dense.can_place(row, column, 3, orientation)
+		for cell in rng.sample(range(99), 40):
+			row, column = divmod(cell, 11)
+			assert sparse.fire(row, column) == dense.fire(row, column)
+			assert sparse.check_sink(row, column) == dense.check_sink(row, column)
+		assert [list(row) for row in sparse.grid] == [list(row) for row in dense.grid]
+		assert sorted(sparse.marked_cells()) == sorted(dense.marked_cells())
+		assert all(sparse.ship_mask(ship) == dense.ship_mask(ship) for ship in dense.placements)
+		assert sparse.ships_remaining == dense.ships_remaining
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_ship_ids_and_health(sparse):
+	rng = random.Random(5)
+	board = engine.new_board(10, 10, sparse=sparse)
+	board.place_randomly(rng)
+	cells = reference(board)
+	assert board.names[0] is None and [board.names[board.ids[ship]] for ship in board.fleet] == list(board.fleet)
+	for index in range(100):
+		owner = [ship for ship, ship_cells in cells.items() if index in ship_cells]
+		assert board.ship_id(index) == (board.ids[owner[0]] if owner else 0)
+	assert dict(board.ship_coords) == {divmod(index, 10): ship for ship, ship_cells in cells.items() for index in ship_cells}
+	assert len(board.ship_coords) == sum(board.fleet.values())
+	assert all(((row, column) in board.ship_coords) == bool(board.ship_id(row * 10 + column))
+			for row in range(10) for column in range(10))
+	with pytest.raises(KeyError):
+		board.ship_coords[(10, 0)]
+	assert dict(board.health) == board.fleet
+
+	shot = set()
+	order = sorted(set().union(*cells.values()))
+	rng.shuffle(order)
+	for index in order:
+		board.fire(*divmod(index, 10))
+		shot.add(index)
+		for ship, ship_cells in cells.items():
+			assert board.health[ship] == len(ship_cells - shot)
+			assert board.ship_health[board.ids[ship]] == len(ship_cells - shot)
+		assert board.ships_remaining == sum(1 for ship_cells in cells.values() if ship_cells - shot)
+	assert board.all_sunk() and not any(board.health.values())
+	# Shots do not move ships
+	assert dict(board.ship_coords) == {divmod(index, 10): ship for ship, ship_cells in cells.items() for index in ship_cells}
+
+	board.health["PT Boat"] = 2
+	assert board.ship_health[board.ids["PT Boat"]] == 2
+
+
+def test_ship_id_limit():
+	fleet = {"Ship %d" % i: 1 for i in range(engine.MAX_SHIPS)}
+	board = engine.Board(12, 12, fleet)
+	for i, ship in enumerate(fleet):
+		board.place(ship, *divmod(i, 12), engine.HORIZONTAL)
+	assert board.ship_id(engine.MAX_SHIPS - 1) == engine.MAX_SHIPS
+	assert board.ships_remaining == engine.MAX_SHIPS
+	board.fire(*divmod(engine.MAX_SHIPS - 1, 12))
+	assert board.check_sink(*divmod(engine.MAX_SHIPS - 1, 12)) == "Ship %d" % (engine.MAX_SHIPS - 1)
+
+	fleet["one too many"] = 1
+	with pytest.raises(ValueError):
+		engine.Board(12, 12, fleet)
@@ -0,0 +1,42 @@
+"""
+Gym-style environments
+"""
+
+import numpy as np
+
+import engine
+import env
+from bitboard import HIT
+
+
+def test_episode_clears_the_board():
+	single = env.BattleshipEnv()
+	obs, info = single.reset(seed=0)
+	assert obs.shape == (10, 10) and not obs.any()
+	total = 0.0
+	for action in range(100):
+		obs, reward, terminated, truncated, info = single.step(action)
+		total += reward
+		if terminated:
+			break
+	assert terminated and not truncated
+	assert total == sum(engine.ships_lengths.values()) * env.HIT_REWARD
+	assert (obs == HIT).sum() == sum(engine.ships_lengths.values())
+	# Firing at a cell twice is penalised
+	assert single.step(0)[1] == env.INVALID_REWARD
+
+
+def test_backends_agree():
+	rng = np.random.default_rng(3)
+	actions = rng.integers(100, size=(150, 8))
+	results = []
+	for backend in ("inprocess", "subprocess"):
+		with env.VectorEnv(8, backend=backend, workers=1) as vector:
+			steps = [vector.reset(seed=7)[0]]
+			for row in actions:
+				steps.extend(vector.step(row)[:4])
+		results.append(steps)
+	for a, b in zip(*results):
+		assert np.array_equal(a, b)
+	# 150 steps on 100 cells finish some episodes, which start over at once
+	assert any(step.dtype == bool and step.any() for step in results[0])
@@ -0,0 +1,96 @@
+"""
+Replay files: writing, reading back and appending
+"""
+
+import random
+
+import pytest
+
+import engine
+import replay
+import simulate
+
+
+def played(rows, columns, seed, shots=None):
+	"""
+	A game of random shots on both sides, stopped after shots shots if given
+	"""
+
+	rng = random.Random(seed)
+	game = engine.Game(rows, columns, rng=rng)
+	game.player.place_randomly(rng)
+	game.computer.place_randomly(rng)
+	player = engine.USER
+	while game.winner is None and len(game.history) != shots:
+		row, column = divmod(game.target(player).untargeted.draw(rng), columns)
+		game.shoot(player, row, column)
+		player = engine.COMPUTER if player == engine.USER else engine.USER
+	return game
+
+
+@pytest.mark.parametrize("rows, columns, size", [(10, 10, 1), (20, 20, 2), (200, 200, 4)])
+def test_round_trip(tmp_path, rows, columns, size):
+	assert replay.cell_bytes(rows, columns) == size
+	games = [played(rows, columns, seed, shots=None if rows == 10 else 300) for seed in range(3)]
+	path = tmp_path / "games.bsr"
+	with replay.ReplayWriter(path, rows, columns) as writer:
+		for i, game in enumerate(games):
+			writer.write(game, seed=(1 << 64) - 1 - i, index=i)
+
+	with replay.ReplayFile(path) as replays:
+		assert len(replays) == len(games)
+		for i, (game, record) in enumerate(zip(games, replays)):
+			assert (record.seed, record.index, record.winner) == ((1 << 64) - 1 - i, i, game.winner)
+			assert list(record.shots) == list(game.history)
+			for player in (engine.USER, engine.COMPUTER):
+				assert record.placements(player) == game.board(player).placements
+			rebuilt = record.game()
+			assert list(rebuilt.history) == list(game.history)
+			assert rebuilt.winner == game.winner
+			for player in (engine.USER, engine.COMPUTER):
+				assert sorted(rebuilt.board(player).marked_cells()) == sorted(game.board(player).marked_cells())
+
+
+def test_partial_game(tmp_path):
+	path = tmp_path / "games.bsr"
+	with replay.ReplayWriter(path) as writer:
+		writer.write(played(10, 10, 0))
+	with replay.ReplayFile(path) as replays:
+		player_grid, computer_grid = replays[0].grids(shots=20)
+	expected = played(10, 10, 0, shots=20)
+	assert player_grid == [list(row) for row in expected.player.grid]
+	assert computer_grid == [list(row) for row in expected.computer.grid]
+
+
+def test_append_drops_a_cut_off_record(tmp_path):
+	path = tmp_path / "games.bsr"
+	with replay.ReplayWriter(path) as writer:
+		writer.write(played(10, 10, 0), index=0)
+		writer.write(played(10, 10, 1), index=1)
+	with open(path, "r+b") as f:
+		f.truncate(path.stat().st_size - 5)
+
+	with replay.ReplayWriter(path, append=True) as writer:
+		writer.write(played(10, 10, 2), index=2)
+	with replay.ReplayFile(path) as replays:
+		assert [record.index for record in replays] == [0, 2]
+
+	with pytest.raises(ValueError):
+		replay.ReplayWriter(path, rows=12, append=True)
+
+
+def test_seed_range():
+	game = played(10, 10, 0)
+	with pytest.raises(ValueError):
+		replay.pack(game, seed=1 << 64)
+	with pytest.raises(ValueError):
+		replay.pack(game, seed=-1)
+
+
+def test_simulate_records_replays():
+	result = simulate.play_game(0, 7, "random", "random", "random", "random", 10, 10, engine.ships_lengths, record=True)
+	with_header = replay.pack_header(10, 10, engine.ships_lengths) + result["replay"]
+	rows, columns, fleet, size, start = replay.unpack_header(with_header)
+	assert (rows, columns, fleet, size) == (10, 10, engine.ships_lengths, 1)
+	seed, index, winner, shots = replay.RECORD.unpack_from(with_header, start)
+	assert (seed, index) == (7, 0)
@@ -0,0 +1,198 @@
+"""
+The game server, played over loopback
+"""
+
+import asyncio
+import concurrent.futures.process
+
+import engine
+import server
+
+
+class Line:
+	"""
+	One side of a connection, a line at a time
+	"""
+
+	def __init__(self, reader, writer):
+		self.reader = reader
+		self.writer = writer
+
+	async def send(self, text):
+		self.writer.write((text + "\n").encode())
+		await self.writer.drain()
+
+	async def read(self):
+		line = await asyncio.wait_for(self.reader.readline(), 5)
+		return line.decode().split()
+
+	async def until(self, text):
+		"""
+		Send text followed by a ping, and return every reply before the pong
+		"""
+
+		await self.send(text)
+		await self.send("ping")
+		replies = []
+		while True:
+			words = await self.read()
+			assert words, "connection closed"
+			if words == ["pong"]:
+				return replies
+			replies.append(words)
+
+
+async def open_line(srv, writers):
+	reader, writer = await asyncio.open_connection("127.0.0.1", srv.port)
+	writers.append(writer)
+	# Fleet names may hold spaces, so the fleet is the rest of the line
+	hello = await asyncio.wait_for(reader.readline(), 5)
+	assert hello.decode().rstrip("\n").split(" ", 3) == ["hello", "10", "10", server.fleet_text(engine.ships_lengths)]
+	return Line(reader, writer)
+
+
+def serve(test, **options):
+	"""
+	Run test(srv, connect) against a server on a free port, made with the
+	Server options given. connect() opens a connection, closed again when
+	the test ends.
+	"""
+
+	async def main():
+		srv = server.Server("127.0.0.1", 0, **{"strategy": "random", **options})
+		writers = []
+		await srv.start()
+		try:
+			await test(srv, lambda: open_line(srv, writers))
+		finally:
+			for writer in writers:
+				writer.close()
+			srv.close()
+			await asyncio.sleep(0.05)
+
+	asyncio.run(main())
+
+
+async def play_computer(srv, player, strategy):
+	"""
+	Play a whole game against the server's AI, firing row by row. Returns
+	the "over" reply.
+	"""
+
+	(game,) = await player.until("new ai " + strategy)
+	assert game[0] == "game" and game[2] == "ai"
+	placed = await player.until("place random")
+	assert [words[:2] for words in placed] == [["placed", str(i)] for i in range(len(engine.ships_lengths))]
+	assert await player.until("ready") == [["start", "first"]]
+
+	sunk = 0
+	for row in range(10):
+		for column in range(10):
+			replies = await player.until("fire %d %d" % (row, column))
+			assert replies[0][:3] == ["fired", str(row), str(column)]
+			sunk += "sunk" in replies[0]
+			# The AI answers every shot that does not end the game
+			assert [words[0] for words in replies[1:]] in ([], ["incoming"], ["over"], ["incoming", "over"])
+			over = [words for words in replies if words[0] == "over"]
+			if over:
+				assert over in ([["over", "win"]], [["over", "lose"]])
+				if over == [["over", "win"]]:
+					assert sunk == len(engine.ships_lengths)
+				assert srv.sessions == {}
+				return over[0]
+	assert False, "the game did not end"
+
+
+def test_game_against_the_computer():
+	async def test(srv, connect):
+		player = await connect()
+		await play_computer(srv, player, "random")
+		assert await player.until("fire 9 9") == [["error", "not", "in", "a", "game"]]
+
+	serve(test)
+
+
+def test_game_against_a_pooled_ai():
+	async def test(srv, connect):
+		await play_computer(srv, await connect(), "density")
+
+	serve(test)
+
+
+class BrokenPool(concurrent.futures.Executor):
+	"""
+	A process pool whose workers have died
+	"""
+
+	def submit(self, fn, *args, **kwargs):
+		raise concurrent.futures.process.BrokenProcessPool("a worker died")
+
+
+def test_broken_pool_falls_back_to_inline_moves():
+	async def test(srv, connect):
+		await play_computer(srv, await connect(), "hunt")
+		await play_computer(srv, await connect(), "density")
+
+	serve(test, executor=BrokenPool())
+
+
+def test_game_between_two_players():
+	async def test(srv, connect):
+		host = await connect()
+		(game,) = await host.until("new pvp")
+		assert game[2] == "waiting"
+		guest = await connect()
+		assert await guest.until("join " + game[1]) == [["game", game[1], "joined"]]
+		assert await host.until("") == [["joined"]]
+
+		for side in (host, guest):
+			await side.until("place random")
+		assert await host.until("ready") == []
+		assert await guest.until("ready") == [["start", "second"]]
+		assert await host.until("") == [["start", "first"]]
+		assert (await guest.until("fire 0 0"))[0][:3] == ["error", "not", "your"]
+
+		cells = [(row, column) for row in range(10) for column in range(10)]
+		sides = [host, guest]
+		for turn in range(200):
+			side, other = sides[turn % 2], sides[1 - turn % 2]
+			row, column = cells[turn // 2]
+			replies = await side.until("fire %d %d" % (row, column))
+			assert replies[0][:3] == ["fired", str(row), str(column)]
+			incoming = await other.until("")
+			assert incoming[0] == ["incoming"] + replies[0][1:]
+			if replies[-1][0] == "over":
+				assert replies[-1] == ["over", "win"] and incoming[-1] == ["over", "lose"]
+				break
+		else:
+			assert False, "nobody won"
+		assert srv.sessions == {}
+
+	serve(test)
+
+
+def test_errors():
+	async def test(srv, connect):
+		player = await connect()
+		assert await player.until("launch") == [["error", "unknown", "command", "launch"]]
+		assert await player.until("fire 1 1") == [["error", "not", "in", "a", "game"]]
+		assert await player.until("new ai nonsense") == [["error", "unknown", "strategy", "nonsense"]]
+		await player.until("new ai random")
+		assert await player.until("ready") == [["error", "fleet", "not", "placed"]]
+		assert await player.until("place 0 9 9 0") == [["error", "ship", "does", "not", "fit", "there"]]
+		assert await player.until("place 0 0 0 0") == [["placed", "0", "0", "0", "0"]]
+		assert await player.until("place 0 5 5 0") == [["error", "ship", "already", "placed"]]
+		assert await player.until("fire 0 0") == [["error", "game", "not", "started"]]
+		await player.send("x" * (server.LINE_LIMIT * 2))
+		assert await player.read() == ["error", "line", "too", "long"]
+
+		# Leaving a game in progress hands it to the opponent
+		host = await connect()
+		(game,) = await host.until("new pvp")
+		guest = await connect()
+		await guest.until("join " + game[1])
+		assert await host.until("") == [["joined"]]
+		guest.writer.close()
+		assert await host.read() == ["over", "abandoned"]
+
+	serve(test)
@@ -0,0 +1,57 @@
+"""
+Lean game sessions against the engine they mirror
+"""
+
+import random
+
+import engine
+import session as sessions
+from bitboard import HIT
+from engine import USER, COMPUTER
+
+
+def test_same_game_as_the_engine():
+	rules = sessions.Rules(10, 10, engine.ships_lengths)
+	rng = random.Random(0)
+	for seed in range(5):
+		game = engine.Game(rng=random.Random(seed))
+		game.player.place_randomly(rng)
+		game.computer.place_randomly(rng)
+		lean = sessions.GameSession(rules, seed)
+		for player in (USER, COMPUTER):
+			for ship, name in enumerate(rules.names):
+				assert lean.place(player, ship, *game.board(player).placements[name]) is not None
+				assert lean.placement(player, ship) == game.board(player).placements[name]
+			assert lean.placed(player) == len(rules.names)
+		assert lean.ships(USER) == game.player.ships and lean.ships(COMPUTER) == game.computer.ships
+
+		player = USER
+		while game.winner is None:
+			row, column = lean.random_shot(player, rng)
+			result, sunk = lean.shoot(player, row, column)
+			assert game.shoot(player, row, column) == result
+			target = game.target(player)
+			name = target.check_sink(row, column) if result == HIT else None
+			assert sunk == (None if name is None else rules.names.index(name))
+			assert lean.remaining(COMPUTER if player == USER else USER) == target.ships_remaining
+			assert lean.shoot(player, row, column) is None
+			player = COMPUTER if player == USER else USER
+		assert lean.winner == game.winner
+		for player in (USER, COMPUTER):
+			grid = game.board(player).grid
+			assert all(lean.value(player, row, column) == grid[row][column]
+					for row in range(10) for column in range(10))
+
+
+def test_placing():
+	rules = sessions.Rules(10, 10, engine.ships_lengths)
+	lean = sessions.GameSession(rules)
+	assert lean.placement(USER, 0) is None
+	assert lean.place(USER, 0, 0, 8, engine.HORIZONTAL) is None
+	assert lean.place(USER, 0, 0, 0, engine.HORIZONTAL) is not None
+	assert lean.place(USER, 0, 5, 5, engine.HORIZONTAL) is None
+	assert lean.place(USER, 1, 0, 0, engine.VERTICAL) is None
+	assert not lean.place_randomly(USER)
+	assert lean.place_randomly(COMPUTER, random.Random(1), uniform=True)
+	assert lean.placed(COMPUTER) == len(rules.names)
+	assert lean.shoot(USER, 10, 0) is None
@@ -0,0 +1,71 @@
+"""
+solver.solve against brute force on small boards
+"""
+
+import itertools
+import math
+import random
+from collections import Counter
+
+import pytest
+
+import placement
+import solver
+
+
+def brute_force(rows, columns, lengths, blocked, required):
+	"""
+	(configurations, probability per cell) by trying every combination of
+	placements, ships of the same length counted in every order. A ship
+	wholly on required cells would have been sunk, so it is not allowed.
+	"""
+
+	tables = [[p[0] for p in placement.legal_placements(rows, columns, length)] for length in lengths]
+	total = 0
+	cells = [0] * (rows * columns)
+	for combination in itertools.product(*tables):
+		occupied = 0
+		for mask in combination:
+			if occupied & mask or mask & blocked or not mask & ~required:
+				break
+			occupied |= mask
+		else:
+			if required & ~occupied:
+				continue
+			total += 1
+			for cell in range(rows * columns):
+				cells[cell] += (occupied >> cell) & 1
+	return total, [count / total if total else 0 for count in cells]
+
+
+def test_solve_matches_brute_force():
+	rng = random.Random(1)
+	for trial in range(40):
+		rows, columns = rng.randint(2, 5), rng.randint(2, 5)
+		lengths = [rng.choice([2, 3]) for i in range(rng.randint(1, 3))]
+		blocked = required = 0
+		for cell in range(rows * columns):
+			x = rng.random()
+			if x < 0.15:
+				blocked |= 1 << cell
+			elif x < 0.22:
+				required |= 1 << cell
+
+		total, probabilities = solver.solve(blocked, required, lengths, rows, columns)
+		expected_total, expected = brute_force(rows, columns, lengths, blocked, required)
+		# The solver counts ships of the same length as interchangeable
+		orders = 1
+		for count in Counter(lengths).values():
+			orders *= math.factorial(count)
+		assert total * orders == expected_total
+		assert probabilities == pytest.approx(expected, abs=1e-9)
+
+
+def test_no_ship_wholly_on_open_hits():
+	# The only place for the ship is on the two hits, where it would be sunk
+	total, probabilities = solver.solve(0, (1 << 5) | (1 << 6), [2], 3, 4)
+	assert total == 0 and not any(probabilities)
+	assert brute_force(3, 4, [2], 0, (1 << 5) | (1 << 6))[0] == 0
+	# With a longer ship the hits are part of it
+	total, probabilities = solver.solve(0, (1 << 5) | (1 << 6), [3], 3, 4)
+	assert total == 2 and probabilities[5] == probabilities[6] == 1.0
@@ -0,0 +1,118 @@
+"""
+Game states: snapshots of engine games, equality and the Zobrist hash
+"""
+
+import random
+
+import pytest
+
+import engine
+import state
+from engine import USER, COMPUTER
+
+
+def new_game(seed):
+	rng = random.Random(seed)
+	game = engine.Game(rng=rng)
+	game.player.place_randomly(rng)
+	game.computer.place_randomly(rng)
+	return game
+
+
+def after(position, cells):
+	for row, column in cells:
+		position = position.shoot(row, column)[0]
+	return position
+
+
+def test_splitmix_is_fixed():
+	# First output of the reference SplitMix64 seeded with 0
+	assert state.splitmix64(0) == 0xE220A8397B1DCDAF
+	assert state.TURN_KEY == 0xE220A8397B1DCDAF
+
+
+def test_matches_engine_game():
+	game = new_game(1)
+	current = state.GameState.from_game(game)
+	rng = random.Random(2)
+	while game.winner is None:
+		row, column = rng.choice(list(current.legal_moves()))
+		player = current.turn
+		current, result, sunk = current.shoot(row, column)
+		assert game.shoot(player, row, column) == result
+		assert current == state.GameState.from_game(game, current.turn)
+		assert hash(current) == hash(state.GameState.from_game(game, current.turn))
+	assert current.winner == game.winner
+	for player in (USER, COMPUTER):
+		grid = game.board(player).grid
+		board = current.board(player)
+		assert [[board.value(row * game.columns + column) for column in range(game.columns)]
+				for row in range(game.rows)] == [list(row) for row in grid]
+
+
+def test_transpositions_are_equal():
+	start = state.GameState.from_game(new_game(3))
+	# The same shots on each side, fired in a different order
+	a = after(start, [(0, 0), (1, 1), (2, 2), (3, 3)])
+	b = after(start, [(2, 2), (3, 3), (0, 0), (1, 1)])
+	assert a == b
+	assert hash(a) == hash(b)
+	assert len({a, b}) == 1
+
+	# Same cells, but the other side fired them
+	c = after(start, [(1, 1), (0, 0), (3, 3), (2, 2)])
+	assert c != a
+	assert hash(c) != hash(a)
+	# Same shots, other player to move
+	d = after(start, [(0, 0), (1, 1), (2, 2)])
+	assert d.turn != a.turn and d != a
+
+
+def test_shoot_leaves_parent_unchanged():
+	start = state.GameState.from_game(new_game(4))
+	before = (start.hash, start.turn, start.boards)
+	child, result, sunk = start.shoot(5, 5)
+	assert (start.hash, start.turn, start.boards) == before
+	assert child.boards[0] is start.boards[0]
+	assert child != start
+	# The computer may fire at the same cell on the user's board, but the
+	# user may not fire at it twice
+	grandchild = child.shoot(5, 5)[0]
+	with pytest.raises(ValueError):
+		grandchild.shoot(5, 5)
+
+
+def test_ship_partition_is_part_of_the_position():
+	# The same four cells as two horizontal or two vertical ships
+	fleet = {"a": 2, "b": 2}
+	positions = []
+	for orientation, cells in ((engine.HORIZONTAL, [(0, 0), (1, 0)]), (engine.VERTICAL, [(0, 0), (0, 1)])):
+		game = engine.Game(4, 4, fleet)
+		for name, (row, column) in zip(fleet, cells):
+			game.computer.place(name, row, column, orientation)
+		game.player.place("a", 3, 0, engine.HORIZONTAL)
+		game.player.place("b", 3, 2, engine.HORIZONTAL)
+		positions.append(state.GameState.from_game(game))
+	flat, upright = positions
+	assert flat.boards[1].ships == upright.boards[1].ships
+	assert flat != upright
+	assert hash(flat) != hash(upright)
+
+	# Two hits along the top row sink a ship in one and not the other
+	flat = after(flat, [(0, 0), (3, 3), (0, 1)])
+	upright = after(upright, [(0, 0), (3, 3), (0, 1)])
+	assert flat.boards[1].remaining == 1 and upright.boards[1].remaining == 2
+	assert flat != upright and hash(flat) != hash(upright)
+
+
+def test_equal_ships_in_either_order_are_the_same_position():
+	fleet = {"a": 2, "b": 2}
+	positions = []
+	for cells in ([(0, 0), (2, 0)], [(2, 0), (0, 0)]):
+		game = engine.Game(4, 4, fleet)
+		for name, (row, column) in zip(fleet, cells):
+			game.computer.place(name, row, column, engine.HORIZONTAL)
+		game.player.place("a", 3, 0, engine.HORIZONTAL)
+		game.player.place("b", 3, 2, engine.HORIZONTAL)
+		positions.append(state.GameState.from_game(game))
+	assert positions[0] == positions[1] and hash(positions[0]) == hash(positions[1])
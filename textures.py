@@ -0,0 +1,246 @@
+"""
+Texture caches for large images and for text labels
+
+Images are decoded, converted and scaled once, when they are preloaded or
+first asked for, and the resulting arcade textures are kept until the cache
+goes over its memory budget. The least recently used textures are evicted
+first and reloaded from disk the next time they are needed.
+
+Text labels work the same way: each distinct string, font, size, color,
+width and alignment is laid out and rasterized once into a texture and then
+drawn as a single textured quad.
+"""
+
+import collections
+import functools
+
+import arcade
+from PIL import Image, ImageDraw, ImageFont
+
+# Default memory budget, in bytes of decoded RGBA pixels
+BUDGET = 64 * 1024 * 1024
+
+# Default memory budget for text labels
+TEXT_BUDGET = 8 * 1024 * 1024
+
+# Fonts tried, in order, when the requested one is not installed
+FALLBACK_FONTS = ("DejaVuSans.ttf", "LiberationSans-Regular.ttf", "FreeSans.ttf")
+
+
+class TextureCache:
+	"""
+	Named textures with explicit preload, pre-scaling and LRU eviction
+	"""
+
+	def __init__(self, budget=BUDGET):
+		self.budget = budget
+		self.size = 0
+		# name -> (path, (width, height) or None)
+		self.sources = dict()
+		# name -> (texture, bytes), least recently used first
+		self.textures = collections.OrderedDict()
+
+	def register(self, name, path, size=None):
+		"""
+		Say where a texture comes from without loading it. size is the
+		(width, height) to scale it to, None keeps the image size.
+		"""
+
+		if self.sources.get(name) != (path, size):
+			self.discard(name)
+		self.sources[name] = (path, size)
+
+	def preload(self, name, path, size=None):
+		"""
+		Register a texture and load it now, so the first frame that draws it
+		does not stall on disk I/O and decoding
+		"""
+
+		self.register(name, path, size)
+		return self.get(name)
+
+	def get(self, name):
+		"""
+		The texture for name, loading it if it is not cached
+		"""
+
+		entry = self.textures.get(name)
+		if entry is not None:
+			self.textures.move_to_end(name)
+			return entry[0]
+
+		path, size = self.sources[name]
+		image = Image.open(path).convert("RGBA")
+		if size is not None and image.size != tuple(size):
+			image = image.resize(tuple(size), Image.LANCZOS)
+
+		texture = arcade.Texture(name, image=image)
+		cost = image.width * image.height * 4
+		self.textures[name] = (texture, cost)
+		self.size += cost
+		self.evict(keep=name)
+		return texture
+
+	def evict(self, keep=None):
+		"""
+		Drop least recently used textures until the cache fits its budget.
+		The texture named keep stays even if it is over budget on its own.
+		"""
+
+		for name in list(self.textures):
+			if self.size <= self.budget:
+				break
+			if name != keep:
+				self.discard(name)
+
+	def discard(self, name):
+		"""
+		Drop one cached texture, it is reloaded on the next get
+		"""
+
+		entry = self.textures.pop(name, None)
+		if entry is not None:
+			self.size -= entry[1]
+
+	def clear(self):
+		"""
+		Drop every cached texture
+		"""
+
+		self.textures.clear()
+		self.size = 0
+
+	def __contains__(self, name):
+		return name in self.textures
+
+	def __len__(self):
+		return len(self.textures)
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(name, size):
+	"""
+	A FreeType font by name at size pixels, or the closest fallback
+	"""
+
+	for candidate in (name, name + ".ttf", name.lower() + ".ttf") + FALLBACK_FONTS:
+		try:
+			return ImageFont.truetype(candidate, size)
+		except OSError:
+			pass
+	try:
+		return ImageFont.load_default(size)
+	except TypeError:
+		# Pillow before 10.1 only has the small bitmap font
+		return ImageFont.load_default()
+
+
+def wrap(text, font, width):
+	"""
+	Split text into lines no wider than width pixels (0 for no limit)
+	"""
+
+	lines = []
+	for paragraph in text.split("\n"):
+		line = ""
+		for word in paragraph.split(" "):
+			candidate = word if not line else line + " " + word
+			if width and line and font.getlength(candidate) > width:
+				lines.append(line)
+				line = word
+			else:
+				line = candidate
+		lines.append(line)
+	return lines
+
+
+class TextCache:
+	"""
+	Rasterized text labels, least recently used evicted past the budget
+	"""
+
+	def __init__(self, budget=TEXT_BUDGET):
+		self.budget = budget
+		self.size = 0
+		# key -> (texture, bytes, font ascent in pixels), least recently used first
+		self.textures = collections.OrderedDict()
+
+	def get(self, text, color, font_size=12, width=0, align="left", font_name="Arial"):
+		"""
+		The texture for a label, rendering it the first time it is asked for.
+		font_size is in points, like arcade.draw_text.
+		"""
+
+		return self.entry(text, color, font_size, width, align, font_name)[0]
+
+	def entry(self, text, color, font_size=12, width=0, align="left", font_name="Arial"):
+		"""
+		(texture, bytes, ascent) for a label, see get
+		"""
+
+		key = (text, tuple(color), font_size, width, align, font_name)
+		entry = self.textures.get(key)
+		if entry is not None:
+			self.textures.move_to_end(key)
+			return entry
+
+		font = load_font(font_name, max(1, round(font_size * 4 / 3)))
+		lines = wrap(text, font, width)
+		ascent, descent = font.getmetrics()
+		line_height = ascent + descent
+		text_width = max(1, int(max(font.getlength(line) for line in lines)) + 1)
+		box_width = max(text_width, int(width or 0))
+
+		image = Image.new("RGBA", (box_width, max(1, line_height * len(lines))), (0, 0, 0, 0))
+		draw = ImageDraw.Draw(image)
+		fill = tuple(color) + (255,) if len(color) == 3 else tuple(color)
+		for i, line in enumerate(lines):
+			x = 0
+			if align == "center":
+				x = (box_width - font.getlength(line)) / 2
+			elif align == "right":
+				x = box_width - font.getlength(line)
+			draw.text((x, i * line_height), line, fill, font=font)
+
+		texture = arcade.Texture("text:%r" % (key,), image=image)
+		cost = image.width * image.height * 4
+		entry = self.textures[key] = (texture, cost, ascent)
+		self.size += cost
+		while self.size > self.budget and len(self.textures) > 1:
+			old, (old_texture, old_cost, old_ascent) = self.textures.popitem(last=False)
+			self.size -= old_cost
+		return entry
+
+	def draw(self, text, start_x, start_y, color, font_size=12, width=0, align="left",
+			font_name="Arial", anchor_x="left", anchor_y="baseline"):
+		"""
+		Drop-in for arcade.draw_text that draws the cached texture. As there,
+		a baseline anchor puts start_y on the baseline of the first line.
+		"""
+
+		texture, cost, ascent = self.entry(text, color, font_size, width, align, font_name)
+		x = start_x + texture.width / 2
+		if anchor_x == "center":
+			x = start_x
+		elif anchor_x == "right":
+			x = start_x - texture.width / 2
+
+		y = start_y + texture.height / 2
+		if anchor_y == "center":
+			y = start_y
+		elif anchor_y == "top":
+			y = start_y - texture.height / 2
+		elif anchor_y == "baseline":
+			y = start_y + ascent - texture.height / 2
+		arcade.draw_texture_rectangle(x, y, texture.width, texture.height, texture)
+
+	def clear(self):
+		"""
+		Drop every cached label
+		"""
+
+		self.textures.clear()
+		self.size = 0
+
+	def __len__(self):
+		return len(self.textures)
@@ -0,0 +1,1230 @@
+"""
+Classic Battleship Game, turn based, 5 ships
+
+The arcade window. battleship.py only imports this module when a window is
+opened, so the headless tools never load arcade, pyglet or PIL.
+"""
+
+import argparse
+import collections
+import random
+
+import arcade
+from PIL import Image
+
+import ai
+import assets
+import engine
+import renderer
+import replay
+import textures
+from engine import ships_lengths
+
+# Set how many rows and columns we will have on the board, see configure()
+ROW_COUNT = 10
+COLUMN_COUNT = 10
+
+# The fleet the window plays with
+FLEET = dict(ships_lengths)
+
+# This sets the WIDTH and HEIGHT of each player_grid location
+WIDTH = 50
+HEIGHT = 50
+
+# This sets the margin between each cell
+# and on the edges of the screen.
+MARGIN = 1
+
+# Set the COMMANDS/options pane
+OPTIONS = 350
+
+# Do the math to figure out oiur screen dimensions
+SCREEN_WIDTH = (WIDTH + MARGIN) * COLUMN_COUNT + MARGIN + OPTIONS
+SCREEN_HEIGHT = (HEIGHT + MARGIN) * ROW_COUNT + MARGIN
+TEXT_BOX_HEIGHT = 100
+
+# Game states
+START = -1				# Load in state
+GAME = 0				# Action state where player attacks computer board
+DIALOGUE = 1			# Unimplemented, but notifies when hit, miss, sunk, etc.
+COMMANDS = 2			# Not fully implemented, but provides options for player to attack 
+INSTRUCTIONS = 3		# Instructions state
+GAME_OVER = 4			# Game over state with options to view final player/computer boards
+USER = 5				# Initial User state to drop ships
+COMPUTER = 6			# Computer state to attack user board
+USER_FINAL = 7			# Final user state
+COMPUTER_FINAL = 8		# Final computer state
+
+# Set the sprite scaling factor
+SPRITE_SCALING = 0.7
+
+# Computer opponent, a name from ai.STRATEGIES ("random", "hunt", "density", "montecarlo", "exact")
+COMPUTER_STRATEGY = "density"
+
+# Only draw and present a frame when something on screen changed, see Battleship.on_draw
+RENDER_ON_DEMAND = True
+
+# on_update calls per second while idle, and while the computer is choosing a shot
+IDLE_UPDATE_RATE = 10
+ACTIVE_UPDATE_RATE = 60
+
+# Seconds between redraws of an unchanged screen, in case the window contents were lost
+IDLE_REDRAW = 1.0
+
+# How boards are drawn: "sprites" is one sprite per cell, "texture" keeps each
+# board as a NumPy image and uploads only the cells that changed, see renderer.py
+BOARD_RENDERER = "sprites"
+
+# Side in pixels of the grid cells ButtonList uses to find the buttons under a click
+BUTTON_GRID = 64
+
+# configure() fits the board into about this many pixels square
+BOARD_PIXELS = 511
+
+# Boards with more cells than this are drawn with the texture renderer
+MAX_SPRITE_CELLS = 50 * 50
+
+# Cell size of the ship images in the inventory, whatever the board's cell size
+INVENTORY_CELL = 50
+
+# Where the generated ship images are cached, None keeps them in memory only
+SHIP_IMAGE_DIR = "Images"
+
+# Finished games are appended to this replay file (see replay.py), None to not record
+REPLAY_FILE = None
+
+# client.RemoteGame to play on a server instead of locally, set by --connect
+REMOTE_GAME = None
+
+# Height of each ship in the inventory, above or below the middle of the options pane
+INVENTORY_OFFSETS = {"Aircraft Carrier": 80,
+		"Battleship": 30,
+		"Destroyer": -20,
+		"Submarine": -70,
+		"PT Boat": -120}
+
+# Define the shapes of the single parts
+ship_shapes = [
+	[1, 1],
+
+	[2, 2, 2],
+
+	[3, 3, 3],
+
+	[4 ,4 ,4 , 4],
+
+	[5, 5, 5, 5, 5]
+]
+
+rem_health = {"Aircraft Carrier":5,
+		 "Battleship":4,
+		 "Submarine":3,
+		 "Destroyer":3,
+		 "PT Boat":2}
+
+
+""" 
+Colors for the sprites to take on
+	blue: water
+	white: miss
+	gray: ship
+	red: hit
+"""
+colors = [
+		  (0,   0,   255),
+		  (255, 255, 255),
+		  (128, 128, 128),
+		  (255, 0,   0  )
+		  ]
+
+
+def create_textures():
+	""" 
+	Create a list of images for sprites based on the global colors. 
+	"""
+
+	texture_list = []
+	for color in colors:
+		image = Image.new('RGB', (WIDTH, HEIGHT), color)
+		texture_list.append(arcade.Texture(str(color), image=image))
+	return texture_list
+
+
+# Rasterized labels: button captions, instructions, inventory and sink messages
+text_cache = textures.TextCache()
+
+# Cell textures, created with the first board, see cell_textures()
+texture_list = None
+
+
+def cell_textures():
+	"""
+	The cell textures, created on first use instead of at import
+	"""
+
+	global texture_list
+	if texture_list is None:
+		texture_list = create_textures()
+	return texture_list
+
+
+class TextButton:
+	""" Text-based button """
+	def __init__(self,
+				 center_x, center_y,
+				 width, height,
+				 text,
+				 font_size=18,
+				 font_face="Arial",
+				 face_color=arcade.color.LIGHT_GRAY,
+				 highlight_color=arcade.color.WHITE,
+				 shadow_color=arcade.color.GRAY,
+				 button_height=2):
+		self.center_x = center_x
+		self.center_y = center_y
+		self.width = width
+		self.height = height
+		self.text = text
+		self.font_size = font_size
+		self.font_face = font_face
+		self.pressed = False
+		self.face_color = face_color
+		self.highlight_color = highlight_color
+		self.shadow_color = shadow_color
+		self.button_height = button_height
+		# ShapeElementLists made on first draw: the face with released edges,
+		# and the pressed edges drawn over it
+		self.released_shapes = None
+		self.pressed_shapes = None
+
+	def face(self):
+		"""
+		The face as an arcade shape
+		"""
+
+		return arcade.create_rectangle_filled(self.center_x, self.center_y, self.width, self.height,
+				self.face_color)
+
+	def edges(self, pressed):
+		"""
+		The four bevel edges, as they look pressed or released
+		"""
+
+		left = self.center_x - self.width / 2
+		right = self.center_x + self.width / 2
+		bottom = self.center_y - self.height / 2
+		top = self.center_y + self.height / 2
+
+		# Bottom and right edges are in shadow unless pressed, top and left lit
+		if not pressed:
+			lower, upper = self.shadow_color, self.highlight_color
+		else:
+			lower, upper = self.highlight_color, self.shadow_color
+
+		return [arcade.create_line(left, bottom, right, bottom, lower, self.button_height),
+				arcade.create_line(right, bottom, right, top, lower, self.button_height),
+				arcade.create_line(left, top, right, top, upper, self.button_height),
+				arcade.create_line(left, bottom, left, top, upper, self.button_height)]
+
+	def draw_text(self):
+		""" Draw the label, shifted up and left unless pressed """
+		x = self.center_x
+		y = self.center_y
+		if not self.pressed:
+			x -= self.button_height
+			y += self.button_height
+
+		text_cache.draw(self.text, x, y,
+						 arcade.color.BLACK, font_size=self.font_size, font_name=self.font_face,
+						 width=self.width, align="center",
+						 anchor_x="center", anchor_y="center")
+
+	def pressed_edges(self):
+		"""
+		ShapeElementList of the edges as they look pressed, to draw over the
+		released button
+		"""
+
+		if self.pressed_shapes is None:
+			self.pressed_shapes = arcade.ShapeElementList()
+			for shape in self.edges(True):
+				self.pressed_shapes.append(shape)
+		return self.pressed_shapes
+
+	def draw(self):
+		""" Draw the button on its own, ButtonList.draw batches a whole list """
+		if self.released_shapes is None:
+			self.released_shapes = arcade.ShapeElementList()
+			for shape in [self.face()] + self.edges(False):
+				self.released_shapes.append(shape)
+		self.released_shapes.draw()
+		if self.pressed:
+			self.pressed_edges().draw()
+		self.draw_text()
+
+	def on_press(self):
+		self.pressed = True
+
+	def on_release(self):
+		self.pressed = False
+
+
+class ButtonList(list):
+	"""
+	A list of buttons drawn as one batch. The faces and released edges of
+	every button go into a single ShapeElementList, built again only when
+	buttons are added or removed. A pressed button's edges are drawn over it
+	from the button's own pressed_edges list.
+
+	Clicks are matched through a uniform grid of BUTTON_GRID pixel cells, each
+	holding the buttons that overlap it, also rebuilt when buttons are added
+	or removed.
+	"""
+
+	def __init__(self, buttons=()):
+		super().__init__(buttons)
+		self.changed()
+
+	def changed(self):
+		"""
+		Buttons were added or removed, rebuild the batch and the grid on next use
+		"""
+
+		self.shape_list = None
+		self.grid = None
+
+	def at(self, x, y):
+		"""
+		The buttons whose grid cells contain x, y
+		"""
+
+		if self.grid is None:
+			self.grid = dict()
+			for button in self:
+				left = int((button.center_x - button.width / 2) // BUTTON_GRID)
+				right = int((button.center_x + button.width / 2) // BUTTON_GRID)
+				bottom = int((button.center_y - button.height / 2) // BUTTON_GRID)
+				top = int((button.center_y + button.height / 2) // BUTTON_GRID)
+				for gx in range(left, right + 1):
+					for gy in range(bottom, top + 1):
+						self.grid.setdefault((gx, gy), []).append(button)
+		return self.grid.get((int(x // BUTTON_GRID), int(y // BUTTON_GRID)), ())
+
+	def draw(self):
+		if self.shape_list is None:
+			self.shape_list = arcade.ShapeElementList()
+			for button in self:
+				for shape in [button.face()] + button.edges(False):
+					self.shape_list.append(shape)
+
+		self.shape_list.draw()
+		for button in self:
+			if button.pressed:
+				button.pressed_edges().draw()
+			button.draw_text()
+
+
+def _changes_buttons(name):
+	"""
+	A list method that also marks the ButtonList as changed
+	"""
+
+	method = getattr(list, name)
+
+	def changing(self, *args):
+		result = method(self, *args)
+		self.changed()
+		return result
+
+	changing.__name__ = name
+	return changing
+
+
+for name in ("append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse",
+		"__setitem__", "__delitem__", "__iadd__", "__imul__"):
+	setattr(ButtonList, name, _changes_buttons(name))
+del name
+
+
+def check_mouse_press_for_buttons(x, y, button_list):
+	""" Given an x, y, see if we need to register any button clicks. """
+	if isinstance(button_list, ButtonList):
+		button_list = button_list.at(x, y)
+	for button in button_list:
+		if x > button.center_x + button.width / 2:
+			continue
+		if x < button.center_x - button.width / 2:
+			continue
+		if y > button.center_y + button.height / 2:
+			continue
+		if y < button.center_y - button.height / 2:
+			continue
+		button.on_press()
+
+
+def check_mouse_release_for_buttons(x, y, button_list):
+	""" If a mouse button has been released, see if we need to process
+		any release events. """
+	for button in button_list:
+		if button.pressed:
+			button.on_release()
+
+
+class StartTextButton(TextButton):
+	def __init__(self, center_x, center_y, width, text, action_function):
+		super().__init__(center_x, center_y, width, 40, text, 18, "Arial")
+		self.action_function = action_function
+
+	def on_release(self):
+		super().on_release()
+		self.action_function()
+
+
+class SpriteBoard(arcade.SpriteList):
+	"""
+	A board drawn as one sprite per cell, row by row from the bottom
+	"""
+
+	def __init__(self, rows, columns):
+		super().__init__()
+		self.columns = columns
+		for row in range(rows):
+			for column in range(columns):
+				sprite = arcade.Sprite()
+				sprite.textures = cell_textures()
+				sprite.set_texture(0)
+				sprite.center_x = (MARGIN + WIDTH) * column + MARGIN + WIDTH // 2
+				sprite.center_y = (MARGIN + HEIGHT) * row + MARGIN + HEIGHT // 2
+				self.append(sprite)
+
+	def set_cell(self, row, column, value):
+		self[row * self.columns + column].set_texture(value)
+
+	def set_grid(self, grid):
+		for row, values in enumerate(grid):
+			for column, value in enumerate(values):
+				self.set_cell(row, column, value)
+
+
+def create_board(rows, columns):
+	"""
+	An empty board for BOARD_RENDERER
+	"""
+
+	if BOARD_RENDERER == "texture":
+		return renderer.BoardTexture(rows, columns, colors, WIDTH, HEIGHT, MARGIN)
+	return SpriteBoard(rows, columns)
+
+
+class ShipClasses:
+	"""
+	Stores all the ships for the user to drop
+	"""
+	
+	def __init__(self, screen_width = SCREEN_WIDTH - OPTIONS // 2, center_height = SCREEN_HEIGHT // 2, inv_height = OPTIONS, images = None):
+		self.images = images or assets.ShipImages(SHIP_IMAGE_DIR, FLEET, INVENTORY_CELL, INVENTORY_CELL, colors[2])
+		self.ship_sprites = arcade.SpriteList()
+		# Ship name -> its sprite in ship_sprites
+		self.sprites = dict()
+		self.screen_width = screen_width
+		self.inv_height = inv_height
+		self.center_height = center_height
+		self.ship_list = ['Aircraft Carrier', 'Battleship', 'Destroyer', 'Submarine', 'PT Boat'] 
+		if FLEET != ships_lengths:
+			self.ship_list = list(FLEET)
+
+	def storeSprites(self):
+		"""
+		Creates one sprite per ship still in the player's inventory and stores
+		them in ship_sprites. Runs once, use_ship then only removes sprites.
+		"""
+
+		if self.sprites:
+			return
+
+		ship_locations = self.screen_width - 150
+		for i, item in enumerate(self.ship_list):
+			sprite = self.ship_sprite(item)
+			sprite.left = ship_locations
+			sprite.bottom = self.center_height + INVENTORY_OFFSETS.get(item, 80 - 50 * i)
+			self.sprites[item] = sprite
+			self.ship_sprites.append(sprite)
+
+
+	def ship_sprite(self, ship):
+		"""
+		Inventory sprite for a ship, from the generated ship images
+		"""
+
+		sprite = arcade.Sprite(scale=SPRITE_SCALING)
+		sprite.textures = [self.images.texture(ship)]
+		sprite.set_texture(0)
+		return sprite
+
+
+	def use_ship(self, ship):
+		"""
+		Uses up an item and removes from inventory
+		"""
+
+		self.ship_list.remove(ship)
+		sprite = self.sprites.pop(ship, None)
+		if sprite is not None:
+			self.ship_sprites.remove(sprite)
+
+
+	def showInventory(self):
+		"""Draws the inventory and all its current components."""
+		arcade.draw_rectangle_filled(self.screen_width, self.center_height, OPTIONS, SCREEN_HEIGHT, arcade.color.EGGPLANT)
+		text_cache.draw('INVENTORY:', self.screen_width - 100, self.center_height * 2 - 100, arcade.color.BLACK, 24)
+		self.storeSprites()
+		self.ship_sprites.draw()
+
+
+
+
+class Battleship(arcade.Window):
+	"""
+	Main application class
+	"""
+
+	def __init__(self, width, height):
+		"""
+		Set up the application.
+		"""
+		
+		super().__init__(width, height)
+
+		# On-demand rendering: dirty is set by anything that changes what is on
+		# screen, presenting says whether the frame drawn by on_draw gets flipped
+		self.dirty = True
+		self.presenting = True
+		self.since_draw = 0.0
+		if RENDER_ON_DEMAND:
+			self.set_update_rate(1 / IDLE_UPDATE_RATE)
+
+		# Create user/computer interfaces and game state
+		self.state = START
+		self.orientation = 0
+
+		# The rules, grids, ship coordinates and health all live in the headless engine.
+		# The seed is kept for the replay record.
+		self.seed = random.randrange(replay.MAX_SEED + 1)
+		if REMOTE_GAME is not None:
+			self.game = REMOTE_GAME
+		else:
+			self.game = engine.Game(ROW_COUNT, COLUMN_COUNT, FLEET, random.Random(self.seed),
+					computer_strategy=ai.STRATEGIES[COMPUTER_STRATEGY](ROW_COUNT, COLUMN_COUNT, FLEET))
+		self.game.sink_listeners.append(self.on_sink)
+
+		# Computer shot being chosen in the background, see on_update
+		self.pending_shot = None
+		# Online, the user's (row, column, answer) waiting on the server
+		self.pending_fire = None
+
+		# Last sink event, shown in the options pane until the next one
+		self.sink_message = None
+
+		# Create ships for the user to drop
+		self.player_fleet = ShipClasses(SCREEN_WIDTH - OPTIONS // 2, SCREEN_HEIGHT // 2, OPTIONS)
+
+		# Create computer and player sprite boards
+		self.player_board = None
+		self.computer_board = None
+
+		arcade.set_background_color(arcade.color.BLACK)
+
+		# Menu backgrounds are decoded and scaled to the window once, not every frame
+		self.texture_cache = textures.TextureCache()
+		self.texture_cache.preload("start", "Images/start.jpg", (SCREEN_WIDTH, SCREEN_HEIGHT))
+		self.texture_cache.preload("instructions", "Images/instructions.jpg", (SCREEN_WIDTH, SCREEN_HEIGHT))
+
+		# Create button lists to take care of mouse commands and change game states
+		self.button_list_start = ButtonList()
+		self.button_list_user = ButtonList()
+		self.button_list_howTo = ButtonList()
+		self.button_list_commands = ButtonList()
+		self.button_list_computer = ButtonList()
+		self.button_list_game_over = ButtonList()
+		self.button_list_user_final = ButtonList()
+		self.button_list_computer_final = ButtonList()
+
+		# Create start game buttom which starts the game
+		start_button = StartTextButton(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, 150, 'Start', self.start_user)
+		self.button_list_start.append(start_button)
+
+		# Create the how to play button, which displays a tutorial screen
+		how_to_play = StartTextButton(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100, 150, 'How to Play', self.show_instructions)
+		self.button_list_start.append(how_to_play)
+
+		# Create Horizontal and Vertical Buttons for user when placing ships
+		horizontal_button = StartTextButton(SCREEN_WIDTH - OPTIONS // 2 + 25, 80, 150, "Horizontal", self.set_horizontal)
+		vertical_button = StartTextButton(SCREEN_WIDTH - OPTIONS // 2 + 25, 130, 150, "Vertical", self.set_vertical)
+		self.button_list_user.append(horizontal_button)
+		self.button_list_user.append(vertical_button)
+		
+		# Button to go back to the main menu
+		back_to_menu = StartTextButton(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 150, 100, 'Return', self.show_start)
+		self.button_list_howTo.append(back_to_menu)
+
+		# Button to acknowledge computer move and revert to user interface
+		back_to_game = StartTextButton(SCREEN_WIDTH - OPTIONS // 2 + 25, 80, 100, "OK", self.show_game)
+		self.button_list_computer.append(back_to_game)
+
+
+		# Display user board during user turn
+		show_user_board = StartTextButton(SCREEN_WIDTH - OPTIONS // 2 - 25, 80, 200, "USER BOARD", self.show_computer)
+		self.button_list_commands.append(show_user_board)
+		
+		# Game over button
+		show_user_final = StartTextButton(SCREEN_WIDTH // 2, 50, 150, "User Final", self.show_player_board)
+		show_computer_final = StartTextButton(SCREEN_WIDTH // 2, 110, 150, "Computer Final", self.show_computer_board)
+		self.button_list_game_over.append(show_user_final)
+		self.button_list_game_over.append(show_computer_final)
+
+		# More game over buttons for accessing
+		back_to_game_over = StartTextButton(SCREEN_WIDTH - OPTIONS // 2, 50, 300, "Back to Game Over", self.show_game_over)
+		self.button_list_user_final.append(back_to_game_over)
+		self.button_list_computer_final.append(back_to_game_over)
+
+		# Per-state dispatch. Clicks in states without a press handler only go to the buttons.
+		self.state_buttons = {START: self.button_list_start,
+				INSTRUCTIONS: self.button_list_howTo,
+				USER: self.button_list_user,
+				GAME: self.button_list_commands,
+				COMPUTER: self.button_list_computer,
+				GAME_OVER: self.button_list_game_over,
+				USER_FINAL: self.button_list_user_final,
+				COMPUTER_FINAL: self.button_list_computer_final}
+		self.press_handlers = {USER: self.press_user,
+				GAME: self.press_game}
+		self.draw_handlers = {START: self.draw_start,
+				INSTRUCTIONS: self.draw_instructions,
+				USER: self.draw_user,
+				GAME: self.draw_game,
+				COMPUTER: self.draw_user_board,
+				GAME_OVER: self.draw_game_over,
+				USER_FINAL: self.show_player_board,
+				COMPUTER_FINAL: self.show_computer_board}
+
+		# Mouse events waiting for the next frame, see process_input
+		self.input_queue = collections.deque()
+
+
+	@property
+	def state(self):
+		return self._state
+
+	@state.setter
+	def state(self, state):
+		if getattr(self, "_state", None) != state:
+			self._state = state
+			self.dirty = True
+
+
+	@property
+	def player_grid(self):
+		return self.game.player.grid
+
+	@property
+	def computer_grid(self):
+		return self.game.computer.grid
+
+	@property
+	def player_ship_coords(self):
+		return self.game.player.ship_coords
+
+	@property
+	def computer_ship_coords(self):
+		return self.game.computer.ship_coords
+
+	@property
+	def player_health(self):
+		return self.game.player.health
+
+	@property
+	def computer_health(self):
+		return self.game.computer.health
+
+	@property
+	def winner(self):
+		return self.game.winner
+
+
+	def start_user(self):
+		"""
+		Start the game
+		"""
+		self.state = USER
+
+
+	def show_instructions(self):
+		"""
+		start instruction screen
+		"""
+		self.state = INSTRUCTIONS
+
+
+	def show_start(self):
+		"""
+		show start menu
+		"""
+		self.state = START
+
+
+	def show_commands(self):
+		"""
+		Display the remaining ships that can be placed
+		"""
+		self.state = COMMANDS
+
+	def show_game(self):
+		"""
+		Show the player board and revert to game state
+		"""
+		self.state = GAME
+		#self.on_draw()
+
+	def show_computer(self):
+		"""
+		Show the player's board and go to computer's state
+		"""
+		self.state = COMPUTER
+
+
+	def finish_game(self):
+		"""
+		Record the finished game if REPLAY_FILE is set and go to game over
+		"""
+
+		if REPLAY_FILE and REMOTE_GAME is None:
+			with replay.ReplayWriter(REPLAY_FILE, ROW_COUNT, COLUMN_COUNT, FLEET, append=True) as replays:
+				replays.write(self.game, self.seed)
+		self.state = GAME_OVER
+
+
+	def show_game_over(self):
+		"""
+		Set the scene to game over
+		"""
+		self.state = GAME_OVER
+
+	def set_horizontal(self):
+		"""
+		Set the ship horizontal
+		"""
+		self.orientation = 0
+
+	def set_vertical(self):
+		"""
+		Set the ship vertical
+		"""
+		self.orientation = 1
+
+
+	def set_cell_texture(self, row, column, player):
+		"""
+		Sync one board sprite with the engine grid. Computer ships stay hidden
+		until the final board is shown.
+		"""
+
+		self.dirty = True
+		if player == USER:
+			self.player_board.set_cell(row, column, self.player_grid[row][column])
+		else:
+			v = self.computer_grid[row][column]
+			self.computer_board.set_cell(row, column, 0 if v == engine.SHIP else v)
+
+
+	def place_ship(self, row, column, ship, player):
+		"""
+		Place a ship with the current orientation, returns False if it is off the grid or collides
+		"""
+
+		cells = self.game.board(player).place(ship, row, column, self.orientation)
+		if cells is None:
+			return False
+
+		for r, c in cells:
+			self.set_cell_texture(r, c, player)
+		return True
+
+
+
+	def setup(self):
+		"""
+		Setup the boards for the player and the computer.
+		"""
+
+		self.player_board = create_board(ROW_COUNT, COLUMN_COUNT)
+		self.computer_board = create_board(ROW_COUNT, COLUMN_COUNT)
+		self.sync_board(self.player_board, self.game.player)
+		self.sync_board(self.computer_board, self.game.computer)
+
+
+	def sync_board(self, view, board):
+		"""
+		Show every ship and shot of an engine board. Untouched water is
+		already shown, so this costs the ships and shots, not the board area.
+		"""
+
+		for row, column, value in board.marked_cells():
+			view.set_cell(row, column, value)
+
+
+	def show_player_board(self):
+		"""
+		Show the player board (final)
+		"""
+
+		# Set the state to user final
+		self.state = USER_FINAL
+		arcade.set_background_color(arcade.color.BLACK)
+		self.sync_board(self.player_board, self.game.player)
+
+		arcade.start_render()
+		self.player_board.draw()
+
+		self.button_list_user_final.draw()
+
+
+	def show_computer_board(self):
+		"""
+		Show the computer board (final)
+		"""
+
+		# Set the state to computer final
+		self.state = COMPUTER_FINAL
+		arcade.set_background_color(arcade.color.BLACK)
+		self.sync_board(self.computer_board, self.game.computer)
+
+		arcade.start_render()
+		self.computer_board.draw()
+		
+		self.button_list_computer_final.draw()
+
+
+	def on_mouse_press(self, x, y, button, modifiers):
+		"""
+		Called when the user presses a mouse button. The press is queued and
+		applied at the start of the next frame.
+		"""
+
+		self.input_queue.append((self.mouse_press, x, y))
+		self.dirty = True
+
+
+	def on_mouse_release(self, x, y, button, key_modifiers):
+		"""
+		Called when a user releases a mouse button.
+		"""
+
+		self.input_queue.append((self.mouse_release, x, y))
+		self.dirty = True
+
+
+	def process_input(self):
+		"""
+		Apply the queued mouse events in order
+		"""
+
+		while self.input_queue:
+			handler, x, y = self.input_queue.popleft()
+			handler(x, y)
+
+
+	def mouse_press(self, x, y):
+		"""
+		Send a press to the current state's handler, or its buttons
+		"""
+
+		# Change the x/y screen coordinates to player_grid coordinates
+		column = x // (WIDTH + MARGIN)
+		row = y // (HEIGHT + MARGIN)
+
+		handler = self.press_handlers.get(self.state)
+		if handler is not None:
+			handler(x, y, row, column)
+		elif self.state in self.state_buttons:
+			check_mouse_press_for_buttons(x, y, self.state_buttons[self.state])
+
+
+	def mouse_release(self, x, y):
+		if self.state in self.state_buttons:
+			check_mouse_release_for_buttons(x, y, self.state_buttons[self.state])
+
+
+	def press_user(self, x, y, row, column):
+		"""
+		The user is still placing ships on his/her board
+		"""
+
+		# If user has no more ships to place, computer places ships
+		if len(self.player_fleet.ship_list) == 0:
+			self.state = GAME
+			self.computer_place_ships()
+			# Joining someone else's game online, they shoot first
+			if not getattr(self.game, "moves_first", True):
+				self.computer_turn()
+			return
+
+		# Check if the set orientation buttons were clicked
+		check_mouse_press_for_buttons(x, y, self.button_list_user)
+
+		if row < ROW_COUNT and column < COLUMN_COUNT:
+			# Get the next ship and remove it from the directory
+			ship = self.player_fleet.ship_list[0]
+			if self.place_ship(row, column, ship, USER):
+				self.player_fleet.use_ship(ship)
+
+
+	def press_game(self, x, y, row, column):
+		"""
+		The user fires at the computer board
+		"""
+
+		check_mouse_press_for_buttons(x, y, self.button_list_commands)
+
+		# Wait for the computer to finish its move, or the server to answer our last shot
+		if self.pending_shot is not None or self.pending_fire is not None:
+			return
+
+		# Make sure we are on-player_grid. It is possible to click in the upper right
+		# corner in the margin and go to a player_grid location that doesn't exist
+		if row < ROW_COUNT and column < COLUMN_COUNT:
+			# Online, the server's answer is picked up in on_update
+			if hasattr(self.game, 'fire_async'):
+				self.pending_fire = (row, column, self.game.fire_async(row, column))
+				if RENDER_ON_DEMAND:
+					self.set_update_rate(1 / ACTIVE_UPDATE_RATE)
+				return
+
+			# If hit water, then set to white (miss); ship becomes a hit
+			self.finish_user_shot(row, column, self.game.shoot(USER, row, column))
+
+
+	def finish_user_shot(self, row, column, result):
+		"""
+		Show the user's shot and hand over to the computer, or end the game
+		"""
+
+		if result is None:
+			# Refused, unless an online opponent left
+			if self.winner is not None:
+				self.dirty = True
+				self.finish_game()
+			return
+
+		# Set the texture to display the effect
+		self.set_cell_texture(row, column, COMPUTER)
+
+		if self.winner == USER:
+			self.finish_game()
+			return
+
+		# Call computer's turn to attack player board
+		self.computer_turn()
+
+
+	def computer_place_ships(self):
+		"""
+		Generate random but valid coordinates for the computer to place ships
+		"""
+
+		self.game.computer_place_ships()
+		for row, column in self.computer_ship_coords:
+			self.set_cell_texture(row, column, COMPUTER)
+
+
+	def computer_turn(self):
+		"""
+		Computer turn generator. Slow strategies choose their shot in the
+		background and the shot is fired from on_update once it is ready.
+		"""
+
+		strategy = self.game.computer_strategy
+		if hasattr(strategy, 'choose_async'):
+			self.pending_shot = strategy.choose_async()
+			if RENDER_ON_DEMAND:
+				self.set_update_rate(1 / ACTIVE_UPDATE_RATE)
+			return
+
+		row, column, result = self.game.computer_turn()
+		self.finish_computer_turn(row, column)
+
+
+	def on_update(self, delta_time):
+		"""
+		Fire the computer's shot once a background strategy has chosen it,
+		and finish the user's shot once the server has answered it
+		"""
+
+		self.since_draw += delta_time
+		if self.pending_fire is not None and self.pending_fire[2].done():
+			row, column, answer = self.pending_fire
+			self.pending_fire = None
+			if RENDER_ON_DEMAND:
+				self.set_update_rate(1 / IDLE_UPDATE_RATE)
+			self.finish_user_shot(row, column, self.game.finish_shot(row, column, answer.result()))
+
+		if self.pending_shot is None or not self.pending_shot.done():
+			return
+
+		move = self.pending_shot.result()
+		self.pending_shot = None
+		if RENDER_ON_DEMAND:
+			self.set_update_rate(1 / IDLE_UPDATE_RATE)
+		if move is None:
+			# The game ended without a shot, an online opponent left
+			self.dirty = True
+			self.finish_game()
+			return
+		row, column = move
+		self.game.strategy_shot(COMPUTER, self.game.computer_strategy, row, column)
+		self.finish_computer_turn(row, column)
+
+
+	def finish_computer_turn(self, row, column):
+		"""
+		Show the computer's shot and move on to the computer state
+		"""
+
+		self.set_cell_texture(row, column, USER)
+
+		if self.winner == COMPUTER:
+			self.finish_game()
+			return
+
+		self.state = COMPUTER
+
+
+	def on_sink(self, player, ship, row, column):
+		"""
+		Sink event from the engine, remembers the message for the next frame
+		"""
+
+		self.dirty = True
+		if player == USER:
+			self.sink_message = "You sank the enemy " + ship
+		else:
+			self.sink_message = "The enemy sank your " + ship
+
+
+	def draw_sink_message(self):
+		"""
+		Draw the last sink event in the options pane
+		"""
+
+		if self.sink_message is None:
+			return
+
+		text_cache.draw(self.sink_message, SCREEN_WIDTH - OPTIONS // 2, SCREEN_HEIGHT // 2,
+			arcade.color.WHITE, font_size=16,
+			width=OPTIONS, align="center",
+			anchor_x="center", anchor_y="center")
+
+
+	def draw_start(self):
+		"""
+		Draw the start menu
+		"""
+		arcade.draw_texture_rectangle(SCREEN_WIDTH//2, SCREEN_HEIGHT//2, SCREEN_WIDTH, SCREEN_HEIGHT, self.texture_cache.get("start"))
+
+		self.button_list_start.draw()
+	
+
+
+	def draw_instructions(self):
+		"""
+		Draw the instructions menu
+		"""
+
+		arcade.draw_texture_rectangle(SCREEN_WIDTH//2, SCREEN_HEIGHT//2, SCREEN_WIDTH, SCREEN_HEIGHT, self.texture_cache.get("instructions"))
+
+		text_cache.draw("You are the commander of a fleet of ships.", SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2,
+				arcade.color.WHITE, font_size=16,
+				width=SCREEN_WIDTH, align="center",
+				anchor_x="center", anchor_y="center")
+
+		text_cache.draw("Your goal is to take out the hidden enemy fleet before they take you out.", SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50,
+				arcade.color.WHITE, font_size=16,
+				width=SCREEN_WIDTH, align="center",
+				anchor_x="center", anchor_y="center")
+
+		text_cache.draw("Place your ships in strategic positions, and hit hard, hit fast, hit often!", SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100,
+				arcade.color.WHITE, font_size=16,
+				width=SCREEN_WIDTH, align="center",
+				anchor_x="center", anchor_y="center")
+
+
+		self.button_list_howTo.draw()
+
+
+	def draw_user(self):
+		"""
+		Draw the user ship drop menu
+		"""
+
+		arcade.start_render()
+		self.player_board.draw()
+		self.player_fleet.showInventory()
+
+		self.button_list_user.draw()
+
+
+	def draw_user_board(self):
+		"""
+		Display the player's board
+		"""
+
+		arcade.start_render()
+		self.player_board.draw()
+		self.draw_sink_message()
+		self.button_list_computer.draw()
+
+
+	def draw_game(self):
+		"""
+		Draw the computer board for the player to attack
+		"""
+		
+		arcade.start_render()
+		self.computer_board.draw()
+		self.draw_sink_message()
+
+		# User command buttons, like go view user board
+		self.button_list_commands.draw()
+
+
+	def draw_game_over(self):
+		"""
+		Draw the game over scene, for now blue for win, red for lose
+		"""
+
+		arcade.start_render()
+		if self.winner == USER:
+			arcade.set_background_color(arcade.color.BLUE)
+		else:
+			arcade.set_background_color(arcade.color.RED)
+
+		self.button_list_game_over.draw()
+
+
+
+	#def draw_dialogue(self):
+
+
+	def on_resize(self, width, height):
+		super().on_resize(width, height)
+		self.dirty = True
+
+
+	def on_expose(self):
+		self.dirty = True
+
+
+	def flip(self):
+		"""
+		Present the frame, unless on_draw skipped drawing it
+		"""
+
+		if self.presenting:
+			super().flip()
+
+
+	def on_draw(self):
+		""" 
+		render the screen. With RENDER_ON_DEMAND nothing is drawn or presented
+		until something marks the window dirty, or IDLE_REDRAW has passed.
+		Mouse events queued since the last frame are applied first.
+		"""
+
+		self.process_input()
+		self.presenting = not RENDER_ON_DEMAND or self.dirty or self.since_draw >= IDLE_REDRAW
+		if not self.presenting:
+			return
+		self.dirty = False
+		self.since_draw = 0.0
+
+		handler = self.draw_handlers.get(self.state)
+		if handler is not None:
+			handler()
+
+
+
+def configure(rows=ROW_COUNT, columns=COLUMN_COUNT, fleet=None, strategy=None):
+	"""
+	Set the board size and fleet before the window is created. Cells are
+	sized so the board fits in about BOARD_PIXELS, boards past
+	MAX_SPRITE_CELLS use the texture renderer, and boards past
+	engine.SPARSE_CELLS get the hunt AI unless a strategy is given.
+	"""
+
+	global ROW_COUNT, COLUMN_COUNT, FLEET, WIDTH, HEIGHT, MARGIN, SCREEN_WIDTH, SCREEN_HEIGHT
+	global BOARD_RENDERER, COMPUTER_STRATEGY, SHIP_IMAGE_DIR
+
+	ROW_COUNT = rows
+	COLUMN_COUNT = columns
+	if fleet is not None and fleet != ships_lengths:
+		FLEET = dict(fleet)
+		# Keep the shipped images for the standard fleet
+		SHIP_IMAGE_DIR = None
+
+	side = max(rows, columns)
+	MARGIN = 1 if BOARD_PIXELS // side >= 4 else 0
+	WIDTH = HEIGHT = max(1, (BOARD_PIXELS - MARGIN) // side - MARGIN)
+	SCREEN_WIDTH = (WIDTH + MARGIN) * COLUMN_COUNT + MARGIN + OPTIONS
+	SCREEN_HEIGHT = max((HEIGHT + MARGIN) * ROW_COUNT + MARGIN, BOARD_PIXELS)
+
+	if rows * columns > MAX_SPRITE_CELLS:
+		BOARD_RENDERER = "texture"
+	if strategy is not None:
+		COMPUTER_STRATEGY = strategy
+	elif rows * columns > engine.SPARSE_CELLS:
+		COMPUTER_STRATEGY = ai.HuntStrategy.name
+
+
+def main(argv=None):
+	""" 
+	Create the game window, setup, run 
+	"""
+
+	parser = argparse.ArgumentParser(description="Play Battleship against the computer.")
+	parser.add_argument("--rows", type=int, default=ROW_COUNT)
+	parser.add_argument("--columns", type=int, default=COLUMN_COUNT)
+	parser.add_argument("--fleet", type=engine.parse_fleet, default=None,
+			help='ship lengths, e.g. "5,4,3,3,2" or "Carrier:5,Cruiser:3"')
+	parser.add_argument("--ai", default=None, choices=sorted(ai.STRATEGIES), help="computer opponent")
+	parser.add_argument("--replay", default=None, help="append every finished game to this replay file")
+	parser.add_argument("--connect", metavar="HOST:PORT", help="play on a server.py server")
+	parser.add_argument("--pvp", action="store_true", help="with --connect, host a game against another player")
+	parser.add_argument("--join", type=int, metavar="ID", help="with --connect, join another player's game")
+	args = parser.parse_args(argv)
+
+	global REPLAY_FILE, REMOTE_GAME
+	if args.replay:
+		REPLAY_FILE = args.replay
+	if args.connect:
+		# Imported here so local games never load the networking code
+		import client
+		mode = "join" if args.join is not None else "pvp" if args.pvp else "ai"
+		REMOTE_GAME = client.RemoteGame(args.connect, mode=mode, game_id=args.join, strategy=args.ai)
+		if mode == "pvp":
+			print("hosting game %d" % REMOTE_GAME.id)
+		configure(REMOTE_GAME.rows, REMOTE_GAME.columns, REMOTE_GAME.fleet)
+	else:
+		configure(args.rows, args.columns, args.fleet, args.ai)
+
+	my_game = Battleship(SCREEN_WIDTH, SCREEN_HEIGHT)
+	my_game.setup()
+	try:
+		arcade.run()
+	finally:
+		ai.MonteCarloStrategy.shutdown()
+
+
+if __name__ == "__main__":
+	main()
+
+
+